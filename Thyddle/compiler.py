@@ -0,0 +1,562 @@
+# compiler.py
+from contextlib import contextmanager
+
+from Thyddle.lexer import TokenType
+from Thyddle.parser import (
+    Binary, Grouping, Literal, Unary, Variable, Assign, Logical,
+    Call, Get, Set, Index, SetIndex, ArrayLiteral, ObjectLiteral,
+    ExpressionStatement, VarStatement, BlockStatement, IfStatement, WhileStatement,
+    ForStatement, ForInStatement, FunctionStatement, ReturnStatement, BreakStatement,
+    ContinueStatement, ImportStatement, LambdaExpression
+)
+from Thyddle.optimizer import LenCall
+
+# Opcodes. Every instruction is two slots wide: the opcode and one integer
+# argument (0 when the opcode does not use it).
+CONST = 0           # push constants[arg]
+POP = 1             # discard top of stack
+LOAD_NAME = 2       # push value of variable constants[arg]
+STORE_NAME = 3      # assign top of stack to variable constants[arg] (keeps value)
+DEFINE = 4          # pop and define constants[arg] in the current scope
+DEFINE_CONST = 5    # pop and define the (name, slot) pair constants[arg] as constant
+JUMP = 6            # pc = arg
+JUMP_IF_FALSE = 7   # pop, jump to arg if falsy
+JUMP_IF_TRUE_OR_POP = 8   # jump to arg keeping the value if truthy, else pop
+JUMP_IF_FALSE_OR_POP = 9  # jump to arg keeping the value if falsy, else pop
+PUSH_SCOPE = 10     # enter a scope sized by the resolved node constants[arg]
+POP_SCOPE = 11
+ADD = 12
+SUBTRACT = 13
+MULTIPLY = 14
+DIVIDE = 15
+MODULO = 16
+LESS = 17
+LESS_EQUAL = 18
+GREATER = 19
+GREATER_EQUAL = 20
+EQUAL = 21
+NOT_EQUAL = 22
+NEGATE = 23
+NOT = 24
+CALL = 25           # call with arg arguments
+GET_PROPERTY = 26   # replace object on top of stack with its property constants[arg]
+SET_PROPERTY = 27   # stack: object, value -> value
+INDEX = 28          # stack: object, index -> value
+SET_INDEX = 29      # stack: object, index, value -> value
+BUILD_ARRAY = 30    # pop arg elements into a new array
+BUILD_OBJECT = 31   # pop values for the key tuple constants[arg] into a new object
+MAKE_FUNCTION = 32  # push a function for the CodeObject constants[arg]
+MAKE_LAMBDA = 33    # push a lambda for the CodeObject constants[arg]
+RETURN = 34         # pop and return
+SET_RESULT = 35     # pop into the statement result register
+IMPORT = 36         # import module constants[arg], push True
+ERROR = 37          # raise a runtime error with message constants[arg]
+HALT = 38           # stop, returning the result register
+LOAD_SLOT = 39      # push slot arg of the current scope
+STORE_SLOT = 40     # assign top of stack to slot arg of the current scope (keeps value)
+LOAD_OUTER = 41     # push the slot for the (depth, slot) pair constants[arg]
+STORE_OUTER = 42    # assign top of stack to the (depth, slot) pair constants[arg]
+DEFINE_SLOT = 43    # pop into slot arg of the current scope
+GET_ITER = 44       # replace the value on top of stack with an iterator over it (for-in)
+FOR_ITER = 45       # push the iterator's next value, or pop the iterator and jump to arg
+TAIL_CALL = 46      # return the result of calling with arg arguments, reusing this frame
+ASSIGN_NAME = 47    # pop and assign to variable constants[arg] (DEFINE_SLOT does this for slots)
+ASSIGN_OUTER = 48   # pop and assign to the (depth, slot) pair constants[arg]
+# Pop two operands and jump to arg unless the comparison holds: a condition
+# in one instruction instead of a comparison and a JUMP_IF_FALSE
+JUMP_UNLESS_LESS = 49
+JUMP_UNLESS_LESS_EQUAL = 50
+JUMP_UNLESS_GREATER = 51
+JUMP_UNLESS_GREATER_EQUAL = 52
+JUMP_UNLESS_EQUAL = 53
+JUMP_UNLESS_NOT_EQUAL = 54
+LEN = 55            # stack: callee, value -> len(value) when callee is the built-in len
+APPEND = 56         # stack: x, parts -> x + parts, stored in x (see Compiler.append)
+ADD_CONST = 57      # add constants[arg] to the value on top of stack (i + 1)
+SUBTRACT_CONST = 58 # subtract constants[arg] from the value on top of stack
+
+OPCODE_NAMES = {value: name for name, value in globals().items()
+                if name.isupper() and isinstance(value, int)}
+
+BINARY_OPCODES = {
+    TokenType.PLUS: ADD,
+    TokenType.MINUS: SUBTRACT,
+    TokenType.STAR: MULTIPLY,
+    TokenType.SLASH: DIVIDE,
+    TokenType.MODULO: MODULO,
+    TokenType.LESS: LESS,
+    TokenType.LESS_EQUAL: LESS_EQUAL,
+    TokenType.GREATER: GREATER,
+    TokenType.GREATER_EQUAL: GREATER_EQUAL,
+    TokenType.EQUAL_EQUAL: EQUAL,
+    TokenType.BANG_EQUAL: NOT_EQUAL,
+}
+
+# Binary operators with a literal right operand, which is added without
+# being pushed first
+CONSTANT_OPCODES = {
+    TokenType.PLUS: ADD_CONST,
+    TokenType.MINUS: SUBTRACT_CONST,
+}
+
+CONDITION_JUMPS = {
+    TokenType.LESS: JUMP_UNLESS_LESS,
+    TokenType.LESS_EQUAL: JUMP_UNLESS_LESS_EQUAL,
+    TokenType.GREATER: JUMP_UNLESS_GREATER,
+    TokenType.GREATER_EQUAL: JUMP_UNLESS_GREATER_EQUAL,
+    TokenType.EQUAL_EQUAL: JUMP_UNLESS_EQUAL,
+    TokenType.BANG_EQUAL: JUMP_UNLESS_NOT_EQUAL,
+}
+
+class CodeObject:
+    def __init__(self, name, params, declaration=None):
+        self.name = name
+        self.params = params              # parameter names
+        self.declaration = declaration    # FunctionStatement / LambdaExpression, for printing
+        self.scope_size = 0
+        self.scope_names = None
+        self.code = []
+        self.constants = []
+        self.constant_indexes = {}
+
+    def add_constant(self, value):
+        # Key on the type as well, otherwise 1, 1.0 and True would share a slot
+        key = (type(value), value)
+        if key not in self.constant_indexes:
+            self.constant_indexes[key] = len(self.constants)
+            self.constants.append(value)
+        return self.constant_indexes[key]
+
+    def disassemble(self):
+        lines = [f"== {self.name} =="]
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            lines.append(f"{pc:04d} {OPCODE_NAMES[op]:<22} {arg}")
+        for constant in self.constants:
+            if isinstance(constant, CodeObject):
+                lines.append(constant.disassemble())
+        return "\n".join(lines)
+
+    def __str__(self):
+        return f"<code {self.name}>"
+
+class CompileError(Exception):
+    pass
+
+class Loop:
+    def __init__(self, scope_depth):
+        self.scope_depth = scope_depth
+        self.break_jumps = []
+        self.continue_jumps = []
+
+class Compiler:
+    """Compiles parsed statements into CodeObjects for the VM."""
+
+    def __init__(self):
+        self.unit = None
+        self.scope_depth = 0
+        self.loops = []
+
+    def compile_program(self, statements):
+        unit = CodeObject("<script>", [])
+        with self.enter(unit):
+            for stmt in statements:
+                self.statement(stmt, keep=True)
+            self.emit(HALT)
+        return unit
+
+    def compile_expression(self, expr, name="<expression>"):
+        unit = CodeObject(name, [])
+        with self.enter(unit):
+            self.expression(expr)
+            self.emit(RETURN)
+        return unit
+
+    def compile_function(self, name, params, body, declaration):
+        unit = CodeObject(name, list(params), declaration)
+        unit.scope_size = declaration.scope_size
+        unit.scope_names = declaration.scope_names
+        with self.enter(unit):
+            if isinstance(body, ReturnStatement):
+                # Expression-bodied lambda
+                self.return_value(body)
+            else:
+                for stmt in body:
+                    self.statement(stmt)
+                self.emit(CONST, unit.add_constant(None))
+                self.emit(RETURN)
+        return unit
+
+    @contextmanager
+    def enter(self, unit):
+        saved = (self.unit, self.scope_depth, self.loops)
+        self.unit, self.scope_depth, self.loops = unit, 0, []
+        try:
+            yield unit
+        finally:
+            self.unit, self.scope_depth, self.loops = saved
+
+    def emit(self, op, arg=0):
+        self.unit.code.append(op)
+        self.unit.code.append(arg)
+        return len(self.unit.code) - 2
+
+    def emit_jump(self, op):
+        return self.emit(op, -1)
+
+    def patch(self, position):
+        self.unit.code[position + 1] = len(self.unit.code)
+
+    def constant(self, value):
+        return self.unit.add_constant(value)
+
+    def set_result(self, keep):
+        if keep:
+            self.emit(CONST, self.constant(None))
+            self.emit(SET_RESULT)
+
+    # Statements -------------------------------------------------------------
+
+    def statement(self, stmt, keep=False):
+        # `keep` mirrors Interpreter.execute's return value, which becomes the
+        # result of interpret()/eval() for top-level statements.
+        if stmt is None:
+            self.set_result(keep)
+
+        elif isinstance(stmt, ExpressionStatement):
+            if keep:
+                self.expression(stmt.expression)
+                self.emit(SET_RESULT)
+            else:
+                self.discard(stmt.expression)
+
+        elif isinstance(stmt, VarStatement):
+            if stmt.initializer is not None:
+                self.expression(stmt.initializer)
+            else:
+                self.emit(CONST, self.constant(None))
+            if stmt.is_const:
+                self.emit(DEFINE_CONST, self.constant((stmt.name, stmt.slot)))
+            else:
+                self.define(stmt.name, stmt.slot)
+            if keep:
+                self.load(stmt.name, 0, stmt.slot)
+                self.emit(SET_RESULT)
+
+        elif isinstance(stmt, BlockStatement):
+            self.block(stmt)
+            self.set_result(keep)
+
+        elif isinstance(stmt, IfStatement):
+            end_jumps = []
+            branches = [(stmt.condition, stmt.then_branch)] + list(stmt.else_if_branches)
+            for condition, branch in branches:
+                skip = self.jump_unless(condition)
+                self.statement(branch, keep)
+                end_jumps.append(self.emit_jump(JUMP))
+                self.patch(skip)
+            if stmt.else_branch is not None:
+                self.statement(stmt.else_branch, keep)
+            else:
+                self.set_result(keep)
+            for jump in end_jumps:
+                self.patch(jump)
+
+        elif isinstance(stmt, WhileStatement):
+            self.set_result(keep)
+            loop = Loop(self.scope_depth)
+            start = len(self.unit.code)
+            exit_jump = self.jump_unless(stmt.condition)
+            self.loops.append(loop)
+            self.statement(stmt.body, self.keeps_body(stmt, keep))
+            self.loops.pop()
+            for jump in loop.continue_jumps:
+                self.unit.code[jump + 1] = start
+            self.emit(JUMP, start)
+            self.patch(exit_jump)
+            for jump in loop.break_jumps:
+                self.patch(jump)
+
+        elif isinstance(stmt, ForStatement):
+            self.set_result(keep)
+            self.emit(PUSH_SCOPE, self.constant(stmt))
+            self.scope_depth += 1
+            if stmt.initializer is not None:
+                self.statement(stmt.initializer)
+            loop = Loop(self.scope_depth)
+            start = len(self.unit.code)
+            exit_jump = None
+            if stmt.condition is not None:
+                exit_jump = self.jump_unless(stmt.condition)
+            self.loops.append(loop)
+            self.statement(stmt.body, self.keeps_body(stmt, keep))
+            self.loops.pop()
+            for jump in loop.continue_jumps:
+                self.patch(jump)
+            if stmt.increment is not None:
+                self.discard(stmt.increment)
+            self.emit(JUMP, start)
+            if exit_jump is not None:
+                self.patch(exit_jump)
+            for jump in loop.break_jumps:
+                self.patch(jump)
+            self.scope_depth -= 1
+            self.emit(POP_SCOPE)
+
+        elif isinstance(stmt, ForInStatement):
+            self.set_result(keep)
+            self.expression(stmt.iterable)
+            self.emit(GET_ITER)
+            self.emit(PUSH_SCOPE, self.constant(stmt))
+            self.scope_depth += 1
+            loop = Loop(self.scope_depth)
+            start = len(self.unit.code)
+            exit_jump = self.emit_jump(FOR_ITER)
+            self.define(stmt.name, stmt.slot)
+            self.loops.append(loop)
+            self.statement(stmt.body, self.keeps_body(stmt, keep))
+            self.loops.pop()
+            for jump in loop.continue_jumps:
+                self.unit.code[jump + 1] = start
+            self.emit(JUMP, start)
+            # A break leaves the iterator on the stack; running out pops it
+            for jump in loop.break_jumps:
+                self.patch(jump)
+            self.emit(POP)
+            self.patch(exit_jump)
+            self.scope_depth -= 1
+            self.emit(POP_SCOPE)
+
+        elif isinstance(stmt, FunctionStatement):
+            code = self.compile_function(stmt.name, stmt.params, stmt.body, stmt)
+            self.emit(MAKE_FUNCTION, self.constant(code))
+            self.define(stmt.name, stmt.slot)
+            if keep:
+                self.load(stmt.name, 0, stmt.slot)
+                self.emit(SET_RESULT)
+
+        elif isinstance(stmt, ReturnStatement):
+            self.return_value(stmt)
+
+        elif isinstance(stmt, BreakStatement):
+            if not self.loops:
+                self.emit(ERROR, self.constant("'break' outside of a loop."))
+                return
+            loop = self.loops[-1]
+            self.pop_scopes(loop.scope_depth)
+            loop.break_jumps.append(self.emit_jump(JUMP))
+
+        elif isinstance(stmt, ContinueStatement):
+            if not self.loops:
+                self.emit(ERROR, self.constant("'continue' outside of a loop."))
+                return
+            loop = self.loops[-1]
+            self.pop_scopes(loop.scope_depth)
+            loop.continue_jumps.append(self.emit_jump(JUMP))
+
+        elif isinstance(stmt, ImportStatement):
+            self.emit(IMPORT, self.constant(stmt.module_name))
+            self.emit(SET_RESULT if keep else POP)
+
+        else:
+            raise CompileError(f"Cannot compile statement {stmt}.")
+
+    def keeps_body(self, loop, keep):
+        # A loop's result is its body's last value, and a block's is always
+        # None, which the loop already set before starting
+        return keep and not isinstance(loop.body, BlockStatement)
+
+    def return_value(self, stmt):
+        if stmt.tail_call:
+            call = stmt.value
+            self.expression(call.callee)
+            for argument in call.arguments:
+                self.expression(argument)
+            self.emit(TAIL_CALL, len(call.arguments))
+            return
+        if stmt.value is not None:
+            self.expression(stmt.value)
+        else:
+            self.emit(CONST, self.constant(None))
+        self.emit(RETURN)
+
+    def block(self, block):
+        if not block.needs_scope:
+            for stmt in block.statements:
+                self.statement(stmt)
+            return
+        self.emit(PUSH_SCOPE, self.constant(block))
+        self.scope_depth += 1
+        for stmt in block.statements:
+            self.statement(stmt)
+        self.scope_depth -= 1
+        self.emit(POP_SCOPE)
+
+    def load(self, name, depth, slot):
+        if slot is None:
+            self.emit(LOAD_NAME, self.constant(name))
+        elif depth == 0:
+            self.emit(LOAD_SLOT, slot)
+        else:
+            self.emit(LOAD_OUTER, self.constant((depth, slot)))
+
+    def store(self, name, depth, slot):
+        if slot is None:
+            self.emit(STORE_NAME, self.constant(name))
+        elif depth == 0:
+            self.emit(STORE_SLOT, slot)
+        else:
+            self.emit(STORE_OUTER, self.constant((depth, slot)))
+
+    def assign(self, name, depth, slot):
+        # Like store, but pops the value
+        if slot is None:
+            self.emit(ASSIGN_NAME, self.constant(name))
+        elif depth == 0:
+            self.emit(DEFINE_SLOT, slot)
+        else:
+            self.emit(ASSIGN_OUTER, self.constant((depth, slot)))
+
+    def define(self, name, slot):
+        if slot is None:
+            self.emit(DEFINE, self.constant(name))
+        else:
+            self.emit(DEFINE_SLOT, slot)
+
+    def pop_scopes(self, depth):
+        for _ in range(self.scope_depth - depth):
+            self.emit(POP_SCOPE)
+
+    # Expressions ------------------------------------------------------------
+
+    def discard(self, expr):
+        # An expression whose value isn't used, such as an expression statement
+        if isinstance(expr, Assign):
+            if self.appends(expr):
+                self.append(expr, keep=False)
+            else:
+                self.expression(expr.value)
+                self.assign(expr.name, expr.depth, expr.slot)
+        else:
+            self.expression(expr)
+            self.emit(POP)
+
+    def jump_unless(self, condition):
+        # Compiles a condition and a jump taken when it is falsy; returns the
+        # jump to patch
+        while isinstance(condition, Grouping):
+            condition = condition.expression
+        if isinstance(condition, Binary) and condition.op in CONDITION_JUMPS:
+            self.expression(condition.left)
+            self.expression(condition.right)
+            return self.emit_jump(CONDITION_JUMPS[condition.op])
+        self.expression(condition)
+        return self.emit_jump(JUMP_IF_FALSE)
+
+    def appends(self, expr):
+        # `x = x + a ...` that could be building a string: the Resolver found
+        # the parts, and they aren't all number literals (i = i + 1)
+        return expr.append is not None and not all(
+            isinstance(part, Literal) and isinstance(part.value, (int, float))
+            and not isinstance(part.value, bool)
+            for part in expr.append[1:]
+        )
+
+    def append(self, expr, keep=True):
+        # The parts are evaluated in order as for `+`, x first; APPEND then
+        # adds them up and stores the sum, appending to x in place when it
+        # holds a string (see Interpreter.evaluate_append), and pushes it
+        # if `keep`
+        for part in expr.append:
+            self.expression(part)
+        count = len(expr.append) - 1
+        self.emit(APPEND, self.constant((expr.name, expr.depth, expr.slot, count, keep)))
+
+    def expression(self, expr):
+        if isinstance(expr, Literal):
+            self.emit(CONST, self.constant(expr.value))
+
+        elif isinstance(expr, Grouping):
+            self.expression(expr.expression)
+
+        elif isinstance(expr, Variable):
+            self.load(expr.name, expr.depth, expr.slot)
+
+        elif isinstance(expr, Assign):
+            if self.appends(expr):
+                self.append(expr)
+            else:
+                self.expression(expr.value)
+                self.store(expr.name, expr.depth, expr.slot)
+
+        elif isinstance(expr, Binary):
+            self.expression(expr.left)
+            if isinstance(expr.right, Literal) and expr.op in CONSTANT_OPCODES:
+                self.emit(CONSTANT_OPCODES[expr.op], self.constant(expr.right.value))
+            else:
+                self.expression(expr.right)
+                self.emit(BINARY_OPCODES[expr.op])
+
+        elif isinstance(expr, Unary):
+            self.expression(expr.right)
+            self.emit(NEGATE if expr.op == TokenType.MINUS else NOT)
+
+        elif isinstance(expr, Logical):
+            self.expression(expr.left)
+            if expr.op == TokenType.OR:
+                end = self.emit_jump(JUMP_IF_TRUE_OR_POP)
+            else:
+                end = self.emit_jump(JUMP_IF_FALSE_OR_POP)
+            self.expression(expr.right)
+            self.patch(end)
+
+        elif isinstance(expr, LenCall):
+            self.expression(expr.callee)
+            self.expression(expr.arguments[0])
+            self.emit(LEN)
+
+        elif isinstance(expr, Call):
+            self.expression(expr.callee)
+            for argument in expr.arguments:
+                self.expression(argument)
+            self.emit(CALL, len(expr.arguments))
+
+        elif isinstance(expr, Get):
+            self.expression(expr.obj)
+            self.emit(GET_PROPERTY, self.constant(expr.name))
+
+        elif isinstance(expr, Set):
+            self.expression(expr.obj)
+            self.expression(expr.value)
+            self.emit(SET_PROPERTY, self.constant(expr.name))
+
+        elif isinstance(expr, Index):
+            self.expression(expr.obj)
+            self.expression(expr.index)
+            self.emit(INDEX)
+
+        elif isinstance(expr, SetIndex):
+            self.expression(expr.obj)
+            self.expression(expr.index)
+            self.expression(expr.value)
+            self.emit(SET_INDEX)
+
+        elif isinstance(expr, ArrayLiteral):
+            for element in expr.elements:
+                self.expression(element)
+            self.emit(BUILD_ARRAY, len(expr.elements))
+
+        elif isinstance(expr, ObjectLiteral):
+            for _, value in expr.properties:
+                self.expression(value)
+            keys = tuple(key for key, _ in expr.properties)
+            self.emit(BUILD_OBJECT, self.constant(keys))
+
+        elif isinstance(expr, LambdaExpression):
+            code = self.compile_function("<lambda>", expr.params,
+                                         expr.body if isinstance(expr.body, ReturnStatement) else expr.body.statements,
+                                         expr)
+            self.emit(MAKE_LAMBDA, self.constant(code))
+
+        else:
+            raise CompileError(f"Cannot compile expression {expr}.")
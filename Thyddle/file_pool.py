@@ -0,0 +1,104 @@
+# file_pool.py
+import atexit
+import os
+import weakref
+
+# Most files kept open for io.file.modify.append/write at once
+POOL_SIZE = 16
+
+class FilePool:
+    """
+    Keeps the files written by io.file.modify.append/write open between
+    calls, so a loop appending to a log doesn't open and close it every time.
+    Files are opened in append mode; a write truncates first. The least
+    recently used file is closed when the pool is full.
+
+    Written data sits in the file's buffer until it is flushed: before
+    io.file reads the same path, when the file leaves the pool, and at exit.
+    Writer handles from io.file.open are flushed at exit too. While a handle
+    is open on a path, the pool flushes it before each append or write and
+    flushes its own file after, so the two keep the order they were written in.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.files = {}                   # absolute path -> open file, oldest first
+        self.handles = weakref.WeakSet()  # writer handles opened by Thyddle code
+        self.opens = 0
+
+    def get(self, path):
+        # `path` is absolute
+        f = self.files.pop(path, None)
+        if f is None:
+            # Raises OSError, like open()
+            f = open(path, "a", encoding="utf-8")
+            self.opens += 1
+            if len(self.files) >= self.size:
+                self.close(next(iter(self.files)))
+        # Most recently used last
+        self.files[path] = f
+        return f
+
+    def append(self, path, text):
+        path = os.path.abspath(path)
+        shared = self.flush_handles(path)
+        f = self.get(path)
+        f.write(text)
+        if shared:
+            # A handle's next write has to land after this one
+            f.flush()
+
+    def write(self, path, text):
+        path = os.path.abspath(path)
+        shared = self.flush_handles(path)
+        f = self.get(path)
+        f.seek(0)
+        f.truncate()
+        f.write(text)
+        if shared:
+            f.flush()
+
+    def track(self, handle):
+        # A writer handle (anything with a path and a file) to flush at exit
+        self.handles.add(handle)
+
+    def flush_handles(self, path):
+        # Flushes the writer handles open on the absolute `path`, so what they
+        # wrote goes first. Returns whether there were any.
+        found = False
+        for handle in list(self.handles):
+            if not handle.file.closed and os.path.abspath(handle.path) == path:
+                handle.file.flush()
+                found = True
+        return found
+
+    def flush(self, path):
+        # Makes everything written to `path` so far visible to a reader
+        path = os.path.abspath(path)
+        f = self.files.get(path)
+        if f is not None:
+            f.flush()
+        self.flush_handles(path)
+
+    def close(self, path):
+        f = self.files.pop(os.path.abspath(path), None)
+        if f is not None:
+            f.close()
+
+    def close_all(self):
+        for path in list(self.files):
+            try:
+                self.close(path)
+            except OSError:
+                # Disk full or gone; nothing more can be done for this file at exit
+                pass
+        for handle in list(self.handles):
+            try:
+                if not handle.file.closed:
+                    handle.file.flush()
+            except OSError:
+                pass
+
+# Shared by every Interpreter in the process
+file_pool = FilePool()
+atexit.register(file_pool.close_all)
@@ -1,122 +1,328 @@
 # interpreter.py
+import array as pyarray
 import math
+import mmap
+import operator
+import os
 import random
+import sys
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    # Optional: the bulk array operations use it for typed arrays when present
+    numpy = None
 
 from Thyddle.lexer import TokenType
-from Thyddle.lexer import Lexer
-from Thyddle.parser import Parser
+from Thyddle.lexer import Lexer, FastLexer
+from Thyddle.parser import Parser, NOT_CACHED
+from Thyddle.resolver import Resolver
+from Thyddle.optimizer import Optimizer, LenCall, HoistedLenCall
+from Thyddle.module_cache import module_cache
+from Thyddle.file_pool import file_pool
 from Thyddle.parser import (
     Expression, Binary, Grouping, Literal, Unary, Variable, Assign, Logical,
     Call, Get, Set, Index, SetIndex, ArrayLiteral, ObjectLiteral, Statement,
     ExpressionStatement, VarStatement, BlockStatement, IfStatement, WhileStatement,
-    ForStatement, FunctionStatement, ReturnStatement, BreakStatement, ContinueStatement,
-    ImportStatement, LambdaExpression
+    ForStatement, ForInStatement, FunctionStatement, ReturnStatement, BreakStatement,
+    ContinueStatement, ImportStatement, LambdaExpression
 )
 
-class ReturnValue(Exception):
-    def __init__(self, value):
-        self.value = value
-        super().__init__(self)
-
-class BreakException(Exception):
-    pass
-
-class ContinueException(Exception):
-    pass
+# How the last statement finished. return/break/continue set
+# Interpreter.completion instead of raising, and blocks, loops and calls check it.
+NORMAL = 0
+BREAK = 1
+CONTINUE = 2
+RETURN = 3
 
 class ThyddleRuntimeError(Exception):
     def __init__(self, message):
         self.message = message
         super().__init__(self.message)
 
+# Marks a slot whose declaration has not run yet
+UNSET = object()
+
+# Quickened Binary nodes. The first time a Binary node runs, it rewrites
+# itself (by assigning __class__) into one of these subclasses, which share
+# its slots but have their own evaluator without the operator dispatch:
+# a Number* node when both operands were numbers, Equal/NotEqual for == and
+# != whatever the operands, GenericBinary otherwise. A Number* node that
+# later gets anything but numbers turns into a GenericBinary for good.
+NUMBER = (int, float)
+
+class GenericBinary(Binary):
+    __slots__ = ()
+
+class NumberAdd(Binary):
+    __slots__ = ()
+
+class NumberSubtract(Binary):
+    __slots__ = ()
+
+class NumberMultiply(Binary):
+    __slots__ = ()
+
+class NumberDivide(Binary):
+    __slots__ = ()
+
+class NumberModulo(Binary):
+    __slots__ = ()
+
+class NumberGreater(Binary):
+    __slots__ = ()
+
+class NumberGreaterEqual(Binary):
+    __slots__ = ()
+
+class NumberLess(Binary):
+    __slots__ = ()
+
+class NumberLessEqual(Binary):
+    __slots__ = ()
+
+class Equal(Binary):
+    __slots__ = ()
+
+class NotEqual(Binary):
+    __slots__ = ()
+
+QUICKENED_BINARIES = {
+    TokenType.PLUS: NumberAdd,
+    TokenType.MINUS: NumberSubtract,
+    TokenType.STAR: NumberMultiply,
+    TokenType.SLASH: NumberDivide,
+    TokenType.MODULO: NumberModulo,
+    TokenType.GREATER: NumberGreater,
+    TokenType.GREATER_EQUAL: NumberGreaterEqual,
+    TokenType.LESS: NumberLess,
+    TokenType.LESS_EQUAL: NumberLessEqual,
+    TokenType.EQUAL_EQUAL: Equal,
+    TokenType.BANG_EQUAL: NotEqual,
+}
+EQUALITY_OPERATORS = (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+
+# Shared by every environment nothing has been defined in by name, or
+# made constant; define() and define_slot() give it its own first. Most
+# environments (calls, blocks, loops) only ever use their slots.
+NO_VALUES = {}
+NO_CONSTANTS = frozenset()
+
 class Environment:
-    def __init__(self, enclosing=None):
-        self.values = {}
-        self.constants = set()
+    __slots__ = ("values", "constants", "enclosing", "slots", "names", "frozen")
+    
+    # Set once anything but the builtins defines a `len`; loops stop trusting
+    # the len() they hoisted (see Interpreter.hoist_lengths)
+    len_rebound = False
+    
+    def __init__(self, enclosing=None, size=0, names=None, slots=None):
+        self.values = NO_VALUES
+        self.constants = NO_CONSTANTS
         self.enclosing = enclosing
+        # Variables the Resolver bound to an index live in slots; `names` maps
+        # them back for lookups by name. A caller can pass the slot list
+        # ready-made (see ThyddleFunction.frame).
+        self.slots = [UNSET] * size if slots is None else slots
+        self.names = names
+        self.frozen = False
     
     def define(self, name, value, is_const=False):
+        if self.values is NO_VALUES:
+            self.values = {}
         self.values[name] = value
+        if name == "len" and self.enclosing is not None:
+            Environment.len_rebound = True
+        if is_const:
+            self.add_constant(name)
+    
+    def define_slot(self, slot, name, value, is_const=False):
+        self.slots[slot] = value
         if is_const:
-            self.constants.add(name)
+            self.add_constant(name)
+    
+    def add_constant(self, name):
+        if self.constants is NO_CONSTANTS:
+            self.constants = set()
+        self.constants.add(name)
     
     def get(self, name):
-        if name in self.values:
-            return self.values[name]
-        
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
+        environment = self
+        while environment is not None:
+            if name in environment.values:
+                value = environment.values[name]
+                if environment.frozen and value.__class__ is ThyddleObject:
+                    return self.own_copy(environment, name, value)
+                return value
+            
+            if environment.names is not None and name in environment.names:
+                value = environment.slots[environment.names[name]]
+                if value is not UNSET:
+                    return value
+            
+            environment = environment.enclosing
         
         raise ThyddleRuntimeError(f"Undefined variable '{name}'.")
     
+    def own_copy(self, builtins, name, value):
+        """
+        Built-in objects are shared by every Interpreter. The first time one
+        looks up an object it gets its own copy, defined in its globals (the
+        environment just inside `builtins`), so changing it doesn't affect
+        the others.
+        """
+        if self is builtins:
+            return value
+        environment = self
+        while environment.enclosing is not builtins:
+            environment = environment.enclosing
+        value = value.thaw()
+        environment.define(name, value)
+        return value
+    
     def assign(self, name, value):
-        if name in self.constants:
-            raise ThyddleRuntimeError(f"Cannot reassign constant '{name}'.")
-        
-        if name in self.values:
-            self.values[name] = value
-            return
+        environment = self
+        previous = None
+        while environment is not None:
+            if name in environment.constants:
+                raise ThyddleRuntimeError(f"Cannot reassign constant '{name}'.")
+            
+            if name in environment.values:
+                if environment.frozen:
+                    # Shadow the shared builtin instead of changing it for everyone
+                    previous.define(name, value)
+                else:
+                    environment.values[name] = value
+                return
+            
+            if environment.names is not None and name in environment.names:
+                slot = environment.names[name]
+                if environment.slots[slot] is not UNSET:
+                    environment.slots[slot] = value
+                    return
+            
+            previous = environment
+            environment = environment.enclosing
         
-        if self.enclosing is not None:
-            self.enclosing.assign(name, value)
-            return
+        raise ThyddleRuntimeError(f"Undefined variable '{name}'.")
+    
+    def locate(self, name):
+        """
+        Returns (container, key) for where assign() would store `name`, or
+        None when assigning would shadow a frozen builtin. Raises like assign().
+        """
+        environment = self
+        while environment is not None:
+            if name in environment.constants:
+                raise ThyddleRuntimeError(f"Cannot reassign constant '{name}'.")
+            
+            if name in environment.values:
+                if environment.frozen:
+                    return None
+                return environment.values, name
+            
+            if environment.names is not None and name in environment.names:
+                slot = environment.names[name]
+                if environment.slots[slot] is not UNSET:
+                    return environment.slots, slot
+            
+            environment = environment.enclosing
         
         raise ThyddleRuntimeError(f"Undefined variable '{name}'.")
 
 
+# Most Thyddle calls that can be active at once, unless Interpreter is
+# given another max_depth
+MAX_DEPTH = 10000
+# Python frames a Thyddle call can take (call, execute, evaluate, blocks and
+# loops in between), to size Python's recursion limit from max_depth
+PYTHON_FRAMES_PER_CALL = 30
+
+# Returned by a function body that ended in `return f(...)`: the call to
+# make next is in Interpreter.tail_function/tail_arguments
+TAIL_CALL = object()
+
 class ThyddleFunction:
     def __init__(self, declaration, closure):
         self.declaration = declaration
         self.closure = closure
+        self.statements = declaration.body
     
     def call(self, interpreter, arguments):
-        environment = Environment(self.closure)
-        
-        for i in range(len(self.declaration.params)):
-            environment.define(
-                self.declaration.params[i].lexeme, 
-                arguments[i]
-            )
-        
+        if interpreter.depth >= interpreter.max_depth:
+            raise ThyddleRuntimeError(f"Stack overflow: more than {interpreter.max_depth} nested calls.")
+        interpreter.depth += 1
         try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except ReturnValue as return_value:
-            return return_value.value
-        
-        return None
+            function = self
+            while True:
+                value = function.run(interpreter, arguments)
+                if value is not TAIL_CALL:
+                    return value
+                # Tail call: run the callee here, in constant Python stack
+                function = interpreter.tail_function
+                arguments = interpreter.tail_arguments
+                interpreter.tail_function = interpreter.tail_arguments = None
+        finally:
+            interpreter.depth -= 1
+    
+    def frame(self, arguments):
+        """
+        The environment for one call: the parameters take the first slots
+        (the Resolver puts them there), so the slot list is built from the
+        arguments in one step. Extra arguments are ignored.
+        """
+        declaration = self.declaration
+        count = len(declaration.params)
+        if len(arguments) < count:
+            raise ThyddleRuntimeError(f"Expected {count} arguments but got {len(arguments)}.")
+        slots = arguments[:count]
+        if declaration.scope_size > count:
+            slots += [UNSET] * (declaration.scope_size - count)
+        return Environment(self.closure, declaration.scope_size, declaration.scope_names, slots)
+    
+    def run(self, interpreter, arguments):
+        # execute_block, inlined: one Python call less per Thyddle call
+        environment = self.frame(arguments)
+        previous = interpreter.environment
+        interpreter.environment = environment
+        try:
+            for statement in self.statements:
+                interpreter.execute(statement)
+                if interpreter.completion != NORMAL:
+                    break
+        finally:
+            interpreter.environment = previous
+        return interpreter.finish_call()
     
     def __str__(self):
-        return f"<function {self.declaration.name.lexeme}>"
+        return f"<function {self.declaration.name}>"
 
 class ThyddleLambda(ThyddleFunction):
     def __init__(self, declaration, closure):
         self.declaration = declaration  # LambdaExpression
         self.closure = closure          # Environment where lambda was defined
+        # Block-bodied lambdas run like functions; `(x) -> x + 1` has a
+        # ReturnStatement body and no statements
+        body = declaration.body
+        self.statements = body.statements if isinstance(body, BlockStatement) else None
     
-    def call(self, interpreter, arguments):
-        environment = Environment(self.closure)
-        
-        # Bind parameters to arguments
-        for i in range(len(self.declaration.params)):
-            environment.define(
-                self.declaration.params[i].lexeme, 
-                arguments[i]
-            )
+    def run(self, interpreter, arguments):
+        if self.statements is not None:
+            return ThyddleFunction.run(self, interpreter, arguments)
         
-        # Execute the body based on its type
-        if isinstance(self.declaration.body, BlockStatement):
-            try:
-                interpreter.execute_block(self.declaration.body.statements, environment)
-            except ReturnValue as return_value:
-                return return_value.value
-        elif isinstance(self.declaration.body, ReturnStatement):
-            # For expression-bodied lambdas
-            return interpreter.evaluate(self.declaration.body.value)
-            
-        return None
+        # For expression-bodied lambdas
+        body = self.declaration.body
+        previous = interpreter.environment
+        try:
+            interpreter.environment = self.frame(arguments)
+            if body.tail_call:
+                return interpreter.evaluate_tail_call(body.value)
+            return interpreter.evaluate(body.value)
+        finally:
+            interpreter.environment = previous
     
     def __str__(self):
-        params_str = ", ".join(param.lexeme for param in self.declaration.params)
+        params_str = ", ".join(self.declaration.params)
         return f"<lambda ({params_str})>"
 
 class ThyddleArray:
@@ -141,13 +347,159 @@ class ThyddleArray:
         
         self.elements[index] = value
     
+    def derive(self, elements):
+        # A new array of the same kind, for slices and reversed copies
+        return ThyddleArray(elements)
+    
     def __str__(self):
         elements_str = ", ".join(str(elem) for elem in self.elements)
         return f"[{elements_str}]"
 
+# Element kind -> array module type code
+TYPED_ARRAY_KINDS = {
+    "int8": "b",
+    "uint8": "B",
+    "int32": "i",
+    "int64": "q",
+    "float64": "d",
+}
+
+class ThyddleTypedArray(ThyddleArray):
+    """
+    A fixed-kind numeric array stored unboxed in an array.array, so a 30,000
+    cell int8 tape takes 30 KB instead of a list of pointers. It behaves like
+    any other array (indexing, len, type() == "array", append/pop); storing a
+    value the kind can't hold is a runtime error.
+    """
+    
+    def __init__(self, kind, elements):
+        self.kind = kind
+        self.elements = elements
+    
+    @staticmethod
+    def filled(kind, length, value):
+        code = TYPED_ARRAY_KINDS.get(kind)
+        if code is None:
+            raise ThyddleRuntimeError(f"Unknown array kind '{kind}', expected one of: {', '.join(TYPED_ARRAY_KINDS)}.")
+        if not isinstance(length, int) or length < 0:
+            raise ThyddleRuntimeError("Array length must be a non-negative integer.")
+        
+        try:
+            # Repeating a one-element array is a single C-level copy
+            return ThyddleTypedArray(kind, pyarray.array(code, [value]) * length)
+        except (TypeError, OverflowError):
+            raise ThyddleRuntimeError(f"Cannot store {value} in an array of {kind}.")
+    
+    # get/set let the array do the type check on the index and only look
+    # closer when something fails, instead of an isinstance per access.
+    def get(self, index):
+        try:
+            if index >= 0:
+                return self.elements[index]
+        except IndexError:
+            pass
+        except TypeError:
+            raise ThyddleRuntimeError("Array index must be an integer.")
+        raise ThyddleRuntimeError(f"Array index out of bounds: {index}")
+    
+    def set(self, index, value):
+        try:
+            if index >= 0:
+                self.elements[index] = value
+                return
+        except IndexError:
+            pass
+        except (TypeError, OverflowError):
+            if not isinstance(index, int):
+                raise ThyddleRuntimeError("Array index must be an integer.")
+            raise ThyddleRuntimeError(f"Cannot store {value} in an array of {self.kind}.")
+        raise ThyddleRuntimeError(f"Array index out of bounds: {index}")
+    
+    def derive(self, elements):
+        return ThyddleTypedArray(self.kind, elements)
+
+def numpy_view(value):
+    # Zero-copy view of a typed array's storage, or None when numpy isn't
+    # installed or the value isn't a (non-empty) typed array
+    if numpy is None or not isinstance(value, ThyddleTypedArray) or len(value.elements) == 0:
+        return None
+    return numpy.frombuffer(value.elements, dtype=value.elements.typecode)
+
+# An int64 result whose float64 estimate is smaller than this is exact in
+# int64: the estimate is off by far less than the gap up to 2 ** 63
+EXACT_INT64 = 2.0 ** 62
+
+def numpy_elementwise(operator, left, right, kind):
+    """
+    operator(left, right) on a numpy view and a view or number, giving an
+    array of `kind`. Returns None when an int64 result might not fit, so the
+    caller can work it out exactly in Python and raise the same error as it
+    does without numpy. Floats overflow to inf, as in Python.
+    """
+    if isinstance(right, numpy.ndarray):
+        right_float = right.astype("d")
+    else:
+        try:
+            right_float = float(right)
+        except OverflowError:
+            return None
+    
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        estimate = operator(left.astype("d"), right_float)
+    if kind == "float64":
+        return estimate
+    if not isinstance(right, numpy.ndarray) and not -EXACT_INT64 < right < EXACT_INT64:
+        return None
+    if not (numpy.abs(estimate) < EXACT_INT64).all():
+        return None
+    return operator(left.astype("q"), right)
+
+class CacheRef(weakref.ref):
+    # A Get node's reference to the object its inline cache is for
+    __slots__ = ("node",)
+    
+    def __new__(cls, obj, node):
+        ref = super().__new__(cls, obj, forget_cached)
+        ref.node = node
+        return ref
+    
+    def __init__(self, obj, node):
+        super().__init__(obj, forget_cached)
+
+def forget_cached(ref):
+    # The object went away: empty the cache, so its id can't be mistaken for
+    # a new object's and the cached value isn't kept alive
+    node = ref.node
+    if node.cached_ref is ref:
+        node.cached_id = None
+        node.cached_value = None
+        node.cached_ref = None
+
+def cached_property(expr, obj):
+    """
+    The value Get node `expr` last read from `obj`, if its inline cache is
+    for obj and obj hasn't changed since, or NOT_CACHED. A cached object is
+    still alive (see forget_cached), so a matching id is the same object.
+    """
+    if id(obj) == expr.cached_id and obj.version == expr.cached_version:
+        return expr.cached_value
+    return NOT_CACHED
+
+def cache_property(expr, obj, value):
+    # Fills Get node `expr`'s inline cache with `value`, read from `obj`
+    if id(obj) != expr.cached_id:
+        expr.cached_ref = CacheRef(obj, expr)
+        expr.cached_id = id(obj)
+    expr.cached_version = obj.version
+    expr.cached_value = value
+
 class ThyddleObject:
     def __init__(self, properties):
         self.properties = properties
+        self.frozen = False
+        # Bumped on every change, so inline caches on Get nodes can tell a
+        # value they cached from this object is still current
+        self.version = 0
     
     def get(self, name):
         if name in self.properties:
@@ -155,7 +507,27 @@ class ThyddleObject:
         return None
     
     def set(self, name, value):
+        if self.frozen:
+            raise ThyddleRuntimeError("Cannot modify a built-in object.")
         self.properties[name] = value
+        self.version += 1
+    
+    def freeze(self):
+        # Built-in objects are shared by every Interpreter, so they are
+        # read-only; programs change copies of them (see thaw)
+        self.frozen = True
+        for value in self.properties.values():
+            if isinstance(value, ThyddleObject):
+                value.freeze()
+    
+    def thaw(self):
+        # A writable copy of a frozen object, with its frozen objects copied too
+        properties = {}
+        for key, value in self.properties.items():
+            if isinstance(value, ThyddleObject) and value.frozen:
+                value = value.thaw()
+            properties[key] = value
+        return ThyddleObject(properties)
     
     def __str__(self):
         prop_strs = []
@@ -163,13 +535,270 @@ class ThyddleObject:
             prop_strs.append(f"{key}: {value}")
         return f"{{{', '.join(prop_strs)}}}"
 
+class ThyddleFile(ThyddleObject):
+    """
+    A file opened with io.file.open. In "r" mode it is read a line or a chunk
+    at a time, so files of any size can be processed without loading them
+    whole. In "w" and "a" mode writes are buffered (`buffer_size` bytes,
+    Python's default without it) until flush(), close() or exit. Its methods
+    are properties, like any object's:
+
+        var f = io.file.open("big.log");
+        var line = f.read_line();
+        while (line != nothing) { ...; line = f.read_line(); }
+        f.close();
+    """
+    
+    def __init__(self, path, mode="r", buffer_size=-1):
+        if mode not in ("r", "w", "a"):
+            raise ThyddleRuntimeError(f"file.open() unknown mode '{mode}'.")
+        if not isinstance(buffer_size, int) or buffer_size == 0 or buffer_size < -1:
+            raise ThyddleRuntimeError("file.open() buffer size must be a positive integer.")
+        
+        try:
+            if mode == "r":
+                # Anything still buffered for this path goes to disk first
+                file_pool.flush(path)
+            else:
+                # Whatever io.file.modify buffered for this path goes before this
+                # handle's writes; later ones are ordered by FilePool.append/write
+                file_pool.close(path)
+            self.file = open(path, mode, buffering=buffer_size, encoding="utf-8")
+        except OSError as e:
+            raise ThyddleRuntimeError(f"file.open() error: {e}")
+        self.path = path
+        
+        if mode == "r":
+            methods = {
+                "read_line": NativeFunction("read_line", self.read_line),
+                "read": NativeFunction("read", self.read),
+                "each_line": NativeFunction("each_line", self.each_line),
+                "close": NativeFunction("close", self.close)
+            }
+        else:
+            methods = {
+                "write": NativeFunction("write", self.write),
+                "flush": NativeFunction("flush", self.flush),
+                "close": NativeFunction("close", self.close)
+            }
+            file_pool.track(self)
+        super().__init__(methods)
+        self.freeze()
+    
+    def check_open(self, name):
+        if self.file.closed:
+            raise ThyddleRuntimeError(f"file.{name}() on a closed file.")
+    
+    def read_line(self, interpreter, arguments):
+        # The next line without its newline, or nothing at the end of the file
+        self.check_open("read_line")
+        try:
+            line = self.file.readline()
+        except (OSError, UnicodeDecodeError) as e:
+            raise ThyddleRuntimeError(f"file.read_line() error: {e}")
+        
+        if line == "":
+            return None
+        return line[:-1] if line[-1] == "\n" else line
+    
+    def read(self, interpreter, arguments):
+        # Up to `size` characters (the rest of the file without it), or
+        # nothing at the end of the file
+        self.check_open("read")
+        size = arguments[0] if len(arguments) > 0 else -1
+        if not isinstance(size, int):
+            raise ThyddleRuntimeError("file.read() size must be an integer.")
+        try:
+            chunk = self.file.read(size)
+        except (OSError, UnicodeDecodeError) as e:
+            raise ThyddleRuntimeError(f"file.read() error: {e}")
+        
+        if chunk == "" and size != 0:
+            return None
+        return chunk
+    
+    def each_line(self, interpreter, arguments):
+        # Calls fn(line, index) for every remaining line, stopping early if fn
+        # returns false. Returns the number of lines passed to fn.
+        self.check_open("each_line")
+        if len(arguments) != 1 or not isinstance(arguments[0], (ThyddleFunction, NativeFunction)):
+            raise ThyddleRuntimeError("file.each_line() expects a function.")
+        call = arguments[0].call
+        
+        count = 0
+        try:
+            for line in self.file:
+                if line[-1] == "\n":
+                    line = line[:-1]
+                count += 1
+                if call(interpreter, [line, count - 1]) is False:
+                    break
+        except (OSError, UnicodeDecodeError) as e:
+            raise ThyddleRuntimeError(f"file.each_line() error: {e}")
+        return count
+    
+    def write(self, interpreter, arguments):
+        self.check_open("write")
+        if len(arguments) != 1 or not isinstance(arguments[0], str):
+            raise ThyddleRuntimeError("file.write() expects string content")
+        try:
+            self.file.write(arguments[0])
+        except OSError as e:
+            raise ThyddleRuntimeError(f"file.write() error: {e}")
+        return None
+    
+    def flush(self, interpreter, arguments):
+        self.check_open("flush")
+        try:
+            self.file.flush()
+        except OSError as e:
+            raise ThyddleRuntimeError(f"file.flush() error: {e}")
+        return None
+    
+    def close(self, interpreter, arguments):
+        try:
+            self.file.close()
+        except OSError as e:
+            raise ThyddleRuntimeError(f"file.close() error: {e}")
+        return None
+    
+    def __str__(self):
+        return f"<file {self.path}>"
+
+class ThyddleMmap:
+    """
+    A file mapped read-only into memory by io.file.mmap. It works like a
+    read-only string where every byte is one character (decoded as
+    Latin-1), so indexes are byte offsets: len(), data[i], array.slice and
+    array.index_of only touch the pages they need instead of reading the
+    whole file.
+    """
+    
+    def __init__(self, path):
+        try:
+            # Anything still buffered for this path goes to disk first
+            file_pool.flush(path)
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # Empty files can't be mapped
+                    self.data = b""
+                else:
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise ThyddleRuntimeError(f"file.mmap() error: {e}")
+        self.path = path
+    
+    def get(self, index):
+        try:
+            if index >= 0:
+                return chr(self.data[index])
+        except IndexError:
+            pass
+        except TypeError:
+            raise ThyddleRuntimeError("Mmap index must be an integer.")
+        raise ThyddleRuntimeError(f"Mmap index out of bounds: {index}")
+    
+    def slice(self, start, end):
+        return self.data[start:end].decode("latin-1")
+    
+    def find(self, value):
+        if not isinstance(value, str):
+            raise ThyddleRuntimeError("index_of() on an mmap needs a string to find.")
+        try:
+            return self.data.find(value.encode("latin-1"))
+        except UnicodeEncodeError:
+            # Characters above U+00FF can't be in the file as single bytes
+            return -1
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __str__(self):
+        return f"<mmap {self.path} ({len(self.data)} bytes)>"
+
+class ThyddleRange:
+    """
+    The integers from range(), produced one at a time as for-in asks for
+    them instead of being stored in an array.
+    """
+    
+    def __init__(self, values):
+        self.values = values  # a Python range
+    
+    def __len__(self):
+        return len(self.values)
+    
+    def __str__(self):
+        values = self.values
+        if values.step != 1:
+            return f"range({values.start}, {values.stop}, {values.step})"
+        return f"range({values.start}, {values.stop})"
+
+def iteration_values(value):
+    # What for-in walks over: array elements, string characters, object
+    # keys or range() integers. Arrays are walked live, so elements appended
+    # in the loop are visited too; object keys are copied first.
+    if isinstance(value, ThyddleArray):
+        return iter(value.elements)
+    if isinstance(value, ThyddleRange):
+        return iter(value.values)
+    if isinstance(value, str):
+        return iter(value)
+    if isinstance(value, ThyddleObject):
+        return iter(list(value.properties))
+    raise ThyddleRuntimeError("for-in needs an array, string, object or range.")
+
 class Interpreter:
-    def __init__(self):
-        self.globals = Environment()
+    # Builtins are built once and shared by every Interpreter; each one gets
+    # its own globals on top of them, and copies of the built-in objects it
+    # uses (Environment.own_copy).
+    builtins = None
+    # The built-in len(), which LenCall nodes check their callee against
+    len_function = None
+    
+    def __init__(self, use_vm=False, shared_globals=False, fast_lexer=False, optimize=True,
+                 max_depth=MAX_DEPTH):
+        if Interpreter.builtins is None:
+            builtins = Environment()
+            self.setup_stdlib(builtins)
+            for value in builtins.values.values():
+                if isinstance(value, ThyddleObject):
+                    value.freeze()
+            builtins.frozen = True
+            Interpreter.builtins = builtins
+            Interpreter.len_function = builtins.get("len")
+        
+        self.globals = Environment(Interpreter.builtins)
         self.environment = self.globals
-        self.setup_stdlib()
+        self.completion = NORMAL
+        self.return_value = None
+        self.use_vm = use_vm
+        # When set, interpret() and eval() run against this interpreter's
+        # globals instead of a fresh interpreter
+        self.shared_globals = shared_globals
+        # FastLexer gives the same tokens as Lexer, matched with one regex
+        self.fast_lexer = fast_lexer
+        self.lexer_class = FastLexer if fast_lexer else Lexer
+        # Fold constants and drop dead branches before resolving (see Optimizer)
+        self.optimize = optimize
+        self.module_cache = module_cache
+        # Thyddle calls in progress; deeper than max_depth is a stack overflow
+        self.depth = 0
+        self.max_depth = max_depth
+        # Python's recursion limit while this interpreter runs code (see
+        # run_statements)
+        self.recursion_limit = max_depth * PYTHON_FRAMES_PER_CALL + 1000
+        self.tail_function = None
+        self.tail_arguments = None
+        # HoistedLenCall -> the string length or array its running loop
+        # looked up before it started
+        self.hoisted_lengths = {}
+        self.vm = None
+        if use_vm:
+            from Thyddle.vm import VM  # vm.py imports this module
+            self.vm = VM(self)
     
-    def setup_stdlib(self):
+    def setup_stdlib(self, builtins):
         # Define print function
         def print_fn(interpreter, arguments):
             print(*arguments)
@@ -250,8 +879,12 @@ class Interpreter:
                 return "array"
             elif isinstance(value, ThyddleObject):
                 return "object"
+            elif isinstance(value, ThyddleMmap):
+                return "mmap"
+            elif isinstance(value, ThyddleRange):
+                return "range"
             
-            raise ThyddleRuntimeError("type() requires a string, number, array, or object.")
+            raise ThyddleRuntimeError("type() requires a string, number, array, object, mmap, or range.")
         
         # Define string functions
         def len_fn(interpreter, arguments):
@@ -264,8 +897,10 @@ class Interpreter:
                 return len(arguments[0].elements)
             elif isinstance(arguments[0], ThyddleObject):
                 return len(arguments[0].properties)
+            elif isinstance(arguments[0], (ThyddleMmap, ThyddleRange)):
+                return len(arguments[0])
             else:
-                raise ThyddleRuntimeError("len() requires a string, array, or object.")
+                raise ThyddleRuntimeError("len() requires a string, array, object, mmap, or range.")
         
         def appnd_fn(interpreter, arguments):
             if len(arguments) != 2:
@@ -277,9 +912,150 @@ class Interpreter:
             if not isinstance(array, ThyddleArray):
                 raise ThyddleRuntimeError("First argument must be an array.")
             
-            array.elements.append(value)
+            try:
+                array.elements.append(value)
+            except (TypeError, OverflowError):
+                # Only typed arrays refuse values
+                raise ThyddleRuntimeError(f"Cannot store {value} in an array of {array.kind}.")
             return None
         
+        def sequence_arg(value, name):
+            # Arrays, and strings as sequences of characters
+            if isinstance(value, ThyddleArray):
+                return value.elements
+            if isinstance(value, str):
+                return value
+            raise ThyddleRuntimeError(f"{name}() requires an array or string.")
+        
+        def function_arg(value, name):
+            # The bound call method, looked up once instead of per element
+            if not isinstance(value, (ThyddleFunction, NativeFunction)):
+                raise ThyddleRuntimeError(f"{name}() expects a function.")
+            return value.call
+        
+        def join_fn(interpreter, arguments):
+            if len(arguments) < 1 or len(arguments) > 2:
+                raise ThyddleRuntimeError("join() takes one or two arguments.")
+            
+            elements = sequence_arg(arguments[0], "join")
+            separator = arguments[1] if len(arguments) == 2 else ""
+            
+            if not isinstance(separator, str):
+                raise ThyddleRuntimeError("join() separator must be a string.")
+            
+            # Elements are turned into strings the same way `+` does it
+            return separator.join(
+                element if isinstance(element, str) else str(element) for element in elements
+            )
+        
+        def map_fn(interpreter, arguments):
+            if len(arguments) != 2:
+                raise ThyddleRuntimeError("map() takes exactly two arguments.")
+            
+            elements = sequence_arg(arguments[0], "map")
+            call = function_arg(arguments[1], "map")
+            
+            # fn gets (element, index). The length is checked every time, as
+            # in the .thy version, in case fn changes the array.
+            result = []
+            index = 0
+            while index < len(elements):
+                result.append(call(interpreter, [elements[index], index]))
+                index += 1
+            return ThyddleArray(result)
+        
+        def filter_fn(interpreter, arguments):
+            if len(arguments) != 2:
+                raise ThyddleRuntimeError("filter() takes exactly two arguments.")
+            
+            elements = sequence_arg(arguments[0], "filter")
+            call = function_arg(arguments[1], "filter")
+            
+            result = []
+            index = 0
+            while index < len(elements):
+                element = elements[index]
+                if interpreter.is_truthy(call(interpreter, [element, index])):
+                    result.append(element)
+                index += 1
+            return ThyddleArray(result)
+        
+        def reduce_fn(interpreter, arguments):
+            if len(arguments) < 2 or len(arguments) > 3:
+                raise ThyddleRuntimeError("reduce() takes two or three arguments.")
+            
+            elements = sequence_arg(arguments[0], "reduce")
+            call = function_arg(arguments[1], "reduce")
+            
+            # fn gets (accumulator, element, index); without an initial value
+            # the first element is used
+            if len(arguments) == 3:
+                accumulator = arguments[2]
+                index = 0
+            elif len(elements) > 0:
+                accumulator = elements[0]
+                index = 1
+            else:
+                raise ThyddleRuntimeError("reduce() of an empty array with no initial value.")
+            
+            while index < len(elements):
+                accumulator = call(interpreter, [accumulator, elements[index], index])
+                index += 1
+            return accumulator
+        
+        def slice_fn(interpreter, arguments):
+            if len(arguments) < 2 or len(arguments) > 3:
+                raise ThyddleRuntimeError("slice() takes two or three arguments.")
+            
+            elements = arguments[0] if isinstance(arguments[0], ThyddleMmap) else sequence_arg(arguments[0], "slice")
+            start = arguments[1]
+            end = arguments[2] if len(arguments) == 3 else None
+            
+            if not isinstance(start, int) or not (end is None or isinstance(end, int)):
+                raise ThyddleRuntimeError("slice() indices must be integers.")
+            
+            # Python slicing: negative indices count from the end, out of range ones are clamped
+            if isinstance(elements, str):
+                return elements[start:end]
+            if isinstance(elements, ThyddleMmap):
+                return elements.slice(start, end)
+            return arguments[0].derive(elements[start:end])
+        
+        def index_of_fn(interpreter, arguments):
+            if len(arguments) != 2:
+                raise ThyddleRuntimeError("index_of() takes exactly two arguments.")
+            
+            if isinstance(arguments[0], ThyddleMmap):
+                return arguments[0].find(arguments[1])
+            
+            elements = sequence_arg(arguments[0], "index_of")
+            value = arguments[1]
+            
+            if isinstance(elements, str):
+                if not isinstance(value, str):
+                    raise ThyddleRuntimeError("index_of() on a string needs a string to find.")
+                return elements.find(value)
+            
+            for index, element in enumerate(elements):
+                if interpreter.is_equal(element, value):
+                    return index
+            return -1
+        
+        def chars_fn(interpreter, arguments):
+            if len(arguments) != 1:
+                raise ThyddleRuntimeError("chars() takes exactly one argument.")
+            
+            return ThyddleArray(list(sequence_arg(arguments[0], "chars")))
+        
+        def reverse_sequence_fn(interpreter, arguments):
+            if len(arguments) != 1:
+                raise ThyddleRuntimeError("reverse() takes exactly one argument.")
+            
+            elements = sequence_arg(arguments[0], "reverse")
+            if isinstance(elements, str):
+                return elements[::-1]
+            return arguments[0].derive(elements[::-1])
+        
         def revrs_fn(interpreter, arguments):
             if len(arguments) != 1:
                 raise ThyddleRuntimeError("reverse() takes exactly one argument.")
@@ -289,7 +1065,7 @@ class Interpreter:
             ret = None
             
             if isinstance(obj, ThyddleArray):
-                ret = ThyddleArray(obj.elements[::-1])
+                ret = obj.derive(obj.elements[::-1])
             elif isinstance(obj, ThyddleObject):
                 ret = ThyddleObject({k: v for k, v in reversed(obj.properties.items())})
             else:
@@ -325,6 +1101,39 @@ class Interpreter:
             return value
 
         
+        def zeros_fn(interpreter, arguments):
+            if len(arguments) < 1 or len(arguments) > 2:
+                raise ThyddleRuntimeError("zeros() takes one or two arguments.")
+            
+            kind = arguments[1] if len(arguments) == 2 else "int64"
+            return ThyddleTypedArray.filled(kind, arguments[0], 0)
+        
+        def fill_fn(interpreter, arguments):
+            if len(arguments) < 2 or len(arguments) > 3:
+                raise ThyddleRuntimeError("fill() takes two or three arguments.")
+            
+            length = arguments[0]
+            value = arguments[1]
+            
+            # With a kind the array is typed, otherwise it can hold anything
+            if len(arguments) == 3:
+                return ThyddleTypedArray.filled(arguments[2], length, value)
+            
+            if not isinstance(length, int) or length < 0:
+                raise ThyddleRuntimeError("Array length must be a non-negative integer.")
+            return ThyddleArray([value] * length)
+        
+        def kind_fn(interpreter, arguments):
+            if len(arguments) != 1:
+                raise ThyddleRuntimeError("kind() takes exactly one argument.")
+            
+            array = arguments[0]
+            if isinstance(array, ThyddleTypedArray):
+                return array.kind
+            if isinstance(array, ThyddleArray):
+                return "any"
+            raise ThyddleRuntimeError("kind() requires an array.")
+        
         def abs_fn(interpreter, arguments):
             if not isinstance(arguments[0], (float, int)):
                 raise ThyddleRuntimeError("math.abs() takes in a number value")
@@ -430,21 +1239,247 @@ class Interpreter:
                 raise ThyddleRuntimeError("math.uniform() takes two integer values")
             return random.randint(arguments[0], arguments[1])
         
+        # Bulk array operations. Plain arrays are handled with Python's own
+        # loops over the element list; typed arrays go through numpy when it
+        # is installed, and produce typed (int64 or float64) results.
+        def numbers_arg(value, name):
+            if not isinstance(value, ThyddleArray):
+                raise ThyddleRuntimeError(f"{name}() requires an array.")
+            return value.elements
+        
+        def aggregate(name, arguments, python_fn, numpy_method):
+            if len(arguments) != 1:
+                raise ThyddleRuntimeError(f"{name}() takes exactly one argument.")
+            
+            elements = numbers_arg(arguments[0], name)
+            if len(elements) == 0 and name != "sum":
+                raise ThyddleRuntimeError(f"{name}() of an empty array.")
+            
+            view = numpy_view(arguments[0])
+            try:
+                if view is not None:
+                    return getattr(view, numpy_method)().item()
+                return python_fn(elements)
+            except TypeError:
+                raise ThyddleRuntimeError(f"{name}() requires an array of numbers.")
+        
+        def sum_fn(interpreter, arguments):
+            return aggregate("sum", arguments, sum, "sum")
+        
+        def min_fn(interpreter, arguments):
+            return aggregate("min", arguments, min, "min")
+        
+        def max_fn(interpreter, arguments):
+            return aggregate("max", arguments, max, "max")
+        
+        def mean_fn(interpreter, arguments):
+            return aggregate("mean", arguments, lambda elements: sum(elements) / len(elements), "mean")
+        
+        def result_kind(*values):
+            # Typed results are int64 unless a float is involved
+            for value in values:
+                if isinstance(value, float) or getattr(value, "kind", None) == "float64":
+                    return "float64"
+            return "int64"
+        
+        def elementwise(name, arguments, python_operator, numpy_operator):
+            if len(arguments) != 2:
+                raise ThyddleRuntimeError(f"{name}() takes exactly two arguments.")
+            
+            left, right = arguments
+            left_elements = numbers_arg(left, name)
+            
+            # The second operand is an array of the same length, or a number
+            # applied to every element
+            if isinstance(right, ThyddleArray):
+                if len(right.elements) != len(left_elements):
+                    raise ThyddleRuntimeError(f"{name}() requires arrays of the same length.")
+                typed = isinstance(left, ThyddleTypedArray) and isinstance(right, ThyddleTypedArray)
+            elif isinstance(right, (int, float)):
+                typed = isinstance(left, ThyddleTypedArray)
+            else:
+                raise ThyddleRuntimeError(f"{name}() requires an array or a number as its second argument.")
+            
+            kind = result_kind(left, right) if typed else None
+            
+            left_view = numpy_view(left) if typed else None
+            right_view = numpy_view(right) if isinstance(right, ThyddleArray) else right
+            if left_view is not None and right_view is not None:
+                result = numpy_elementwise(numpy_operator, left_view, right_view, kind)
+                if result is not None:
+                    return ThyddleTypedArray(kind, pyarray.array(TYPED_ARRAY_KINDS[kind], result.tobytes()))
+                # Might not fit: the loop below finds out exactly
+            
+            try:
+                if isinstance(right, ThyddleArray):
+                    result = [python_operator(x, y) for x, y in zip(left_elements, right.elements)]
+                else:
+                    result = [python_operator(x, right) for x in left_elements]
+                if typed:
+                    return ThyddleTypedArray(kind, pyarray.array(TYPED_ARRAY_KINDS[kind], result))
+            except TypeError:
+                raise ThyddleRuntimeError(f"{name}() requires arrays of numbers.")
+            except OverflowError:
+                raise ThyddleRuntimeError(f"{name}() result does not fit in an array of {kind}.")
+            return ThyddleArray(result)
+        
+        def add_fn(interpreter, arguments):
+            return elementwise("add", arguments, operator.add, numpy and numpy.add)
+        
+        def mul_fn(interpreter, arguments):
+            return elementwise("mul", arguments, operator.mul, numpy and numpy.multiply)
+        
+        def scale_fn(interpreter, arguments):
+            if len(arguments) != 2 or not isinstance(arguments[1], (int, float)):
+                raise ThyddleRuntimeError("scale() takes an array and a number.")
+            return elementwise("scale", arguments, operator.mul, numpy and numpy.multiply)
+        
+        def sort_fn(interpreter, arguments):
+            if len(arguments) != 1:
+                raise ThyddleRuntimeError("sort() takes exactly one argument.")
+            
+            array = arguments[0]
+            elements = numbers_arg(array, "sort")
+            
+            view = numpy_view(array)
+            if view is not None:
+                return array.derive(pyarray.array(elements.typecode, numpy.sort(view).tobytes()))
+            
+            try:
+                ordered = sorted(elements)
+            except TypeError:
+                raise ThyddleRuntimeError("sort() can't compare the elements of this array.")
+            
+            if isinstance(array, ThyddleTypedArray):
+                return array.derive(pyarray.array(elements.typecode, ordered))
+            return ThyddleArray(ordered)
+        
+        def concat_fn(interpreter, arguments):
+            if len(arguments) < 1:
+                raise ThyddleRuntimeError("concat() takes at least one argument.")
+            
+            for argument in arguments:
+                numbers_arg(argument, "concat")
+            
+            # Typed arrays of one kind stay typed, anything else gives a plain array
+            first = arguments[0]
+            if isinstance(first, ThyddleTypedArray) and all(
+                isinstance(argument, ThyddleTypedArray) and argument.kind == first.kind for argument in arguments
+            ):
+                elements = pyarray.array(first.elements.typecode)
+                for argument in arguments:
+                    elements.extend(argument.elements)
+                return first.derive(elements)
+            
+            elements = []
+            for argument in arguments:
+                elements.extend(argument.elements)
+            return ThyddleArray(elements)
+        
+        def range_arguments(arguments):
+            if len(arguments) < 1 or len(arguments) > 3:
+                raise ThyddleRuntimeError("range() takes one to three arguments.")
+            
+            # range(stop), range(start, stop) or range(start, stop, step)
+            for argument in arguments:
+                if not isinstance(argument, int):
+                    raise ThyddleRuntimeError("range() arguments must be integers.")
+            if len(arguments) == 3 and arguments[2] == 0:
+                raise ThyddleRuntimeError("range() step can't be zero.")
+            
+            return range(*arguments)
+        
+        def range_fn(interpreter, arguments):
+            return ThyddleArray(list(range_arguments(arguments)))
+        
+        def lazy_range_fn(interpreter, arguments):
+            return ThyddleRange(range_arguments(arguments))
+        
+        # math function -> (Python function, numpy ufunc name), for math.map
+        vector_math = {
+            abs_fn: (abs, "abs"),
+            sqrt_root_fn: (math.sqrt, "sqrt"),
+            sin_fn: (math.sin, "sin"),
+            cos_fn: (math.cos, "cos"),
+            tan_fn: (math.tan, "tan"),
+            sinh_fn: (math.sinh, "sinh"),
+            cosh_fn: (math.cosh, "cosh"),
+            tanh_fn: (math.tanh, "tanh"),
+            asin_fn: (math.asin, "arcsin"),
+            acos_fn: (math.acos, "arccos"),
+            atan_fn: (math.atan, "arctan"),
+            asinh_fn: (math.asinh, "arcsinh"),
+            acosh_fn: (math.acosh, "arccosh"),
+            atanh_fn: (math.atanh, "arctanh"),
+            floor_fn: (math.floor, "floor"),
+            ceil_fn: (math.ceil, "ceil"),
+            rad_fn: (math.radians, "radians"),
+        }
+        
+        def math_map_fn(interpreter, arguments):
+            if len(arguments) != 2:
+                raise ThyddleRuntimeError("math.map() takes exactly two arguments.")
+            
+            array, function = arguments
+            elements = numbers_arg(array, "math.map")
+            
+            vectorized = vector_math.get(function.function) if isinstance(function, NativeFunction) else None
+            if vectorized is None:
+                # Any other function is called once per element
+                call = function_arg(function, "math.map")
+                return ThyddleArray([call(interpreter, [element]) for element in elements])
+            
+            python_fn, numpy_name = vectorized
+            try:
+                if not isinstance(array, ThyddleTypedArray):
+                    return ThyddleArray([python_fn(element) for element in elements])
+                
+                view = numpy_view(array)
+                if view is not None:
+                    with numpy.errstate(all="raise"):
+                        result = getattr(numpy, numpy_name)(view.astype("d"))
+                    return ThyddleTypedArray("float64", pyarray.array("d", result.tobytes()))
+                return ThyddleTypedArray("float64", pyarray.array("d", [python_fn(element) for element in elements]))
+            except TypeError:
+                raise ThyddleRuntimeError("math.map() requires an array of numbers.")
+            except (ValueError, OverflowError, FloatingPointError):
+                raise ThyddleRuntimeError("math.map() went outside the function's domain.")
+        
         def read_file_fn(interpreter, arguments):
             if not isinstance(arguments[0], str):
                 raise ThyddleRuntimeError("file.read() expects a string filename")
             try:
+                file_pool.flush(arguments[0])
                 with open(arguments[0], 'r', encoding='utf-8') as f:
                     return f.read()
             except Exception as e:
                 raise ThyddleRuntimeError(f"file.read() error: {e}")
             
+        def open_file_fn(interpreter, arguments):
+            if len(arguments) < 1 or len(arguments) > 3 or not isinstance(arguments[0], str):
+                raise ThyddleRuntimeError("file.open() expects a filename, and optionally a mode and buffer size")
+            return ThyddleFile(*arguments)
+        
+        def lines_file_fn(interpreter, arguments):
+            if len(arguments) != 2 or not isinstance(arguments[0], str):
+                raise ThyddleRuntimeError("file.lines() expects a filename and a function")
+            handle = ThyddleFile(arguments[0])
+            try:
+                return handle.each_line(interpreter, arguments[1:])
+            finally:
+                handle.file.close()
+        
+        def mmap_file_fn(interpreter, arguments):
+            if len(arguments) != 1 or not isinstance(arguments[0], str):
+                raise ThyddleRuntimeError("file.mmap() expects a string filename")
+            return ThyddleMmap(arguments[0])
+        
         def write_file_fn(interpreter, arguments):
             if not (isinstance(arguments[0], str) and isinstance(arguments[1], str)):
                 raise ThyddleRuntimeError("file.write() expects a filename and string content")
             try:
-                with open(arguments[0], 'w', encoding='utf-8') as f:
-                    f.write(arguments[1])
+                # Kept open for the next call (see FilePool)
+                file_pool.write(arguments[0], arguments[1])
                 return None  # or maybe return True?
             except Exception as e:
                 raise ThyddleRuntimeError(f"file.write() error: {e}")
@@ -453,8 +1488,7 @@ class Interpreter:
             if not (isinstance(arguments[0], str) and isinstance(arguments[1], str)):
                 raise ThyddleRuntimeError("file.append() expects a filename and string content")
             try:
-                with open(arguments[0], 'a', encoding='utf-8') as f:
-                    f.write(arguments[1])
+                file_pool.append(arguments[0], arguments[1])
                 return None
             except Exception as e:
                 raise ThyddleRuntimeError(f"file.append() error: {e}")
@@ -472,31 +1506,70 @@ class Interpreter:
                 # Then split each line by the separator
                 parts.extend(line.split(sep))
             
-            return parts
+            return ThyddleArray(parts)
+        
+        def split_text_fn(interpreter, arguments):
+            # string.split(text) splits into characters, as lib/standard's
+            # version always did; string.split(text, sep) is split()
+            if len(arguments) == 1:
+                return ThyddleArray(list(sequence_arg(arguments[0], "split")))
+            if len(arguments) != 2:
+                raise ThyddleRuntimeError("split() takes one or two arguments.")
+            return string_split_fn(interpreter, arguments)
 
         
-        self.globals.define("len", NativeFunction("len", len_fn))
-        self.globals.define("pyth", NativeFunction("pyth", pyth_fn))
-        self.globals.define("eval", NativeFunction("eval", eval_fn))
-        self.globals.define("tonum", NativeFunction("tonum", num_fn))
-        self.globals.define("tostr", NativeFunction("tostr", str_fn))
-        self.globals.define("type", NativeFunction("type", type_fn))
-        self.globals.define("reverse", NativeFunction("reverse", revrs_fn))
-        self.globals.define("split", NativeFunction("split", string_split_fn))
-        self.globals.define("ord", NativeFunction("ord", lambda interpreter, args: ord(args[0])))
-        self.globals.define("chr", NativeFunction("chr", lambda interpreter, args: chr(args[0])))
-        self.globals.define("array", ThyddleObject({
+        builtins.define("len", NativeFunction("len", len_fn))
+        builtins.define("range", NativeFunction("range", lazy_range_fn))
+        builtins.define("pyth", NativeFunction("pyth", pyth_fn))
+        builtins.define("eval", NativeFunction("eval", eval_fn))
+        builtins.define("tonum", NativeFunction("tonum", num_fn))
+        builtins.define("tostr", NativeFunction("tostr", str_fn))
+        builtins.define("type", NativeFunction("type", type_fn))
+        builtins.define("reverse", NativeFunction("reverse", revrs_fn))
+        builtins.define("split", NativeFunction("split", string_split_fn))
+        builtins.define("ord", NativeFunction("ord", lambda interpreter, args: ord(args[0])))
+        builtins.define("chr", NativeFunction("chr", lambda interpreter, args: chr(args[0])))
+        builtins.define("array", ThyddleObject({
             "append": NativeFunction("append", appnd_fn),
-            "pop": NativeFunction("pop", pop_fn)
+            "pop": NativeFunction("pop", pop_fn),
+            "join": NativeFunction("join", join_fn),
+            "map": NativeFunction("map", map_fn),
+            "filter": NativeFunction("filter", filter_fn),
+            "reduce": NativeFunction("reduce", reduce_fn),
+            "slice": NativeFunction("slice", slice_fn),
+            "index_of": NativeFunction("index_of", index_of_fn),
+            "chars": NativeFunction("chars", chars_fn),
+            "reverse": NativeFunction("reverse", reverse_sequence_fn),
+            "zeros": NativeFunction("zeros", zeros_fn),
+            "fill": NativeFunction("fill", fill_fn),
+            "kind": NativeFunction("kind", kind_fn),
+            "sum": NativeFunction("sum", sum_fn),
+            "min": NativeFunction("min", min_fn),
+            "max": NativeFunction("max", max_fn),
+            "mean": NativeFunction("mean", mean_fn),
+            "add": NativeFunction("add", add_fn),
+            "mul": NativeFunction("mul", mul_fn),
+            "scale": NativeFunction("scale", scale_fn),
+            "sort": NativeFunction("sort", sort_fn),
+            "concat": NativeFunction("concat", concat_fn),
+            "range": NativeFunction("range", range_fn)
         }))
-        self.globals.define("console", ThyddleObject({
+        builtins.define("string", ThyddleObject({
+            "split": NativeFunction("split", split_text_fn),
+            "join": NativeFunction("join", join_fn),
+            "chars": NativeFunction("chars", chars_fn),
+            "reverse": NativeFunction("reverse", reverse_sequence_fn),
+            "slice": NativeFunction("slice", slice_fn),
+            "index_of": NativeFunction("index_of", index_of_fn)
+        }))
+        builtins.define("console", ThyddleObject({
             "output": ThyddleObject({
                 "println": NativeFunction("println", print_fn),
                 "print": NativeFunction("print", write_fn)
             }),
             "read": NativeFunction("input", input_fn)
         }))
-        self.globals.define("math", ThyddleObject({
+        builtins.define("math", ThyddleObject({
             "abs": NativeFunction("abs", abs_fn),
             "sqrt": NativeFunction("sqrt", sqrt_root_fn),
             "sin": NativeFunction("sin", sin_fn),
@@ -516,174 +1589,338 @@ class Interpreter:
             "ceil": NativeFunction("ceil", ceil_fn),
             "rad": NativeFunction("rad", rad_fn),
             "pow": NativeFunction("pow", pow_fn),
+            "map": NativeFunction("map", math_map_fn),
             "random": ThyddleObject({
                 "randint": NativeFunction("randint", randint_fn),
                 "uniform": NativeFunction("uniform", uniform_fn)
             })
         }))
         
-        self.globals.define("io", ThyddleObject({
+        builtins.define("io", ThyddleObject({
             "file": ThyddleObject({
                 "modify": ThyddleObject({
                     "append": NativeFunction("append", append_file_fn),
                     "write": NativeFunction("write", write_file_fn)
                 }),
-                "read": NativeFunction("read", read_file_fn)
+                "read": NativeFunction("read", read_file_fn),
+                "open": NativeFunction("open", open_file_fn),
+                "lines": NativeFunction("lines", lines_file_fn),
+                "mmap": NativeFunction("mmap", mmap_file_fn)
             })
         }))
-        self.globals.define("true", True)
-        self.globals.define("false", False)
-        self.globals.define("nothing", None)
+        builtins.define("true", True)
+        builtins.define("false", False)
+        builtins.define("nothing", None)
     
-    def interpret(self, code):
-        lexer = Lexer(code)
+    def interpret(self, code, path=None):
+        # `path` is the file the code was read from, if any
+        lexer = self.lexer_class(code)
         tokens = lexer.scan_tokens()
-        parser = Parser(tokens)
+        parser = Parser(tokens, os.path.abspath(path) if path is not None else None)
         statements = parser.parse()
-        interpreter = Interpreter()
+        if self.optimize:
+            statements = Optimizer(self).optimize(statements)
+        if not Resolver().resolve(statements):
+            return None
+        
+        if self.shared_globals:
+            interpreter = self
+        else:
+            interpreter = Interpreter(use_vm=self.use_vm, fast_lexer=self.fast_lexer,
+                                      optimize=self.optimize, max_depth=self.max_depth)
+            # eval() inside a function still counts towards the same limit
+            interpreter.depth = self.depth
+        
         try:
-            ret = None
-            for statement in statements:
-                ret = interpreter.execute(statement)
-            return ret
+            return interpreter.run_statements(statements)
         except ThyddleRuntimeError as error:
             print(f"Runtime Error: {error.message}")
             return False
+        except RecursionError:
+            # Python's own limit, reached without going through enough calls
+            # to hit max_depth (very deeply nested expressions, natives
+            # calling back into Thyddle, ...)
+            print("Runtime Error: Stack overflow.")
+            return False
+    
+    def run_statements(self, statements):
+        """
+        Runs top-level statements in the globals and returns the value of the
+        last one. Python's recursion limit is raised to fit max_depth calls
+        for as long as they run, and put back afterwards.
+        """
+        limit = sys.getrecursionlimit()
+        if limit < self.recursion_limit:
+            sys.setrecursionlimit(self.recursion_limit)
+        try:
+            return self.run_in_globals(statements)
+        finally:
+            if sys.getrecursionlimit() != limit:
+                sys.setrecursionlimit(limit)
+    
+    def run_in_globals(self, statements):
+        if self.vm is not None:
+            return self.vm.run_program(statements, self.globals)
+        
+        previous = self.environment
+        try:
+            self.environment = self.globals
+            ret = None
+            for statement in statements:
+                ret = self.execute(statement)
+                if self.completion != NORMAL:
+                    # A top-level return ends the program with its value
+                    ret = self.finish_call()
+                    break
+            return ret
+        finally:
+            self.environment = previous
+            self.completion = NORMAL
     
     def execute(self, stmt):
-        if isinstance(stmt, ExpressionStatement):
-            return self.evaluate(stmt.expression)
+        handler = self.executors.get(type(stmt))
+        if handler is None:
+            return None  # fallback if nothing matches
+        return handler(self, stmt)
+    
+    def execute_expression_statement(self, stmt):
+        return self.evaluate(stmt.expression)
+    
+    def execute_var(self, stmt):
+        value = None
+        if stmt.initializer is not None:
+            value = self.evaluate(stmt.initializer)
         
-        elif isinstance(stmt, VarStatement):
-            value = None
-            if stmt.initializer is not None:
-                value = self.evaluate(stmt.initializer)
-            
-            if callable(value):
-                self.environment.define(stmt.name.lexeme, value, stmt.is_const)
-            else:
-                self.environment.define(stmt.name.lexeme, value, stmt.is_const)
-            
-            return value  # ← return the variable's value
+        if stmt.slot is not None:
+            self.environment.define_slot(stmt.slot, stmt.name, value, stmt.is_const)
+        else:
+            self.environment.define(stmt.name, value, stmt.is_const)
         
-        elif isinstance(stmt, BlockStatement):
-            return self.execute_block(stmt.statements, Environment(self.environment))
+        return value  # ← return the variable's value
+    
+    def execute_block_statement(self, stmt):
+        if stmt.needs_scope:
+            return self.execute_block(stmt.statements, Environment(self.environment, stmt.scope_size, stmt.scope_names))
         
-        elif isinstance(stmt, IfStatement):
-            if self.is_truthy(self.evaluate(stmt.condition)):
-                return self.execute(stmt.then_branch)
-            else:
-                executed = False
-                for condition, branch in stmt.else_if_branches:
-                    if self.is_truthy(self.evaluate(condition)):
-                        executed = True
-                        return self.execute(branch)
-                if not executed and stmt.else_branch is not None:
-                    return self.execute(stmt.else_branch)
-            return None  # if no branch runs
-        
-        elif isinstance(stmt, WhileStatement):
-            result = None
+        # Declares nothing (see Resolver.drop_scope): no environment needed
+        for statement in stmt.statements:
+            self.execute(statement)
+            if self.completion != NORMAL:
+                break
+        return None
+    
+    def execute_if(self, stmt):
+        if self.is_truthy(self.evaluate(stmt.condition)):
+            return self.execute(stmt.then_branch)
+        else:
+            executed = False
+            for condition, branch in stmt.else_if_branches:
+                if self.is_truthy(self.evaluate(condition)):
+                    executed = True
+                    return self.execute(branch)
+            if not executed and stmt.else_branch is not None:
+                return self.execute(stmt.else_branch)
+        return None  # if no branch runs
+    
+    def execute_while(self, stmt):
+        saved = self.hoist_lengths(stmt.hoisted) if stmt.hoisted is not None else None
+        result = None
+        try:
             while self.is_truthy(self.evaluate(stmt.condition)):
-                try:
-                    result = self.execute(stmt.body)
-                except BreakException:
-                    break
-                except ContinueException:
+                value = self.execute(stmt.body)
+                if self.completion != NORMAL:
+                    if self.completion == RETURN:
+                        break
+                    completion = self.completion
+                    self.completion = NORMAL
+                    if completion == BREAK:
+                        break
                     continue
-            return result
-        
-        elif isinstance(stmt, ForStatement):
-            previous_env = self.environment
-            result = None
-            try:
-                self.environment = Environment(self.environment)
-                if stmt.initializer is not None:
-                    self.execute(stmt.initializer)
-                while True:
-                    if stmt.condition is not None:
-                        if not self.is_truthy(self.evaluate(stmt.condition)):
-                            break
-                    try:
-                        result = self.execute(stmt.body)
-                    except BreakException:
+                result = value
+        finally:
+            if saved is not None:
+                self.restore_lengths(saved)
+        return result
+    
+    def execute_for(self, stmt):
+        previous_env = self.environment
+        result = None
+        saved = None
+        try:
+            self.environment = Environment(self.environment, stmt.scope_size, stmt.scope_names)
+            if stmt.initializer is not None:
+                self.execute(stmt.initializer)
+            if stmt.hoisted is not None:
+                saved = self.hoist_lengths(stmt.hoisted)
+            while True:
+                if stmt.condition is not None:
+                    if not self.is_truthy(self.evaluate(stmt.condition)):
                         break
-                    except ContinueException:
-                        pass
-                    if stmt.increment is not None:
-                        self.evaluate(stmt.increment)
-            finally:
-                self.environment = previous_env
-            return result
-        
-        elif isinstance(stmt, FunctionStatement):
-            function = ThyddleFunction(stmt, self.environment)
-            self.environment.define(stmt.name.lexeme, function)
-            return function  # ← returning the function object
-        
-        elif isinstance(stmt, ReturnStatement):
-            value = None
-            if stmt.value is not None:
-                value = self.evaluate(stmt.value)
-            raise ReturnValue(value)
-        
-        elif isinstance(stmt, BreakStatement):
-            raise BreakException()
-        
-        elif isinstance(stmt, ContinueStatement):
-            raise ContinueException()
-        
-        elif isinstance(stmt, ImportStatement):
-            return self.handle_import(stmt.module_name)
+                value = self.execute(stmt.body)
+                if self.completion != NORMAL:
+                    if self.completion == RETURN:
+                        break
+                    completion = self.completion
+                    self.completion = NORMAL
+                    if completion == BREAK:
+                        break
+                else:
+                    result = value
+                if stmt.increment is not None:
+                    self.evaluate(stmt.increment)
+        finally:
+            self.environment = previous_env
+            if saved is not None:
+                self.restore_lengths(saved)
+        return result
+    
+    def hoist_lengths(self, calls):
+        """
+        Looks up the collections of a loop condition's HoistedLenCalls once,
+        before the loop starts, when `len` is the built-in and the collection
+        is a string (its length is kept) or an array (the array is kept, and
+        its length read on each test). Returns what restore_lengths needs: the
+        same loop can already be running further up the stack.
+        """
+        lengths = self.hoisted_lengths
+        saved = []
+        for call in calls:
+            saved.append((call, lengths.pop(call, None)))
+            argument = call.arguments[0]
+            if Environment.len_rebound or call.callee.slot is not None or argument.slot is None:
+                continue
+            if self.evaluate(call.callee) is not self.len_function:
+                continue
+            value = self.evaluate(argument)
+            if isinstance(value, str):
+                lengths[call] = len(value)
+            elif isinstance(value, ThyddleArray):
+                lengths[call] = value
+        return saved
+    
+    def restore_lengths(self, saved):
+        lengths = self.hoisted_lengths
+        for call, previous in saved:
+            if previous is None:
+                lengths.pop(call, None)
+            else:
+                lengths[call] = previous
+    
+    def execute_for_in(self, stmt):
+        values = iteration_values(self.evaluate(stmt.iterable))
+        previous_env = self.environment
+        result = None
+        try:
+            # One environment for the whole loop; the loop variable's slot is
+            # overwritten with each value
+            environment = Environment(previous_env, stmt.scope_size, stmt.scope_names)
+            self.environment = environment
+            slots = environment.slots
+            slot = stmt.slot
+            for value in values:
+                if slot is not None:
+                    slots[slot] = value
+                else:
+                    environment.define(stmt.name, value)
+                value = self.execute(stmt.body)
+                if self.completion != NORMAL:
+                    if self.completion == RETURN:
+                        break
+                    completion = self.completion
+                    self.completion = NORMAL
+                    if completion == BREAK:
+                        break
+                else:
+                    result = value
+        finally:
+            self.environment = previous_env
+        return result
+    
+    def execute_function(self, stmt):
+        function = ThyddleFunction(stmt, self.environment)
+        if stmt.slot is not None:
+            self.environment.slots[stmt.slot] = function
+        else:
+            self.environment.define(stmt.name, function)
+        return function  # ← returning the function object
+    
+    def execute_return(self, stmt):
+        value = None
+        if stmt.tail_call:
+            value = self.evaluate_tail_call(stmt.value)
+        elif stmt.value is not None:
+            value = self.evaluate(stmt.value)
+        self.return_value = value
+        self.completion = RETURN
+        return None
+    
+    def execute_break(self, stmt):
+        self.completion = BREAK
+        return None
+    
+    def execute_continue(self, stmt):
+        self.completion = CONTINUE
+        return None
+    
+    def execute_import(self, stmt):
+        return self.handle_import(stmt.module_name)
+    
+    def load_module(self, module_name):
+        """
+        Returns a module's parsed statements, from the module cache when the
+        file has not changed.
+        """
+        def parse(module_code):
+            # Lex + parse
+            lexer = self.lexer_class(module_code)
+            tokens = lexer.scan_tokens()
+            parser = Parser(tokens, os.path.abspath(module_name + ".thy"))
+            statements = parser.parse()
+            if self.optimize:
+                statements = Optimizer(self).optimize(statements)
+            if not Resolver().resolve(statements):
+                raise ThyddleRuntimeError(f"Could not resolve module '{module_name}'.")
+            return statements
         
-        return None  # fallback if nothing matches
-
+        try:
+            # Assumes the module ends with .thy. Optimized and unoptimized
+            # modules are cached separately.
+            variant = None if self.optimize else "noopt"
+            # A module this program wrote with io.file.modify may still be buffered
+            file_pool.flush(module_name + ".thy")
+            return self.module_cache.load(module_name + ".thy", parse, variant)
+        except FileNotFoundError:
+            raise ThyddleRuntimeError(f"Could not find module '{module_name}'.")
     
     def handle_import(self, module_name):
         """
         Imports functions and constants (variables with is_const=True) from a module,
         without executing other statements.
         """
-        try:
-            with open(module_name + ".thy", "r") as f:  # Assumes the module ends with .thy
-                module_code = f.read()
-                
-                # Lex + parse
-                lexer = Lexer(module_code)
-                tokens = lexer.scan_tokens()
-                parser = Parser(tokens)
-                statements = parser.parse()
-                
-                # Module environment (inherits global variables)
-                module_env = Environment(self.globals)
-                
-                # Declare functions and constants
-                for stmt in statements:
-                    if isinstance(stmt, FunctionStatement):
-                        # If the statement is a function definition
-                        function = ThyddleFunction(stmt, module_env)
-                        module_env.define(stmt.name.lexeme, function)
-                    elif isinstance(stmt, VarStatement):
-                        # If the statement is a variable declaration (constant or not)
-                        is_const = stmt.is_const  # Get if it's marked as a constant
-                        if is_const:
-                            # If it's a constant, define it as such
-                            value = self.evaluate(stmt.initializer)  # Evaluate the initializer
-                            module_env.define(stmt.name.lexeme, value, is_const=True)
-                
-                # Expose functions and constants to the current environment
-                for name, value in module_env.values.items():
-                    if isinstance(value, ThyddleFunction):
-                        # Import function to the global environment
-                        self.environment.define(name, value)
-                    else:
-                        # Import constants (or other values)
-                        self.environment.define(name, value)
-                
-                return True
-                                    
-        except FileNotFoundError:
-            raise ThyddleRuntimeError(f"Could not find module '{module_name}'.")
+        statements = self.load_module(module_name)
+        
+        # Module environment (inherits global variables)
+        module_env = Environment(self.globals)
+        
+        # Declare functions and constants
+        for stmt in statements:
+            if isinstance(stmt, FunctionStatement):
+                # If the statement is a function definition
+                function = ThyddleFunction(stmt, module_env)
+                module_env.define(stmt.name, function)
+            elif isinstance(stmt, VarStatement):
+                # If the statement is a variable declaration (constant or not)
+                is_const = stmt.is_const  # Get if it's marked as a constant
+                if is_const:
+                    # If it's a constant, define it as such
+                    value = self.evaluate(stmt.initializer)  # Evaluate the initializer
+                    module_env.define(stmt.name, value, is_const=True)
+        
+        # Expose functions and constants to the current environment
+        for name, value in module_env.values.items():
+            self.environment.define(name, value)
+        
+        return True
 
 
     def execute_block(self, statements, environment):
@@ -693,179 +1930,437 @@ class Interpreter:
             
             for statement in statements:
                 self.execute(statement)
+                if self.completion != NORMAL:
+                    break
         finally:
             self.environment = previous
     
+    def finish_call(self):
+        """
+        Consumes the completion left by a function body and returns its value.
+        """
+        completion = self.completion
+        if completion == NORMAL:
+            return None
+        
+        self.completion = NORMAL
+        if completion == BREAK:
+            raise ThyddleRuntimeError("'break' outside of a loop.")
+        if completion == CONTINUE:
+            raise ThyddleRuntimeError("'continue' outside of a loop.")
+        
+        value = self.return_value
+        self.return_value = None
+        return value
+    
     def evaluate(self, expr):
-        if isinstance(expr, Literal):
-            return expr.value
-        elif isinstance(expr, Grouping):
-            return self.evaluate(expr.expression)
-        elif isinstance(expr, LambdaExpression):
-            return ThyddleLambda(expr, self.environment)
-        elif isinstance(expr, Unary):
-            right = self.evaluate(expr.right)
-            
-            if expr.operator.type == TokenType.MINUS:
-                self.check_number_operand(expr.operator, right)
-                return -right
-            elif expr.operator.type == TokenType.BANG:
-                return not self.is_truthy(right)
-        elif isinstance(expr, Binary):
-            left = self.evaluate(expr.left)
-            right = self.evaluate(expr.right)
-            
-            if expr.operator.type == TokenType.MINUS:
-                self.check_number_operands(expr.operator, left, right)
-                return left - right
-            elif expr.operator.type == TokenType.SLASH:
-                self.check_number_operands(expr.operator, left, right)
-                if right == 0:
-                    raise ThyddleRuntimeError("Division by zero.")
-                return left / right
-            elif expr.operator.type == TokenType.STAR:
-                self.check_number_operands(expr.operator, left, right)
-                return left * right
-            elif expr.operator.type == TokenType.PLUS:
-                if isinstance(left, (int, float)) and isinstance(right, (int, float)):
-                    return left + right
-                if isinstance(left, str) or isinstance(right, str):
-                    return str(left) + str(right)
-                raise ThyddleRuntimeError("Operands must be numbers or strings.")
-            elif expr.operator.type == TokenType.MODULO:
-                self.check_number_operands(expr.operator, left, right)
-                if right == 0:
-                    raise ThyddleRuntimeError("Modulo by zero.")
-                return left % right
-            elif expr.operator.type == TokenType.GREATER:
-                self.check_number_operands(expr.operator, left, right)
-                return left > right
-            elif expr.operator.type == TokenType.GREATER_EQUAL:
-                self.check_number_operands(expr.operator, left, right)
-                return left >= right
-            elif expr.operator.type == TokenType.LESS:
-                self.check_number_operands(expr.operator, left, right)
-                return left < right
-            elif expr.operator.type == TokenType.LESS_EQUAL:
-                self.check_number_operands(expr.operator, left, right)
-                return left <= right
-            elif expr.operator.type == TokenType.BANG_EQUAL:
-                return not self.is_equal(left, right)
-            elif expr.operator.type == TokenType.EQUAL_EQUAL:
-                return self.is_equal(left, right)
-        elif isinstance(expr, Variable):
-            return self.environment.get(expr.name.lexeme)
-        elif isinstance(expr, Assign):
-            value = self.evaluate(expr.value)
-            self.environment.assign(expr.name.lexeme, value)
+        handler = self.evaluators.get(type(expr))
+        if handler is None:
+            return None
+        return handler(self, expr)
+    
+    def evaluate_literal(self, expr):
+        return expr.value
+    
+    def evaluate_grouping(self, expr):
+        return self.evaluate(expr.expression)
+    
+    def evaluate_lambda(self, expr):
+        return ThyddleLambda(expr, self.environment)
+    
+    def evaluate_unary(self, expr):
+        right = self.evaluate(expr.right)
+        
+        if expr.op == TokenType.MINUS:
+            self.check_number_operand(expr.op, right)
+            return -right
+        elif expr.op == TokenType.BANG:
+            return not self.is_truthy(right)
+    
+    def evaluate_binary(self, expr):
+        # First run of this node: specialize it for what it saw (see
+        # QUICKENED_BINARIES), then compute as usual
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        op = expr.op
+        
+        quickened = QUICKENED_BINARIES.get(op)
+        if quickened is None or (op not in EQUALITY_OPERATORS
+                                 and not (isinstance(left, NUMBER) and isinstance(right, NUMBER))):
+            quickened = GenericBinary
+        expr.__class__ = quickened
+        return self.binary_operation(op, left, right)
+    
+    def evaluate_generic_binary(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        return self.binary_operation(expr.op, left, right)
+    
+    def deoptimize_binary(self, expr, left, right):
+        # A number node got something else: generic from now on, so a node
+        # that sees mixed types doesn't keep switching back and forth
+        expr.__class__ = GenericBinary
+        return self.binary_operation(expr.op, left, right)
+    
+    def evaluate_number_add(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left + right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_subtract(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left - right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_multiply(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left * right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_divide(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER) and right != 0:
+            return left / right
+        # Division by zero is reported by binary_operation
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_modulo(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER) and right != 0:
+            return left % right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_greater(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left > right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_greater_equal(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left >= right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_less(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left < right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_number_less_equal(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+            return left <= right
+        return self.deoptimize_binary(expr, left, right)
+    
+    def evaluate_equal(self, expr):
+        # is_equal, inlined; works for any operands, so never deoptimizes
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left is None:
+            return right is None
+        return left == right
+    
+    def evaluate_not_equal(self, expr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+        if left is None:
+            return right is not None
+        return left != right
+    
+    def binary_operation(self, op, left, right):
+        if op == TokenType.MINUS:
+            self.check_number_operands(op, left, right)
+            return left - right
+        elif op == TokenType.SLASH:
+            self.check_number_operands(op, left, right)
+            if right == 0:
+                raise ThyddleRuntimeError("Division by zero.")
+            return left / right
+        elif op == TokenType.STAR:
+            self.check_number_operands(op, left, right)
+            return left * right
+        elif op == TokenType.PLUS:
+            if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+                return left + right
+            if isinstance(left, str) or isinstance(right, str):
+                return str(left) + str(right)
+            raise ThyddleRuntimeError("Operands must be numbers or strings.")
+        elif op == TokenType.MODULO:
+            self.check_number_operands(op, left, right)
+            if right == 0:
+                raise ThyddleRuntimeError("Modulo by zero.")
+            return left % right
+        elif op == TokenType.GREATER:
+            self.check_number_operands(op, left, right)
+            return left > right
+        elif op == TokenType.GREATER_EQUAL:
+            self.check_number_operands(op, left, right)
+            return left >= right
+        elif op == TokenType.LESS:
+            self.check_number_operands(op, left, right)
+            return left < right
+        elif op == TokenType.LESS_EQUAL:
+            self.check_number_operands(op, left, right)
+            return left <= right
+        elif op == TokenType.BANG_EQUAL:
+            return not self.is_equal(left, right)
+        elif op == TokenType.EQUAL_EQUAL:
+            return self.is_equal(left, right)
+    
+    def evaluate_variable(self, expr):
+        if expr.slot is not None:
+            environment = self.environment
+            for _ in range(expr.depth):
+                environment = environment.enclosing
+            return environment.slots[expr.slot]
+        return self.environment.get(expr.name)
+    
+    def evaluate_assign(self, expr):
+        if expr.append is not None:
+            return self.evaluate_append(expr)
+        
+        value = self.evaluate(expr.value)
+        if expr.slot is not None:
+            # Constants were already rejected by the Resolver
+            environment = self.environment
+            for _ in range(expr.depth):
+                environment = environment.enclosing
+            environment.slots[expr.slot] = value
+        else:
+            self.environment.assign(expr.name, value)
+        return value
+    
+    def evaluate_append(self, expr):
+        """
+        `x = x + a + b ...`: x is evaluated once and the `+` chain carries on
+        from its value. When x holds a string, the parts are appended to it
+        in place: Python strings can only grow in place while nothing else
+        refers to them, so the variable is cleared while the parts are
+        appended, which makes building a string in a loop linear instead of
+        quadratic.
+        """
+        parts = expr.append
+        left = self.evaluate(parts[0])
+        if not isinstance(left, str):
+            # Numbers (i = i + 1) and anything else: the same sums as the
+            # Binary nodes would compute
+            for part in parts[1:]:
+                right = self.evaluate(part)
+                if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+                    left = left + right
+                else:
+                    left = self.binary_operation(TokenType.PLUS, left, right)
+            if expr.slot is not None:
+                environment = self.environment
+                for _ in range(expr.depth):
+                    environment = environment.enclosing
+                environment.slots[expr.slot] = left
+            else:
+                self.environment.assign(expr.name, left)
+            return left
+        
+        # Same conversion as `+`: once the left side is a string, so is the sum
+        suffix = []
+        for part in parts[1:]:
+            value = self.evaluate(part)
+            suffix.append(value if isinstance(value, str) else str(value))
+        suffix = "".join(suffix)
+        
+        if expr.slot is not None:
+            environment = self.environment
+            for _ in range(expr.depth):
+                environment = environment.enclosing
+            container, key = environment.slots, expr.slot
+        else:
+            location = self.environment.locate(expr.name)
+            if location is None:
+                value = left + suffix
+                self.environment.assign(expr.name, value)
+                return value
+            container, key = location
+        
+        container[key] = None
+        left += suffix
+        container[key] = left
+        return left
+    
+    def evaluate_logical(self, expr):
+        left = self.evaluate(expr.left)
+        
+        if expr.op == TokenType.OR:
+            if self.is_truthy(left):
+                return left
+        else:  # AND
+            if not self.is_truthy(left):
+                return left
+        
+        return self.evaluate(expr.right)
+    
+    def evaluate_call(self, expr):
+        # Evaluate the callee properly
+        callee = expr.callee
+        callee = self.evaluate(callee)
+        # If the callee is a variable, get its value (which should be a function or callable)
+        if isinstance(callee, Variable):
+            callee_value = self.evaluate(self.environment.get(callee.name))  # Get the value of the variable
+        
+            # Check if it's a callable function
+        
+            if not isinstance(callee_value, (ThyddleFunction, NativeFunction)):
+                raise ThyddleRuntimeError(f"Variable '{callee.name}' is not a callable function.")
+        
+            callee = callee_value  # Now we have the callable function
+        
+        # If it's not a variable, evaluate it as an expression
+        
+        
+        #print(type(self.evaluate(callee)), self.evaluate(expr.callee))
+        
+        # Evaluate arguments
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+        
+        # Check if callee is a function and call it
+        if isinstance(callee, (ThyddleFunction, NativeFunction)):
+            return callee.call(self, arguments)
+        
+        raise ThyddleRuntimeError("Can only call functions or variables that hold functions.")
+    
+    def evaluate_tail_call(self, expr):
+        """
+        The call in `return f(...)`. A tree-walking Thyddle function isn't
+        called from here: it is left in tail_function/tail_arguments for the
+        ThyddleFunction.call loop the current function runs in, and
+        TAIL_CALL is returned instead of its result.
+        """
+        callee = self.evaluate(expr.callee)
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+        
+        if type(callee) is ThyddleFunction or type(callee) is ThyddleLambda:
+            self.tail_function = callee
+            self.tail_arguments = arguments
+            return TAIL_CALL
+        if isinstance(callee, (ThyddleFunction, NativeFunction)):
+            return callee.call(self, arguments)
+        
+        raise ThyddleRuntimeError("Can only call functions or variables that hold functions.")
+    
+    def evaluate_len_call(self, expr):
+        # The callee is a plain variable, so evaluating it again in
+        # evaluate_call is harmless
+        if self.evaluate(expr.callee) is not self.len_function:
+            return self.evaluate_call(expr)
+        
+        value = self.evaluate(expr.arguments[0])
+        if isinstance(value, str):
+            return len(value)
+        if isinstance(value, ThyddleArray):
+            return len(value.elements)
+        # Objects, mmaps and the error for anything else
+        return self.len_function.call(self, [value])
+    
+    def evaluate_hoisted_len_call(self, expr):
+        # len(x) looked up before the loop started (see hoist_lengths)
+        held = self.hoisted_lengths.get(expr)
+        if held is None or Environment.len_rebound:
+            return self.evaluate_len_call(expr)
+        if held.__class__ is int:
+            return held
+        return len(held.elements)
+    
+    def evaluate_get(self, expr):
+        obj = self.evaluate(expr.obj)
+        
+        # Inline cache: the same object, unchanged since this node last read it
+        value = cached_property(expr, obj)
+        if value is NOT_CACHED:
+            return self.get_property(expr, obj)
+        return value
+    
+    def get_property(self, expr, obj):
+        # The slow path of evaluate_get: look the property up and cache it
+        if isinstance(obj, ThyddleObject):
+            value = obj.get(expr.name)
+            cache_property(expr, obj, value)
             return value
-        elif isinstance(expr, Logical):
-            left = self.evaluate(expr.left)
-            
-            if expr.operator.type == TokenType.OR:
-                if self.is_truthy(left):
-                    return left
-            else:  # AND
-                if not self.is_truthy(left):
-                    return left
-            
-            return self.evaluate(expr.right)
-        elif isinstance(expr, Call):
-            # Evaluate the callee properly
-            callee = expr.callee
-            callee = self.evaluate(callee)
-            # If the callee is a variable, get its value (which should be a function or callable)
-            if isinstance(callee, Variable):
-                callee_value = self.evaluate(self.environment.get(callee.name.lexeme))  # Get the value of the variable
-                
-                # Check if it's a callable function
-                
-                if not isinstance(callee_value, (ThyddleFunction, NativeFunction)):
-                    raise ThyddleRuntimeError(f"Variable '{callee.name.lexeme}' is not a callable function.")
-                
-                callee = callee_value  # Now we have the callable function
-            
-            # If it's not a variable, evaluate it as an expression
-            
-            
-            #print(type(self.evaluate(callee)), self.evaluate(expr.callee))
-            
-            # Evaluate arguments
-            arguments = [self.evaluate(arg) for arg in expr.arguments]
-
-            # Check if callee is a function and call it
-            if isinstance(callee, (ThyddleFunction, NativeFunction)):
-                return callee.call(self, arguments)
-
-            raise ThyddleRuntimeError("Can only call functions or variables that hold functions.")
-
-
-        elif isinstance(expr, Get):
-            obj = self.evaluate(expr.obj)
-            
-            if isinstance(obj, ThyddleObject):
-                return obj.get(expr.name.lexeme)
-            
+        
+        raise ThyddleRuntimeError("Only objects have properties.")
+    
+    def evaluate_set(self, expr):
+        obj = self.evaluate(expr.obj)
+        
+        if not isinstance(obj, ThyddleObject):
             raise ThyddleRuntimeError("Only objects have properties.")
-        elif isinstance(expr, Set):
-            obj = self.evaluate(expr.obj)
-            
-            if not isinstance(obj, ThyddleObject):
-                raise ThyddleRuntimeError("Only objects have properties.")
-            
-            value = self.evaluate(expr.value)
-            obj.set(expr.name.lexeme, value)
+        
+        value = self.evaluate(expr.value)
+        obj.set(expr.name, value)
+        return value
+    
+    def evaluate_index(self, expr):
+        obj = self.evaluate(expr.obj)
+        index = self.evaluate(expr.index)
+        
+        if isinstance(obj, ThyddleArray):
+            return obj.get(index)
+        elif isinstance(obj, str):
+            if not isinstance(index, int):
+                raise ThyddleRuntimeError("String index must be an integer.")
+        
+            if index < 0 or index >= len(obj):
+                raise ThyddleRuntimeError(f"String index out of bounds: {index}")
+        
+            return obj[index]
+        elif isinstance(obj, ThyddleObject):
+            if not isinstance(index, str):
+                raise ThyddleRuntimeError("Object index must be a string key.")
+            return obj.get(index)
+        elif isinstance(obj, ThyddleMmap):
+            return obj.get(index)
+        else:
+            raise ThyddleRuntimeError("Only arrays, strings, objects, and mmaps can be indexed.")
+    
+    def evaluate_set_index(self, expr):
+        obj = self.evaluate(expr.obj)
+        index = self.evaluate(expr.index)
+        value = self.evaluate(expr.value)
+        
+        if isinstance(obj, ThyddleArray):
+            obj.set(index, value)
+            return value
+        elif isinstance(obj, ThyddleObject):
+            if not isinstance(index, str):
+                raise ThyddleRuntimeError("Object index must be a string key.")
+            obj.set(index, value)
             return value
-        elif isinstance(expr, Index):
-            obj = self.evaluate(expr.obj)
-            index = self.evaluate(expr.index)
-            
-            if isinstance(obj, ThyddleArray):
-                return obj.get(index)
-            elif isinstance(obj, str):
-                if not isinstance(index, int):
-                    raise ThyddleRuntimeError("String index must be an integer.")
-                
-                if index < 0 or index >= len(obj):
-                    raise ThyddleRuntimeError(f"String index out of bounds: {index}")
-                
-                return obj[index]
-            elif isinstance(obj, ThyddleObject):
-                if not isinstance(index, str):
-                    raise ThyddleRuntimeError("Object index must be a string key.")
-                return obj.get(index)
-            else:
-                raise ThyddleRuntimeError("Only arrays, strings, and objects can be indexed.")
-
-        elif isinstance(expr, SetIndex):
-            obj = self.evaluate(expr.obj)
-            index = self.evaluate(expr.index)
-            value = self.evaluate(expr.value)
-            
-            if isinstance(obj, ThyddleArray):
-                obj.set(index, value)
-                return value
-            elif isinstance(obj, ThyddleObject):
-                if not isinstance(index, str):
-                    raise ThyddleRuntimeError("Object index must be a string key.")
-                obj.set(index, value)
-                return value
-            
-            raise ThyddleRuntimeError("Only arrays and objects support indexed assignment.")
-        elif isinstance(expr, ArrayLiteral):
-            elements = []
-            for element in expr.elements:
-                elements.append(self.evaluate(element))
-            
-            return ThyddleArray(elements)
-        elif isinstance(expr, ObjectLiteral):
-            properties = {}
-            for key, value in expr.properties:
-                properties[key.lexeme] = self.evaluate(value)
-            
-            return ThyddleObject(properties)
         
-        return None
+        raise ThyddleRuntimeError("Only arrays and objects support indexed assignment.")
+    
+    def evaluate_array(self, expr):
+        elements = []
+        for element in expr.elements:
+            elements.append(self.evaluate(element))
+        
+        return ThyddleArray(elements)
+    
+    def evaluate_object(self, expr):
+        properties = {}
+        for key, value in expr.properties:
+            properties[key] = self.evaluate(value)
+        
+        return ThyddleObject(properties)
     
     def is_truthy(self, value):
         if value is None:
@@ -894,6 +2389,55 @@ class Interpreter:
             return
         raise ThyddleRuntimeError("Operands must be numbers.")
 
+    # Handlers by node type: finding one costs a single dict lookup, wherever
+    # the type sits in this list
+    executors = {
+        ExpressionStatement: execute_expression_statement,
+        VarStatement: execute_var,
+        BlockStatement: execute_block_statement,
+        IfStatement: execute_if,
+        WhileStatement: execute_while,
+        ForStatement: execute_for,
+        ForInStatement: execute_for_in,
+        FunctionStatement: execute_function,
+        ReturnStatement: execute_return,
+        BreakStatement: execute_break,
+        ContinueStatement: execute_continue,
+        ImportStatement: execute_import,
+    }
+    
+    evaluators = {
+        Literal: evaluate_literal,
+        Grouping: evaluate_grouping,
+        LambdaExpression: evaluate_lambda,
+        Unary: evaluate_unary,
+        Binary: evaluate_binary,
+        GenericBinary: evaluate_generic_binary,
+        NumberAdd: evaluate_number_add,
+        NumberSubtract: evaluate_number_subtract,
+        NumberMultiply: evaluate_number_multiply,
+        NumberDivide: evaluate_number_divide,
+        NumberModulo: evaluate_number_modulo,
+        NumberGreater: evaluate_number_greater,
+        NumberGreaterEqual: evaluate_number_greater_equal,
+        NumberLess: evaluate_number_less,
+        NumberLessEqual: evaluate_number_less_equal,
+        Equal: evaluate_equal,
+        NotEqual: evaluate_not_equal,
+        Variable: evaluate_variable,
+        Assign: evaluate_assign,
+        Logical: evaluate_logical,
+        Call: evaluate_call,
+        LenCall: evaluate_len_call,
+        HoistedLenCall: evaluate_hoisted_len_call,
+        Get: evaluate_get,
+        Set: evaluate_set,
+        Index: evaluate_index,
+        SetIndex: evaluate_set_index,
+        ArrayLiteral: evaluate_array,
+        ObjectLiteral: evaluate_object,
+    }
+
 class NativeFunction:
     def __init__(self, name, function):
         self.name = name
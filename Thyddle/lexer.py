@@ -1,6 +1,7 @@
 # Fix for lexer.py
 from enum import Enum, auto
 import re
+import sys
 
 class TokenType(Enum):
     # Single-character tokens
@@ -67,6 +68,8 @@ class TokenType(Enum):
     EOF = auto()
 
 class Token:
+    __slots__ = ("type", "lexeme", "literal", "line")
+    
     def __init__(self, token_type, lexeme, literal, line):
         self.type = token_type
         self.lexeme = lexeme
@@ -79,46 +82,77 @@ class Token:
     def __repr__(self):
         return self.__str__()
 
+class SourceToken:
+    """
+    A Token that keeps offsets into the source instead of its own copy of the
+    lexeme, which is sliced out on access. With `offsets=True` the lexers make
+    these for string literals, the one kind of lexeme that can't be shared by
+    interning; two offsets cost more than a short interned lexeme.
+    """
+    __slots__ = ("type", "source", "start", "end", "literal", "line")
+    
+    def __init__(self, token_type, source, start, end, literal, line):
+        self.type = token_type
+        self.source = source
+        self.start = start
+        self.end = end
+        self.literal = literal
+        self.line = line
+    
+    @property
+    def lexeme(self):
+        return self.source[self.start:self.end]
+    
+    def __str__(self):
+        return f"{self.type} {self.lexeme} {self.literal}"
+    
+    def __repr__(self):
+        return self.__str__()
+
+KEYWORDS = {
+    "and": TokenType.AND,
+    "or": TokenType.OR,
+    "if": TokenType.IF,
+    "else": TokenType.ELSE,
+    "elseif": TokenType.ELSEIF,
+    "true": TokenType.TRUE,
+    "false": TokenType.FALSE,
+    "nil": TokenType.NIL,
+    "func": TokenType.FUNC,       # Changed from "function" to "func"
+    "var": TokenType.VAR,
+    "const": TokenType.CONST,
+    "return": TokenType.RETURN,
+    "while": TokenType.WHILE,
+    "for": TokenType.FOR,
+    "break": TokenType.BREAK,
+    "continue": TokenType.CONTINUE,
+    "import": TokenType.IMPORT,
+    "unless": TokenType.UNLESS,   # New keyword
+    "until": TokenType.UNTIL,     # New keyword
+    "maybe": TokenType.MAYBE,     # New keyword
+    "default": TokenType.DEFAULT, # New keyword
+    "match": TokenType.MATCH,     # New keyword
+    "case": TokenType.CASE        # New keyword
+}
+
 class Lexer:
-    def __init__(self, source):
+    def __init__(self, source, offsets=False):
         self.source = source
+        self.offsets = offsets
         self.tokens = []
         self.start = 0
         self.current = 0
         self.line = 1
         
-        self.keywords = {
-            "and": TokenType.AND,
-            "or": TokenType.OR,
-            "if": TokenType.IF,
-            "else": TokenType.ELSE,
-            "elseif": TokenType.ELSEIF,
-            "true": TokenType.TRUE,
-            "false": TokenType.FALSE,
-            "nil": TokenType.NIL,
-            "func": TokenType.FUNC,       # Changed from "function" to "func"
-            "var": TokenType.VAR,
-            "const": TokenType.CONST,
-            "return": TokenType.RETURN,
-            "while": TokenType.WHILE,
-            "for": TokenType.FOR,
-            "break": TokenType.BREAK,
-            "continue": TokenType.CONTINUE,
-            "import": TokenType.IMPORT,
-            "unless": TokenType.UNLESS,   # New keyword
-            "until": TokenType.UNTIL,     # New keyword
-            "maybe": TokenType.MAYBE,     # New keyword
-            "default": TokenType.DEFAULT, # New keyword
-            "match": TokenType.MATCH,     # New keyword
-            "case": TokenType.CASE        # New keyword
-        }
+        self.keywords = KEYWORDS
     
     def scan_tokens(self):
         while not self.is_at_end():
             self.start = self.current
             self.scan_token()
         
-        self.tokens.append(Token(TokenType.EOF, "", None, self.line))
+        self.start = self.current
+        self.add_token(TokenType.EOF)
         return self.tokens
     
     def is_at_end(self):
@@ -363,5 +397,137 @@ class Lexer:
         self.add_token(token_type)
     
     def add_token(self, token_type, literal=None):
+        if self.offsets and token_type == TokenType.STRING:
+            self.tokens.append(SourceToken(token_type, self.source, self.start, self.current, literal, self.line))
+            return
+        
         text = self.source[self.start:self.current]
-        self.tokens.append(Token(token_type, text, literal, self.line))
\ No newline at end of file
+        if literal is None:
+            # Keywords, identifiers and punctuation repeat a lot: share one string per spelling
+            text = sys.intern(text)
+        self.tokens.append(Token(token_type, text, literal, self.line))
+
+PUNCTUATION = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    "[": TokenType.LEFT_BRACKET,
+    "]": TokenType.RIGHT_BRACKET,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "/": TokenType.SLASH,
+    "*": TokenType.STAR,
+    "%": TokenType.MODULO,
+    "|": TokenType.PIPE,
+    "->": TokenType.ARROW,
+    "::": TokenType.DOUBLE_COLON,
+    ":": TokenType.COLON,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+}
+
+# One alternative per kind of lexeme, tried in order. Comments come before
+# punctuation so "//" and "/*" win over "/"; hex and binary before decimals
+# so "0x1F" is one token. A string body stops only at an unescaped quote, so
+# a quote that does not match "string" is unterminated and runs to the end.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<space>[ \r\t]+)
+  | (?P<newline>\n)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<punct>->|::|[!=<>]=|[(){}\[\],.+;*%|:!=<>-]|/(?![/*]))
+  | (?P<hex>0x[0-9a-fA-F]*)
+  | (?P<binary>0b[01]*)
+  | (?P<number>[0-9]+(?:\.[0-9]+)?)
+  | (?P<string>"(?:\\"|\\(?!")|[^"\\])*"|'(?:\\'|\\(?!')|[^'\\])*')
+  | (?P<unterminated>["'][\s\S]*)
+  | (?P<comment>//[^\n]*)
+  | (?P<block_comment>/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<error>[\s\S])
+""", re.VERBOSE)
+
+class FastLexer:
+    """
+    Produces the same tokens as Lexer, but matches each lexeme with one
+    compiled regex (TOKEN_PATTERN) instead of a character at a time. Errors
+    are reported with the same messages.
+    """
+
+    def __init__(self, source, offsets=False):
+        self.source = source
+        self.offsets = offsets
+        self.tokens = []
+        self.line = 1
+
+    def scan_tokens(self):
+        source = self.source
+        tokens = self.tokens
+        keywords = KEYWORDS
+        punctuation = PUNCTUATION
+        identifier = TokenType.IDENTIFIER
+        number = TokenType.NUMBER
+        intern = sys.intern
+        offsets = self.offsets
+        line = 1
+
+        for match in TOKEN_PATTERN.finditer(source):
+            kind = match.lastgroup
+            text = match.group()
+
+            if kind == "space":
+                continue
+            elif kind == "name":
+                text = intern(text)
+                tokens.append(Token(keywords.get(text, identifier), text, None, line))
+            elif kind == "punct":
+                text = intern(text)
+                tokens.append(Token(punctuation[text], text, None, line))
+            elif kind == "newline":
+                line += 1
+            elif kind == "number":
+                value = float(text)
+                if value.is_integer():
+                    value = int(value)
+                tokens.append(Token(number, text, value, line))
+            elif kind == "string":
+                line += text.count("\n")
+                if offsets:
+                    start, end = match.span()
+                    tokens.append(SourceToken(TokenType.STRING, source, start, end, self.unescape(text[1:-1]), line))
+                else:
+                    tokens.append(Token(TokenType.STRING, text, self.unescape(text[1:-1]), line))
+            elif kind == "comment":
+                continue
+            elif kind == "block_comment":
+                line += text.count("\n")
+            elif kind == "unterminated":
+                line += text.count("\n")
+                print(f"Unterminated string at line {line}")
+            elif kind == "hex":
+                tokens.append(Token(number, text, int(text[2:], 16), line))
+            elif kind == "binary":
+                tokens.append(Token(number, text, int(text[2:], 2), line))
+            else:
+                print(f"Unexpected character at line {line}: {text}")
+
+        self.line = line
+        tokens.append(Token(TokenType.EOF, "", None, line))
+        return tokens
+
+    def unescape(self, value):
+        # Same replacements, in the same order, as Lexer.string
+        return (value.replace('\\n', '\n')
+                     .replace('\\t', '\t')
+                     .replace('\\r', '\r')
+                     .replace('\\\\', '\\')
+                     .replace('\\"', '"')
+                     .replace("\\'", "'"))
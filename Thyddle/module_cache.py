@@ -0,0 +1,107 @@
+# module_cache.py
+import os
+import pickle
+
+# Bump whenever the AST classes change shape so stale .thyc files are ignored
+CACHE_VERSION = 11
+CACHE_DIR = "__thycache__"
+
+class ModuleCache:
+    """
+    Caches parsed (and resolved) modules by absolute path, checked against the
+    file's mtime and size. With `use_disk` the parsed form is also pickled to
+    __thycache__/<name>.thyc next to the module, so later processes skip lexing
+    and parsing too.
+    """
+
+    def __init__(self, use_disk=True):
+        self.use_disk = use_disk
+        self.modules = {}     # (path, variant) -> (mtime_ns, size, statements)
+        self.hits = 0         # served from memory
+        self.disk_hits = 0    # served from a .thyc file
+        self.misses = 0       # lexed and parsed from source
+        self.disk_writes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "disk_writes": self.disk_writes,
+        }
+
+    def clear(self):
+        self.modules.clear()
+
+    def load(self, path, parse, variant=None):
+        """
+        Returns the statements for the module at `path`, calling
+        `parse(source)` only when no cached copy is current. `variant` names
+        a different way of parsing the same file (e.g. "noopt"), cached
+        separately. Raises FileNotFoundError if the module does not exist.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self.modules.get((path, variant))
+        if cached is not None and cached[:2] == key:
+            self.hits += 1
+            return cached[2]
+
+        statements = self.read_disk(path, key, variant) if self.use_disk else None
+        if statements is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            with open(path, "r") as f:
+                source = f.read()
+            statements = parse(source)
+            if None in statements:
+                # Parse errors: don't cache, so they are reported again next time
+                return statements
+            if self.use_disk:
+                self.write_disk(path, key, statements, variant)
+
+        self.modules[(path, variant)] = (key[0], key[1], statements)
+        return statements
+
+    def disk_path(self, path, variant=None):
+        directory, name = os.path.split(path)
+        name = os.path.splitext(name)[0]
+        if variant is not None:
+            name = f"{name}.{variant}"
+        return os.path.join(directory, CACHE_DIR, name + ".thyc")
+
+    def read_disk(self, path, key, variant=None):
+        try:
+            with open(self.disk_path(path, variant), "rb") as f:
+                data = pickle.load(f)
+        except Exception:
+            # Missing, unreadable, truncated or from an incompatible version
+            return None
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or data.get("source") != key:
+            return None
+        return data["statements"]
+
+    def write_disk(self, path, key, statements, variant=None):
+        cache_path = self.disk_path(path, variant)
+        data = {"version": CACHE_VERSION, "source": key, "statements": statements}
+        # Write then rename, so a concurrent reader never sees half a file
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(temp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, cache_path)
+            self.disk_writes += 1
+        except (OSError, pickle.PickleError, RecursionError):
+            # The cache is only an optimisation (read-only directory, very deep AST, ...)
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+# Shared by every Interpreter in the process
+module_cache = ModuleCache()
@@ -0,0 +1,285 @@
+# optimizer.py
+from Thyddle.parser import (
+    Expression, Statement, Binary, Grouping, Literal, Unary, Variable, Assign, Logical,
+    Call, Get, Set, Index, SetIndex, ArrayLiteral, ObjectLiteral,
+    ExpressionStatement, VarStatement, BlockStatement, IfStatement, WhileStatement,
+    ForStatement, ForInStatement, FunctionStatement, ReturnStatement, BreakStatement,
+    ContinueStatement, ImportStatement, LambdaExpression
+)
+from Thyddle.lexer import TokenType
+
+class LenCall(Call):
+    """
+    A `len(x)` call in a loop condition, which runs on every iteration. It
+    is still a Call to the resolver and the compiler; the interpreter
+    evaluates it without building an argument list or going through
+    len()'s NativeFunction, as long as `len` still names the built-in.
+    The length itself is read on every evaluation, so appending to or
+    popping from `x` in the loop is always seen.
+    """
+    __slots__ = ()
+
+class HoistedLenCall(LenCall):
+    """
+    A LenCall whose argument is a local that nothing can reassign while the
+    loop runs. The loop looks the collection up once, before it starts (see
+    Interpreter.hoist_lengths): a string's length can't change, and an
+    array's is read from the array held there, so array.append/pop in the
+    loop are still seen. The hoist is dropped if anything defines a `len`.
+    """
+    __slots__ = ()
+
+def nodes_in(value):
+    # Every Expression and Statement in `value` (a node, or lists and tuples
+    # of them), nested functions included
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, (Expression, Statement)):
+            yield value
+            for cls in type(value).__mro__:
+                for name in getattr(cls, "__slots__", ()):
+                    # Inline caches hold runtime values, not nodes
+                    if not name.startswith("cached_"):
+                        stack.append(getattr(value, name, None))
+
+def bindings(value):
+    """
+    How often each name is declared (var, func, parameters, for-in) in
+    `value`, and the names it assigns to.
+    """
+    declared = {}
+    assigned = set()
+    for node in nodes_in(value):
+        if isinstance(node, (VarStatement, FunctionStatement, ForInStatement)):
+            declared[node.name] = declared.get(node.name, 0) + 1
+        elif isinstance(node, Assign):
+            assigned.add(node.name)
+        if isinstance(node, (FunctionStatement, LambdaExpression)):
+            for param in node.params:
+                declared[param] = declared.get(param, 0) + 1
+    return declared, assigned
+
+class Optimizer:
+    """
+    Rewrites a parsed program before it is resolved and run:
+
+    - unary and binary operators over literals are replaced by their value,
+      computed with the interpreter's own evaluate, so the result is exactly
+      what running them would give. An operation that raises (division by
+      zero, "a" - 1, ...) is left in place so the error still happens at
+      runtime.
+    - `and`/`or` with a literal left side become the side that would be picked.
+    - Grouping wrappers are dropped.
+    - if/elseif branches with a literal condition are kept or removed, and
+      `while` loops whose condition is a false literal are removed. A
+      statement that disappears becomes an empty block, so it still runs
+      (and evaluates) to nil.
+    - `len(x)` calls in while/for conditions become LenCall nodes, or
+      HoistedLenCall nodes when `x` is a local nothing can reassign while
+      the loop runs. The loop keeps those in its `hoisted` list.
+    """
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.folded = 0
+        self.len_calls = 0
+        self.hoisted = 0
+        # The program being optimized, and the outermost function around the
+        # code being optimized (None at the top level)
+        self.module = None
+        self.function = None
+        # Their bindings(), worked out the first time a loop needs them
+        self.scans = {}
+
+    def optimize(self, statements):
+        if self.module is None:
+            self.module = statements
+        return [self.statement(stmt) for stmt in statements]
+
+    def scan(self, root):
+        scan = self.scans.get(id(root))
+        if scan is None:
+            scan = self.scans[id(root)] = bindings(root)
+        return scan
+
+    def invariant(self, name):
+        """
+        Whether a local called `name`, read in a loop condition, keeps the
+        same value while the loop runs. Anything that could reassign it is
+        in the outermost function around the loop, or in the module when
+        it's declared outside any function: it has to be declared there once
+        and never assigned, and `len` must not be rebound anywhere.
+        """
+        declared, assigned = self.scan(self.module)
+        if "len" in declared or "len" in assigned:
+            return False
+        if self.function is not None:
+            function_declared, function_assigned = self.scan(self.function)
+            if name in function_declared:
+                return function_declared[name] == 1 and name not in function_assigned
+        return declared.get(name, 0) == 1 and name not in assigned
+
+    def function_body(self, function, optimize):
+        # Runs optimize() with `function` as the outermost function, unless
+        # it is nested in one
+        if self.function is not None:
+            return optimize()
+        self.function = function
+        try:
+            return optimize()
+        finally:
+            self.function = None
+
+    def fold(self, expr):
+        try:
+            value = self.interpreter.evaluate(expr)
+        except Exception:
+            # Keep the node so the error is raised when (and if) it runs
+            return expr
+        self.folded += 1
+        return Literal(value)
+
+    # Statements -------------------------------------------------------------
+
+    def empty(self, stmt):
+        # Stands in for a statement that was removed
+        block = BlockStatement([])
+        block.line = stmt.line
+        block.module = stmt.module
+        return block
+
+    def statement(self, stmt):
+        if stmt is None:
+            return None
+
+        if isinstance(stmt, ExpressionStatement):
+            stmt.expression = self.expression(stmt.expression)
+        elif isinstance(stmt, VarStatement):
+            stmt.initializer = self.expression(stmt.initializer)
+        elif isinstance(stmt, BlockStatement):
+            stmt.statements = self.optimize(stmt.statements)
+        elif isinstance(stmt, IfStatement):
+            return self.if_statement(stmt)
+        elif isinstance(stmt, WhileStatement):
+            stmt.condition = self.expression(stmt.condition)
+            if isinstance(stmt.condition, Literal) and not self.interpreter.is_truthy(stmt.condition.value):
+                return self.empty(stmt)
+            stmt.hoisted = self.loop_condition(stmt.condition, [])
+            stmt.body = self.statement(stmt.body)
+        elif isinstance(stmt, ForStatement):
+            stmt.initializer = self.statement(stmt.initializer)
+            stmt.condition = self.expression(stmt.condition)
+            stmt.hoisted = self.loop_condition(stmt.condition, [])
+            stmt.increment = self.expression(stmt.increment)
+            stmt.body = self.statement(stmt.body)
+        elif isinstance(stmt, ForInStatement):
+            stmt.iterable = self.expression(stmt.iterable)
+            stmt.body = self.statement(stmt.body)
+        elif isinstance(stmt, FunctionStatement):
+            stmt.body = self.function_body(stmt, lambda: self.optimize(stmt.body))
+        elif isinstance(stmt, ReturnStatement):
+            stmt.value = self.expression(stmt.value)
+        elif isinstance(stmt, (BreakStatement, ContinueStatement, ImportStatement)):
+            pass
+
+        return stmt
+
+    def if_statement(self, stmt):
+        branches = []
+        else_branch = None
+        for condition, branch in [(stmt.condition, stmt.then_branch)] + list(stmt.else_if_branches):
+            condition = self.expression(condition)
+            branch = self.statement(branch)
+            if not isinstance(condition, Literal):
+                branches.append((condition, branch))
+            elif self.interpreter.is_truthy(condition.value):
+                # Always taken: it ends the chain
+                else_branch = branch
+                break
+        else:
+            else_branch = self.statement(stmt.else_branch)
+
+        if not branches:
+            return else_branch if else_branch is not None else self.empty(stmt)
+
+        stmt.condition, stmt.then_branch = branches[0]
+        stmt.else_if_branches = branches[1:]
+        stmt.else_branch = else_branch
+        return stmt
+
+    def loop_condition(self, expr, hoisted):
+        # Turns the len(x) calls in a loop condition into LenCalls, and
+        # returns the ones that can be hoisted (None if there are none)
+        if isinstance(expr, (Binary, Logical)):
+            self.loop_condition(expr.left, hoisted)
+            self.loop_condition(expr.right, hoisted)
+        elif isinstance(expr, Unary):
+            self.loop_condition(expr.right, hoisted)
+        elif (type(expr) is Call and isinstance(expr.callee, Variable)
+              and expr.callee.name == "len" and len(expr.arguments) == 1):
+            argument = expr.arguments[0]
+            if isinstance(argument, Variable) and self.invariant(argument.name):
+                expr.__class__ = HoistedLenCall
+                hoisted.append(expr)
+                self.hoisted += 1
+            else:
+                expr.__class__ = LenCall
+            self.len_calls += 1
+        return hoisted or None
+
+    # Expressions ------------------------------------------------------------
+
+    def expression(self, expr):
+        if expr is None or isinstance(expr, (Literal, Variable)):
+            return expr
+
+        if isinstance(expr, Grouping):
+            return self.expression(expr.expression)
+        elif isinstance(expr, Binary):
+            expr.left = self.expression(expr.left)
+            expr.right = self.expression(expr.right)
+            if isinstance(expr.left, Literal) and isinstance(expr.right, Literal):
+                return self.fold(expr)
+        elif isinstance(expr, Unary):
+            expr.right = self.expression(expr.right)
+            if isinstance(expr.right, Literal):
+                return self.fold(expr)
+        elif isinstance(expr, Logical):
+            expr.left = self.expression(expr.left)
+            expr.right = self.expression(expr.right)
+            if isinstance(expr.left, Literal):
+                truthy = self.interpreter.is_truthy(expr.left.value)
+                if truthy == (expr.op == TokenType.OR):
+                    return expr.left
+                return expr.right
+        elif isinstance(expr, Assign):
+            expr.value = self.expression(expr.value)
+        elif isinstance(expr, Call):
+            expr.callee = self.expression(expr.callee)
+            expr.arguments = [self.expression(argument) for argument in expr.arguments]
+        elif isinstance(expr, Get):
+            expr.obj = self.expression(expr.obj)
+        elif isinstance(expr, Set):
+            expr.obj = self.expression(expr.obj)
+            expr.value = self.expression(expr.value)
+        elif isinstance(expr, Index):
+            expr.obj = self.expression(expr.obj)
+            expr.index = self.expression(expr.index)
+        elif isinstance(expr, SetIndex):
+            expr.obj = self.expression(expr.obj)
+            expr.index = self.expression(expr.index)
+            expr.value = self.expression(expr.value)
+        elif isinstance(expr, ArrayLiteral):
+            expr.elements = [self.expression(element) for element in expr.elements]
+        elif isinstance(expr, ObjectLiteral):
+            expr.properties = [(key, self.expression(value)) for key, value in expr.properties]
+        elif isinstance(expr, LambdaExpression):
+            if isinstance(expr.body, ReturnStatement):
+                expr.body.value = self.function_body(expr, lambda: self.expression(expr.body.value))
+            else:
+                expr.body = self.function_body(expr, lambda: self.statement(expr.body))
+
+        return expr
@@ -1,22 +1,33 @@
 # parser.py
-from Thyddle.lexer import TokenType, Token
+from Thyddle.lexer import TokenType, Token, PUNCTUATION
 
 class ParseError(Exception):
     pass
 
+# Lexemes for printing operators, which nodes store as TokenTypes
+OPERATOR_LEXEMES = {token_type: lexeme for lexeme, token_type in PUNCTUATION.items()}
+OPERATOR_LEXEMES[TokenType.AND] = "and"
+OPERATOR_LEXEMES[TokenType.OR] = "or"
+
+# Nodes keep only what evaluation needs: operators as their TokenType (`op`)
+# and names as plain strings, not the Tokens they were parsed from.
 class Expression:
-    pass
+    __slots__ = ()
 
 class Binary(Expression):
-    def __init__(self, left, operator, right):
+    __slots__ = ("left", "op", "right")
+    
+    def __init__(self, left, op, right):
         self.left = left
-        self.operator = operator
+        self.op = op
         self.right = right
     
     def __str__(self):
-        return f"({self.left} {self.operator.lexeme} {self.right})"
+        return f"({self.left} {OPERATOR_LEXEMES[self.op]} {self.right})"
 
 class Grouping(Expression):
+    __slots__ = ("expression",)
+    
     def __init__(self, expression):
         self.expression = expression
     
@@ -24,6 +35,8 @@ class Grouping(Expression):
         return f"(group {self.expression})"
 
 class Literal(Expression):
+    __slots__ = ("value",)
+    
     def __init__(self, value):
         self.value = value
     
@@ -31,65 +44,99 @@ class Literal(Expression):
         return str(self.value) if self.value is not None else "nil"
 
 class Unary(Expression):
-    def __init__(self, operator, right):
-        self.operator = operator
+    __slots__ = ("op", "right")
+    
+    def __init__(self, op, right):
+        self.op = op
         self.right = right
     
     def __str__(self):
-        return f"({self.operator.lexeme} {self.right})"
+        return f"({OPERATOR_LEXEMES[self.op]} {self.right})"
 
 class Variable(Expression):
+    __slots__ = ("name", "depth", "slot")
+    
     def __init__(self, name):
         self.name = name
+        # Filled in by the Resolver; None means look the name up at runtime
+        self.depth = None
+        self.slot = None
     
     def __str__(self):
-        return f"(var {self.name.lexeme})"
+        return f"(var {self.name})"
 
 class Assign(Expression):
+    __slots__ = ("name", "value", "depth", "slot", "append")
+    
     def __init__(self, name, value):
         self.name = name
         self.value = value
+        self.depth = None
+        self.slot = None
+        # (x, a, b, ...) for `x = x + a + b ...`, set by the Resolver
+        self.append = None
     
     def __str__(self):
-        return f"(assign {self.name.lexeme} {self.value})"
+        return f"(assign {self.name} {self.value})"
 
 class Logical(Expression):
-    def __init__(self, left, operator, right):
+    __slots__ = ("left", "op", "right")
+    
+    def __init__(self, left, op, right):
         self.left = left
-        self.operator = operator
+        self.op = op
         self.right = right
     
     def __str__(self):
-        return f"({self.operator.lexeme} {self.left} {self.right})"
+        return f"({OPERATOR_LEXEMES[self.op]} {self.left} {self.right})"
 
 class Call(Expression):
-    def __init__(self, callee, paren, arguments):
+    __slots__ = ("callee", "arguments")
+    
+    def __init__(self, callee, arguments):
         self.callee = callee
-        self.paren = paren
         self.arguments = arguments
     
     def __str__(self):
         args_str = ", ".join(str(arg) for arg in self.arguments)
         return f"(call {self.callee} [{args_str}])"
 
+# What the inline cache gives when it has nothing for an object; never a value
+NOT_CACHED = object()
+
 class Get(Expression):
+    # The cached_* slots are the node's inline cache, filled in by the
+    # interpreter (see interpreter.cached_property): the id of the last
+    # object read, its version, the value it gave and a weak reference that
+    # empties the cache when the object goes away. Nodes are shared by every
+    # Interpreter, so they must not keep objects alive.
+    __slots__ = ("obj", "name", "cached_id", "cached_version", "cached_value", "cached_ref")
+    
     def __init__(self, obj, name):
         self.obj = obj
         self.name = name
+        self.cached_id = None
+        self.cached_version = -1
+        self.cached_value = None
+        self.cached_ref = None
     
     def __str__(self):
-        return f"(get {self.obj} {self.name.lexeme})"
+        return f"(get {self.obj} {self.name})"
 
 class Set(Expression):
+    __slots__ = ("obj", "name", "value")
+    
     def __init__(self, obj, name, value):
         self.obj = obj
         self.name = name
         self.value = value
     
     def __str__(self):
-        return f"(set {self.obj} {self.name.lexeme} {self.value})"
+        return f"(set {self.obj} {self.name} {self.value})"
 
 class Index(Expression):
+    __slots__ = ("obj", "index")
+    
     def __init__(self, obj, index):
         self.obj = obj
         self.index = index
@@ -98,6 +145,8 @@ class Index(Expression):
         return f"(index {self.obj} {self.index})"
 
 class SetIndex(Expression):
+    __slots__ = ("obj", "index", "value")
+    
     def __init__(self, obj, index, value):
         self.obj = obj
         self.index = index
@@ -107,6 +156,8 @@ class SetIndex(Expression):
         return f"(set-index {self.obj} {self.index} {self.value})"
 
 class ArrayLiteral(Expression):
+    __slots__ = ("elements",)
+    
     def __init__(self, elements):
         self.elements = elements
     
@@ -115,28 +166,41 @@ class ArrayLiteral(Expression):
         return f"[{elements_str}]"
 
 class ObjectLiteral(Expression):
+    __slots__ = ("properties",)
+    
     def __init__(self, properties):
-        self.properties = properties
+        self.properties = properties  # List of (key, value expression)
     
     def __str__(self):
         prop_strs = []
         for key, value in self.properties:
-            prop_strs.append(f"{key.lexeme}: {value}")
+            prop_strs.append(f"{key}: {value}")
         return f"{{{', '.join(prop_strs)}}}"
 
 class Statement:
-    pass
+    # The source line the statement starts on and the absolute path of the
+    # file it is in (None for the REPL and eval), set by the Parser (used
+    # by the profiler)
+    __slots__ = ("line", "module")
 
 class LambdaExpression(Expression):
-    def __init__(self, params, body):
-        self.params = params  # List of parameter tokens
+    __slots__ = ("params", "body", "scope_size", "scope_names", "line", "module")
+    
+    def __init__(self, params, body, line=0, module=None):
+        self.params = params  # List of parameter names
         self.body = body      # Body statement or expression
+        self.scope_size = 0   # Filled in by the Resolver
+        self.scope_names = None
+        self.line = line
+        self.module = module
     
     def __str__(self):
-        params_str = ", ".join(param.lexeme for param in self.params)
+        params_str = ", ".join(self.params)
         return f"(lambda ({params_str}) {self.body})"
 
 class ExpressionStatement(Statement):
+    __slots__ = ("expression",)
+    
     def __init__(self, expression):
         self.expression = expression
     
@@ -144,25 +208,37 @@ class ExpressionStatement(Statement):
         return f"{self.expression};"
 
 class VarStatement(Statement):
+    __slots__ = ("name", "initializer", "is_const", "slot")
+    
     def __init__(self, name, initializer, is_const=False):
         self.name = name
         self.initializer = initializer
         self.is_const = is_const
+        self.slot = None
     
     def __str__(self):
         keyword = "const" if self.is_const else "var"
         initializer = f" = {self.initializer}" if self.initializer else ""
-        return f"{keyword} {self.name.lexeme}{initializer};"
+        return f"{keyword} {self.name}{initializer};"
 
 class BlockStatement(Statement):
+    __slots__ = ("statements", "scope_size", "scope_names", "needs_scope")
+    
     def __init__(self, statements):
         self.statements = statements
+        self.scope_size = 0
+        self.scope_names = None
+        # Cleared by the Resolver for a block that declares nothing, which
+        # then runs in the enclosing environment
+        self.needs_scope = True
     
     def __str__(self):
         stmts = "\n".join(str(stmt) for stmt in self.statements)
         return f"{{\n{stmts}\n}}"
 
 class IfStatement(Statement):
+    __slots__ = ("condition", "then_branch", "else_if_branches", "else_branch")
+    
     def __init__(self, condition, then_branch, else_if_branches, else_branch):
         self.condition = condition
         self.then_branch = then_branch
@@ -178,19 +254,28 @@ class IfStatement(Statement):
         return result
 
 class WhileStatement(Statement):
+    # `hoisted` lists the condition's HoistedLenCalls (set by the Optimizer)
+    __slots__ = ("condition", "body", "hoisted")
+    
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
+        self.hoisted = None
     
     def __str__(self):
         return f"while ({self.condition}) {self.body}"
 
 class ForStatement(Statement):
+    __slots__ = ("initializer", "condition", "increment", "body", "scope_size", "scope_names", "hoisted")
+    
     def __init__(self, initializer, condition, increment, body):
         self.initializer = initializer
         self.condition = condition
         self.increment = increment
         self.body = body
+        self.scope_size = 0
+        self.scope_names = None
+        self.hoisted = None
     
     def __str__(self):
         init = str(self.initializer) if self.initializer else ";"
@@ -198,40 +283,62 @@ class ForStatement(Statement):
         inc = str(self.increment) if self.increment else ""
         return f"for ({init} {cond}; {inc}) {self.body}"
 
+class ForInStatement(Statement):
+    __slots__ = ("name", "iterable", "body", "slot", "scope_size", "scope_names")
+    
+    def __init__(self, name, iterable, body):
+        self.name = name
+        self.iterable = iterable
+        self.body = body
+        self.slot = None
+        self.scope_size = 0
+        self.scope_names = None
+    
+    def __str__(self):
+        return f"for ({self.name} in {self.iterable}) {self.body}"
+
 class FunctionStatement(Statement):
+    __slots__ = ("name", "params", "body", "slot", "scope_size", "scope_names")
+    
     def __init__(self, name, params, body):
         self.name = name
         self.params = params
         self.body = body
+        self.slot = None
+        self.scope_size = 0
+        self.scope_names = None
     
     def __str__(self):
-        params_str = ", ".join(param.lexeme for param in self.params)
-        return f"function {self.name.lexeme}({params_str}) {self.body}"
+        params_str = ", ".join(self.params)
+        return f"function {self.name}({params_str}) {self.body}"
 
 class ReturnStatement(Statement):
-    def __init__(self, keyword, value):
-        self.keyword = keyword
+    __slots__ = ("value", "tail_call")
+    
+    def __init__(self, value):
         self.value = value
+        # Set by the Resolver for `return f(...)` inside a function
+        self.tail_call = False
     
     def __str__(self):
         value = f" {self.value}" if self.value else ""
         return f"return{value};"
 
 class BreakStatement(Statement):
-    def __init__(self, keyword):
-        self.keyword = keyword
+    __slots__ = ()
     
     def __str__(self):
         return "break;"
 
 class ContinueStatement(Statement):
-    def __init__(self, keyword):
-        self.keyword = keyword
+    __slots__ = ()
     
     def __str__(self):
         return "continue;"
 
 class ImportStatement(Statement):
+    __slots__ = ("module_name",)
+    
     def __init__(self, module_name):
         self.module_name = module_name
     
@@ -239,9 +346,10 @@ class ImportStatement(Statement):
         return f"import {self.module_name};"
 
 class Parser:
-    def __init__(self, tokens):
+    def __init__(self, tokens, module=None):
         self.tokens = tokens
         self.current = 0
+        self.module = module  # Path of the file being parsed, if any
     
     def parse(self):
         statements = []
@@ -250,20 +358,25 @@ class Parser:
         return statements
     
     def declaration(self):
+        line = self.peek().line
         try:
             if self.match(TokenType.VAR):
-                return self.var_declaration(False)
-            if self.match(TokenType.CONST):
-                return self.var_declaration(True)
-            if self.match(TokenType.FUNC):
-                return self.function_declaration()
-            if self.match(TokenType.IMPORT):
-                return self.import_declaration()
-            
-            return self.statement()
+                stmt = self.var_declaration(False)
+            elif self.match(TokenType.CONST):
+                stmt = self.var_declaration(True)
+            elif self.match(TokenType.FUNC):
+                stmt = self.function_declaration()
+            elif self.match(TokenType.IMPORT):
+                stmt = self.import_declaration()
+            else:
+                stmt = self.statement()
         except ParseError:
             self.synchronize()
             return None
+        
+        stmt.line = line
+        stmt.module = self.module
+        return stmt
     
     def var_declaration(self, is_const):
         name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
@@ -273,7 +386,7 @@ class Parser:
             initializer = self.expression()
         
         self.consume(TokenType.SEMICOLON, "Expect ';' after variable declaration.")
-        return VarStatement(name, initializer, is_const)
+        return VarStatement(name.lexeme, initializer, is_const)
     
     def function_declaration(self):
         name = self.consume(TokenType.IDENTIFIER, "Expect function name.")
@@ -282,18 +395,18 @@ class Parser:
         parameters = []
         
         if not self.check(TokenType.RIGHT_PAREN):
-            parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
+            parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name.").lexeme)
             while self.match(TokenType.COMMA):
                 if len(parameters) >= 255:
                     self.error(self.peek(), "Cannot have more than 255 parameters.")
-                parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
+                parameters.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name.").lexeme)
         
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
         
         self.consume(TokenType.LEFT_BRACE, "Expect '{' before function body.")
         body = self.block()
         
-        return FunctionStatement(name, parameters, body)
+        return FunctionStatement(name.lexeme, parameters, body)
     
     def import_declaration(self):
         # Check if the module is a string literal
@@ -312,22 +425,27 @@ class Parser:
 
     
     def statement(self):
+        line = self.peek().line
         if self.match(TokenType.IF):
-            return self.if_statement()
-        if self.match(TokenType.WHILE):
-            return self.while_statement()
-        if self.match(TokenType.FOR):
-            return self.for_statement()
-        if self.match(TokenType.RETURN):
-            return self.return_statement()
-        if self.match(TokenType.BREAK):
-            return self.break_statement()
-        if self.match(TokenType.CONTINUE):
-            return self.continue_statement()
-        if self.match(TokenType.LEFT_BRACE):
-            return BlockStatement(self.block())
+            stmt = self.if_statement()
+        elif self.match(TokenType.WHILE):
+            stmt = self.while_statement()
+        elif self.match(TokenType.FOR):
+            stmt = self.for_statement()
+        elif self.match(TokenType.RETURN):
+            stmt = self.return_statement()
+        elif self.match(TokenType.BREAK):
+            stmt = self.break_statement()
+        elif self.match(TokenType.CONTINUE):
+            stmt = self.continue_statement()
+        elif self.match(TokenType.LEFT_BRACE):
+            stmt = BlockStatement(self.block())
+        else:
+            stmt = self.expression_statement()
         
-        return self.expression_statement()
+        stmt.line = line
+        stmt.module = self.module
+        return stmt
     
     def if_statement(self):
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
@@ -361,7 +479,20 @@ class Parser:
     def for_statement(self):
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
         
+        # for (x in values) / for (var x in values); `in` is only special here
+        start = self.current
+        self.match(TokenType.VAR)
+        if self.check(TokenType.IDENTIFIER) and self.is_in(self.tokens[self.current + 1]):
+            name = self.advance().lexeme
+            self.advance()
+            iterable = self.expression()
+            self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for-in clause.")
+            body = self.statement()
+            return ForInStatement(name, iterable, body)
+        self.current = start
+        
         # Initializer
+        line = self.peek().line
         initializer = None
         if self.match(TokenType.SEMICOLON):
             initializer = None
@@ -371,6 +502,9 @@ class Parser:
             initializer = self.var_declaration(True)
         else:
             initializer = self.expression_statement()
+        if initializer is not None:
+            initializer.line = line
+            initializer.module = self.module
         
         # Condition
         condition = None
@@ -388,25 +522,25 @@ class Parser:
         
         return ForStatement(initializer, condition, increment, body)
     
+    def is_in(self, token):
+        return token.type == TokenType.IDENTIFIER and token.lexeme == "in"
+    
     def return_statement(self):
-        keyword = self.previous()
         value = None
         
         if not self.check(TokenType.SEMICOLON):
             value = self.expression()
         
         self.consume(TokenType.SEMICOLON, "Expect ';' after return value.")
-        return ReturnStatement(keyword, value)
+        return ReturnStatement(value)
     
     def break_statement(self):
-        keyword = self.previous()
         self.consume(TokenType.SEMICOLON, "Expect ';' after 'break'.")
-        return BreakStatement(keyword)
+        return BreakStatement()
     
     def continue_statement(self):
-        keyword = self.previous()
         self.consume(TokenType.SEMICOLON, "Expect ';' after 'continue'.")
-        return ContinueStatement(keyword)
+        return ContinueStatement()
     
     def block(self):
         statements = []
@@ -449,7 +583,7 @@ class Parser:
         while self.match(TokenType.OR):
             operator = self.previous()
             right = self.and_expr()
-            expr = Logical(expr, operator, right)
+            expr = Logical(expr, operator.type, right)
         
         return expr
     
@@ -459,7 +593,7 @@ class Parser:
         while self.match(TokenType.AND):
             operator = self.previous()
             right = self.equality()
-            expr = Logical(expr, operator, right)
+            expr = Logical(expr, operator.type, right)
         
         return expr
     
@@ -469,7 +603,7 @@ class Parser:
         while self.match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
             operator = self.previous()
             right = self.comparison()
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.type, right)
         
         return expr
     
@@ -479,7 +613,7 @@ class Parser:
         while self.match(TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL):
             operator = self.previous()
             right = self.term()
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.type, right)
         
         return expr
     
@@ -489,7 +623,7 @@ class Parser:
         while self.match(TokenType.MINUS, TokenType.PLUS):
             operator = self.previous()
             right = self.factor()
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.type, right)
         
         return expr
     
@@ -499,7 +633,7 @@ class Parser:
         while self.match(TokenType.SLASH, TokenType.STAR, TokenType.MODULO):
             operator = self.previous()
             right = self.unary()
-            expr = Binary(expr, operator, right)
+            expr = Binary(expr, operator.type, right)
         
         return expr
     
@@ -507,7 +641,7 @@ class Parser:
         if self.match(TokenType.BANG, TokenType.MINUS):
             operator = self.previous()
             right = self.unary()
-            return Unary(operator, right)
+            return Unary(operator.type, right)
         
         return self.call()
     
@@ -519,7 +653,7 @@ class Parser:
                 expr = self.finish_call(expr)
             elif self.match(TokenType.DOT):
                 name = self.consume(TokenType.IDENTIFIER, "Expect property name after '.'.")
-                expr = Get(expr, name)
+                expr = Get(expr, name.lexeme)
             elif self.match(TokenType.LEFT_BRACKET):
                 index = self.expression()
                 self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after array index.")
@@ -540,9 +674,9 @@ class Parser:
                     self.error(self.peek(), "Cannot have more than 255 arguments.")
                 arguments.append(self.expression())
         
-        paren = self.consume(TokenType.RIGHT_PAREN, "Expect ')' after arguments.")
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after arguments.")
         
-        return Call(callee, paren, arguments)
+        return Call(callee, arguments)
     
     # Fix for parser.py - Lambda Expression Handling
 
@@ -558,10 +692,11 @@ class Parser:
             return Literal(self.previous().literal)
         
         if self.match(TokenType.IDENTIFIER):
-            return Variable(self.previous())
+            return Variable(self.previous().lexeme)
         
         # Handle lambdas with arrow syntax
         if self.match(TokenType.LEFT_PAREN):
+            line = self.previous().line
             # Check if this is a lambda expression or just a grouping
             if self.check(TokenType.RIGHT_PAREN) or self.check(TokenType.IDENTIFIER):
                 # Save current position in case this is not a lambda
@@ -569,11 +704,11 @@ class Parser:
                 params = []
                 
                 if not self.check(TokenType.RIGHT_PAREN):
-                    params.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
+                    params.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name.").lexeme)
                     while self.match(TokenType.COMMA):
                         if len(params) >= 255:
                             self.error(self.peek(), "Cannot have more than 255 parameters.")
-                        params.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
+                        params.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name.").lexeme)
                 
                 # If we see => after parameters, it's a lambda
                 if self.match(TokenType.RIGHT_PAREN) and self.match(TokenType.ARROW):
@@ -584,9 +719,11 @@ class Parser:
                         body = BlockStatement(self.block())
                     else:
                         expr = self.expression()
-                        body = ReturnStatement(None, expr)
+                        body = ReturnStatement(expr)
+                    body.line = line
+                    body.module = self.module
                     
-                    return LambdaExpression(params, body)
+                    return LambdaExpression(params, body, line, self.module)
                 else:
                     # Not a lambda, restore position and continue as grouping
                     self.current = current_pos
@@ -617,7 +754,7 @@ class Parser:
                 # Get the first property name
                 if not self.check(TokenType.IDENTIFIER):
                     self.error(self.peek(), "Expect property name.")
-                key = self.consume(TokenType.IDENTIFIER, "Expect property name.")
+                key = self.consume(TokenType.IDENTIFIER, "Expect property name.").lexeme
                 
                 # Ensure colon exists
                 self.consume(TokenType.COLON, "Expect ':' after property name.")
@@ -634,7 +771,7 @@ class Parser:
                     # Get next property
                     if not self.check(TokenType.IDENTIFIER):
                         self.error(self.peek(), "Expect property name.")
-                    key = self.consume(TokenType.IDENTIFIER, "Expect property name.")
+                    key = self.consume(TokenType.IDENTIFIER, "Expect property name.").lexeme
                     
                     # Ensure colon exists
                     self.consume(TokenType.COLON, "Expect ':' after property name.")
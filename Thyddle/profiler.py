@@ -0,0 +1,235 @@
+# profiler.py
+import os
+from time import perf_counter
+
+from Thyddle.parser import FunctionStatement, Get, NOT_CACHED
+from Thyddle.interpreter import Interpreter, ThyddleFunction, NativeFunction, cached_property
+
+def location(module, line):
+    # "lib/standard.thy:11", relative to the working directory when it can
+    # be, or "line 11" for code that isn't from a file (the REPL, eval)
+    if module is None:
+        return f"line {line}"
+    try:
+        path = os.path.relpath(module)
+    except ValueError:
+        # On another drive
+        path = module
+    if path.startswith(os.pardir):
+        path = module
+    return f"{path}:{line}"
+
+def function_label(function):
+    # "fib (main.thy:3)", "<lambda> (lib/standard.thy:12)" or "<native len>"
+    if isinstance(function, NativeFunction):
+        return f"<native {function.name}>"
+    declaration = function.declaration
+    name = declaration.name if isinstance(declaration, FunctionStatement) else "<lambda>"
+    return f"{name} ({location(declaration.module, declaration.line)})"
+
+def call_classes():
+    # Every function class that has its own call method (VM functions included)
+    classes = [NativeFunction]
+    pending = [ThyddleFunction]
+    while pending:
+        cls = pending.pop()
+        if "call" in cls.__dict__:
+            classes.append(cls)
+        pending.extend(cls.__subclasses__())
+    return classes
+
+class Profiler:
+    """
+    Deterministic profiler for Thyddle programs. While it runs, every
+    statement handler and every function's call method are wrapped to time
+    them, so it attributes:
+
+    - to each source line, keyed by file and line number, how often a
+      statement starting there ran and its self time (excluding nested
+      statements, including those in functions it calls);
+    - to each function, its calls, total time and self time (excluding the
+      functions it calls), keyed by name, file and definition line;
+    - to each call stack, its self time, for flamegraph tools;
+    - to each property name, how many reads the Get nodes' inline caches
+      answered and how many had to look the property up.
+
+    Lines are only timed on the tree-walking interpreter; with the VM only
+    functions are. Code typed into the REPL or run by eval() has no file,
+    so its lines are counted together by line number.
+    """
+
+    def __init__(self):
+        self.lines = {}      # (module path, line) -> [count, self time]
+        self.functions = {}  # label -> [calls, total time, self time]
+        self.stacks = {}     # "<main>;f;g" -> self time
+        self.stack = ["<main>"]
+        self.properties = {} # name -> [inline cache hits, misses]
+        self.active = {}     # label -> activations on the stack, for recursion
+        self.line_child = 0.0
+        self.call_child = 0.0
+        self.started = None
+        self.elapsed = 0.0
+        self.saved_executors = None
+        self.saved_evaluators = None
+        self.saved_calls = []
+
+    def start(self):
+        self.saved_executors = Interpreter.executors
+        Interpreter.executors = {
+            node_type: self.timed_statement(handler)
+            for node_type, handler in self.saved_executors.items()
+        }
+        self.saved_evaluators = Interpreter.evaluators
+        Interpreter.evaluators = dict(self.saved_evaluators)
+        Interpreter.evaluators[Get] = self.counted_get()
+        for cls in call_classes():
+            original = cls.__dict__["call"]
+            self.saved_calls.append((cls, original))
+            cls.call = self.timed_call(original)
+
+        self.line_child = 0.0
+        self.call_child = 0.0
+        self.started = perf_counter()
+
+    def stop(self):
+        self.elapsed = perf_counter() - self.started
+        Interpreter.executors = self.saved_executors
+        Interpreter.evaluators = self.saved_evaluators
+        for cls, original in self.saved_calls:
+            cls.call = original
+        self.saved_calls = []
+
+        # Whatever the functions didn't take was spent at the top level
+        main_self = self.elapsed - self.call_child
+        self.stacks["<main>"] = self.stacks.get("<main>", 0.0) + main_self
+
+    def timed_statement(self, handler):
+        lines = self.lines
+
+        def run(interpreter, stmt):
+            saved = self.line_child
+            self.line_child = 0.0
+            start = perf_counter()
+            try:
+                return handler(interpreter, stmt)
+            finally:
+                elapsed = perf_counter() - start
+                key = (stmt.module, stmt.line)
+                stats = lines.get(key)
+                if stats is None:
+                    stats = lines[key] = [0, 0.0]
+                stats[0] += 1
+                stats[1] += elapsed - self.line_child
+                self.line_child = saved + elapsed
+
+        return run
+
+    def counted_get(self):
+        # Interpreter.evaluate_get, counting its inline cache's hits and misses
+        properties = self.properties
+
+        def get(interpreter, expr):
+            obj = interpreter.evaluate(expr.obj)
+            stats = properties.get(expr.name)
+            if stats is None:
+                stats = properties[expr.name] = [0, 0]
+            value = cached_property(expr, obj)
+            if value is NOT_CACHED:
+                stats[1] += 1
+                return interpreter.get_property(expr, obj)
+            stats[0] += 1
+            return value
+
+        return get
+
+    def timed_call(self, original):
+        def call(function, interpreter, arguments):
+            label = function_label(function)
+            self.stack.append(label)
+            self.active[label] = self.active.get(label, 0) + 1
+            saved = self.call_child
+            self.call_child = 0.0
+            start = perf_counter()
+            try:
+                return original(function, interpreter, arguments)
+            finally:
+                elapsed = perf_counter() - start
+                own = elapsed - self.call_child
+                self.call_child = saved + elapsed
+
+                stats = self.functions.get(label)
+                if stats is None:
+                    stats = self.functions[label] = [0, 0.0, 0.0]
+                stats[0] += 1
+                stats[2] += own
+                self.active[label] -= 1
+                if self.active[label] == 0:
+                    # Only the outermost call of a recursive function counts
+                    # towards its total, so time isn't counted twice
+                    stats[1] += elapsed
+
+                key = ";".join(self.stack)
+                self.stacks[key] = self.stacks.get(key, 0.0) + own
+                self.stack.pop()
+
+        return call
+
+    def report(self, limit=20):
+        out = [f"Thyddle profile: {self.elapsed:.3f} s total", ""]
+
+        out.append("Functions by self time")
+        out.append(f"{'calls':>9} {'total s':>10} {'self s':>10}  function")
+        functions = sorted(self.functions.items(), key=lambda item: item[1][2], reverse=True)
+        for label, (calls, total, own) in functions[:limit]:
+            out.append(f"{calls:>9} {total:>10.4f} {own:>10.4f}  {label}")
+        if not functions:
+            out.append("  (no Thyddle function calls)")
+        out.append("")
+
+        out.append("Lines by self time")
+        lines = sorted(self.lines.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        places = [location(module, line) for (module, line), _ in lines]
+        width = max([len(place) for place in places] + [len("line")])
+        out.append(f"{'line':<{width}} {'count':>9} {'self s':>10} {'%':>6}  source")
+        sources = {}  # module path -> its lines, read once
+        for place, ((module, line), (count, own)) in zip(places, lines):
+            text = ""
+            source_lines = self.source_lines(module, sources)
+            if source_lines and 0 < line <= len(source_lines):
+                text = source_lines[line - 1].strip()[:60]
+            share = own / self.elapsed * 100 if self.elapsed else 0.0
+            out.append(f"{place:<{width}} {count:>9} {own:>10.4f} {share:>5.1f}%  {text}")
+        if not lines:
+            out.append("  (no lines timed; the VM only reports functions)")
+        out.append("")
+
+        out.append("Property reads by inline cache misses")
+        out.append(f"{'reads':>9} {'misses':>9} {'hit %':>6}  property")
+        properties = sorted(self.properties.items(), key=lambda item: item[1][1], reverse=True)
+        for name, (hits, misses) in properties[:limit]:
+            reads = hits + misses
+            out.append(f"{reads:>9} {misses:>9} {hits / reads * 100:>5.1f}%  {name}")
+        if not properties:
+            out.append("  (no property reads counted; the VM doesn't cache them)")
+
+        return "\n".join(out)
+
+    def source_lines(self, module, sources):
+        if module is None:
+            return None
+        if module not in sources:
+            try:
+                with open(module, 'r') as f:
+                    sources[module] = f.read().splitlines()
+            except OSError:
+                sources[module] = None
+        return sources[module]
+
+    def write_collapsed(self, path):
+        # One "frame;frame;frame microseconds" line per stack, the format
+        # flamegraph.pl, speedscope and inferno read
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, seconds in sorted(self.stacks.items()):
+                micros = int(seconds * 1_000_000)
+                if micros > 0:
+                    f.write(f"{stack} {micros}\n")
@@ -0,0 +1,245 @@
+# resolver.py
+from Thyddle.parser import (
+    Binary, Grouping, Literal, Unary, Variable, Assign, Logical,
+    Call, Get, Set, Index, SetIndex, ArrayLiteral, ObjectLiteral,
+    ExpressionStatement, VarStatement, BlockStatement, IfStatement, WhileStatement,
+    ForStatement, ForInStatement, FunctionStatement, ReturnStatement, BreakStatement,
+    ContinueStatement, ImportStatement, LambdaExpression
+)
+from Thyddle.lexer import TokenType
+
+class Scope:
+    def __init__(self):
+        self.names = {}       # name -> slot index
+        self.constants = set()
+        self.passed = {}      # name -> nodes that looked past this scope for that name
+        self.bound = []       # nodes bound to one of this scope's slots
+        self.declarations = []
+        self.has_import = False
+
+class Resolver:
+    """
+    Binds every local Variable/Assign to a (depth, slot) pair, where depth is the
+    number of environments to walk up and slot the index into that environment's
+    slots. Top-level code stays name based, since imports and the stdlib define
+    globals at runtime.
+
+    A binding is only made static when no scope in between can ever declare the
+    same name (later in the scope, or through an import); those references fall
+    back to a lookup by name so they see exactly what they saw before.
+    """
+
+    def __init__(self):
+        self.scopes = []
+        self.functions = 0    # how many function bodies we are inside
+        self.had_error = False
+
+    def resolve(self, statements):
+        for stmt in statements:
+            self.statement(stmt)
+        return not self.had_error
+
+    def error(self, name, message):
+        print(f"Error at '{name}': {message}")
+        self.had_error = True
+
+    # Scopes -----------------------------------------------------------------
+
+    def begin_scope(self):
+        self.scopes.append(Scope())
+
+    def end_scope(self, node):
+        scope = self.scopes.pop()
+        if scope.has_import:
+            # An import can define any name here at runtime, so the whole
+            # scope goes back to lookups by name.
+            for nodes in scope.passed.values():
+                self.unbind(nodes)
+            self.unbind(scope.bound)
+            for declaration in scope.declarations:
+                declaration.slot = None
+        node.scope_size = len(scope.names)
+        node.scope_names = scope.names
+
+    def drop_scope(self, scope, block):
+        # A block that declares nothing doesn't need an environment of its
+        # own. Everything bound through it sits one environment closer.
+        block.needs_scope = False
+        for nodes in scope.passed.values():
+            for node in nodes:
+                if node.slot is not None:
+                    node.depth -= 1
+
+    def declare(self, name, is_const=False, declaration=None):
+        if not self.scopes:
+            return None
+
+        scope = self.scopes[-1]
+        if declaration is not None:
+            scope.declarations.append(declaration)
+        if name in scope.passed:
+            # References made before this declaration must keep finding the
+            # outer variable until this one is defined.
+            self.unbind(scope.passed.pop(name))
+        if is_const:
+            scope.constants.add(name)
+        return scope.names.setdefault(name, len(scope.names))
+
+    def bind(self, node, name):
+        passed = []
+        for depth in range(len(self.scopes)):
+            scope = self.scopes[-1 - depth]
+            if name in scope.names:
+                node.depth = depth
+                node.slot = scope.names[name]
+                scope.bound.append(node)
+                for skipped in passed:
+                    skipped.passed.setdefault(name, []).append(node)
+                return scope
+            passed.append(scope)
+
+        node.depth = None
+        node.slot = None
+        return None
+
+    def unbind(self, nodes):
+        for node in nodes:
+            node.depth = None
+            node.slot = None
+
+    def function(self, node, params, body):
+        self.begin_scope()
+        self.functions += 1
+        for param in params:
+            self.declare(param)
+        if isinstance(body, ReturnStatement):
+            self.return_statement(body)
+        else:
+            for stmt in body:
+                self.statement(stmt)
+        self.functions -= 1
+        self.end_scope(node)
+
+    def return_statement(self, stmt):
+        self.expression(stmt.value)
+        # `return f(...)` in a function can reuse the caller's Python frame
+        # (see ThyddleFunction.call); at the top level there is no caller
+        stmt.tail_call = self.functions > 0 and type(stmt.value) is Call
+
+    def append_parts(self, expr):
+        """
+        For `x = x + a + b ...` returns (x, a, b, ...), so the interpreter can
+        append to the string in x instead of copying it; None otherwise.
+        """
+        parts = []
+        value = expr.value
+        while isinstance(value, Binary) and value.op == TokenType.PLUS:
+            parts.append(value.right)
+            value = value.left
+        if not parts or not isinstance(value, Variable) or value.name != expr.name:
+            return None
+        parts.append(value)
+        parts.reverse()
+        return tuple(parts)
+
+    # Statements -------------------------------------------------------------
+
+    def statement(self, stmt):
+        if stmt is None:
+            return
+
+        if isinstance(stmt, ExpressionStatement):
+            self.expression(stmt.expression)
+        elif isinstance(stmt, VarStatement):
+            if stmt.initializer is not None:
+                self.expression(stmt.initializer)
+            stmt.slot = self.declare(stmt.name, stmt.is_const, stmt)
+        elif isinstance(stmt, BlockStatement):
+            self.begin_scope()
+            for inner in stmt.statements:
+                self.statement(inner)
+            scope = self.scopes[-1]
+            self.end_scope(stmt)
+            if not scope.names and not scope.has_import:
+                self.drop_scope(scope, stmt)
+        elif isinstance(stmt, IfStatement):
+            self.expression(stmt.condition)
+            self.statement(stmt.then_branch)
+            for condition, branch in stmt.else_if_branches:
+                self.expression(condition)
+                self.statement(branch)
+            self.statement(stmt.else_branch)
+        elif isinstance(stmt, WhileStatement):
+            self.expression(stmt.condition)
+            self.statement(stmt.body)
+        elif isinstance(stmt, ForStatement):
+            self.begin_scope()
+            self.statement(stmt.initializer)
+            self.expression(stmt.condition)
+            self.expression(stmt.increment)
+            self.statement(stmt.body)
+            self.end_scope(stmt)
+        elif isinstance(stmt, ForInStatement):
+            # The values are evaluated before the loop's scope exists
+            self.expression(stmt.iterable)
+            self.begin_scope()
+            stmt.slot = self.declare(stmt.name, declaration=stmt)
+            self.statement(stmt.body)
+            self.end_scope(stmt)
+        elif isinstance(stmt, FunctionStatement):
+            stmt.slot = self.declare(stmt.name, declaration=stmt)
+            self.function(stmt, stmt.params, stmt.body)
+        elif isinstance(stmt, ReturnStatement):
+            self.return_statement(stmt)
+        elif isinstance(stmt, ImportStatement):
+            if self.scopes:
+                self.scopes[-1].has_import = True
+        elif isinstance(stmt, (BreakStatement, ContinueStatement)):
+            pass
+
+    # Expressions ------------------------------------------------------------
+
+    def expression(self, expr):
+        if expr is None or isinstance(expr, Literal):
+            return
+
+        if isinstance(expr, Variable):
+            self.bind(expr, expr.name)
+        elif isinstance(expr, Assign):
+            self.expression(expr.value)
+            scope = self.bind(expr, expr.name)
+            if scope is not None and expr.name in scope.constants:
+                self.error(expr.name, f"Cannot reassign constant '{expr.name}'.")
+            expr.append = self.append_parts(expr)
+        elif isinstance(expr, Grouping):
+            self.expression(expr.expression)
+        elif isinstance(expr, (Binary, Logical)):
+            self.expression(expr.left)
+            self.expression(expr.right)
+        elif isinstance(expr, Unary):
+            self.expression(expr.right)
+        elif isinstance(expr, Call):
+            self.expression(expr.callee)
+            for argument in expr.arguments:
+                self.expression(argument)
+        elif isinstance(expr, Get):
+            self.expression(expr.obj)
+        elif isinstance(expr, Set):
+            self.expression(expr.obj)
+            self.expression(expr.value)
+        elif isinstance(expr, Index):
+            self.expression(expr.obj)
+            self.expression(expr.index)
+        elif isinstance(expr, SetIndex):
+            self.expression(expr.obj)
+            self.expression(expr.index)
+            self.expression(expr.value)
+        elif isinstance(expr, ArrayLiteral):
+            for element in expr.elements:
+                self.expression(element)
+        elif isinstance(expr, ObjectLiteral):
+            for _, value in expr.properties:
+                self.expression(value)
+        elif isinstance(expr, LambdaExpression):
+            body = expr.body if isinstance(expr.body, ReturnStatement) else expr.body.statements
+            self.function(expr, expr.params, body)
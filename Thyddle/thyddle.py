@@ -1,21 +1,26 @@
 # thyddle.py
+import argparse
+import sys
+
 from Thyddle.lexer import Lexer, TokenType
 from Thyddle.parser import Parser, ParseError
-from Thyddle.interpreter import Interpreter
+from Thyddle.interpreter import Interpreter, MAX_DEPTH
+from Thyddle.module_cache import module_cache
+from Thyddle.profiler import Profiler
 
-def run(source, interpreter=None):
+def run(source, interpreter=None, path=None):
     ret = None
     if interpreter is None:
         interpreter = Interpreter()
     if source:
-        ret = interpreter.interpret(source)
+        ret = interpreter.interpret(source, path)
     
     return ret
 
 def run_file(path, interpreter=None):
     with open(path, 'r') as file:
         source = file.read()
-    return run(source, interpreter)
+    return run(source, interpreter, path)
 
 def run_repl(interpreter=None):
     if interpreter is None:
@@ -40,12 +45,60 @@ def run_repl(interpreter=None):
     
     print("Goodbye!")
 
+def arg_parser():
+    parser = argparse.ArgumentParser(description="Run a Thyddle program.")
+    parser.add_argument("file", nargs="?", help="the .thy file to run")
+    parser.add_argument("--vm", action="store_true",
+                        help="compile to bytecode and run on the VM instead of walking the AST")
+    parser.add_argument("--shared-globals", action="store_true",
+                        help="run eval() and REPL input against the program's globals")
+    parser.add_argument("--fast-lexer", action="store_true",
+                        help="tokenize with the regex-based FastLexer")
+    parser.add_argument("--no-optimize", action="store_true",
+                        help="don't fold constants or remove dead branches before running")
+    parser.add_argument("--no-disk-cache", action="store_true",
+                        help="don't read or write parsed modules in __thycache__")
+    parser.add_argument("--max-depth", type=int, default=MAX_DEPTH, metavar="N",
+                        help=f"most nested Thyddle calls before a stack overflow error "
+                             f"(default: {MAX_DEPTH}; tail calls don't count)")
+    parser.add_argument("--profile", action="store_true",
+                        help="time Thyddle functions and lines and print a report to stderr")
+    parser.add_argument("--profile-stacks", default="thyddle.folded", metavar="PATH",
+                        help="where --profile writes collapsed stacks for flamegraph tools "
+                             "(default: thyddle.folded)")
+    return parser
+
+def interpreter_from_args(args):
+    if args.no_disk_cache:
+        module_cache.use_disk = False
+    return Interpreter(use_vm=args.vm, shared_globals=args.shared_globals,
+                       fast_lexer=args.fast_lexer, optimize=not args.no_optimize,
+                       max_depth=args.max_depth)
+
+def profiler_from_args(args):
+    if not args.profile:
+        return None
+    profiler = Profiler()
+    profiler.start()
+    return profiler
+
+def finish_profile(profiler, args):
+    profiler.stop()
+    print(profiler.report(), file=sys.stderr)
+    profiler.write_collapsed(args.profile_stacks)
+    print(f"Collapsed stacks written to {args.profile_stacks}", file=sys.stderr)
+
 if __name__ == "__main__":
-    import sys
+    args = arg_parser().parse_args()
     
-    interpreter = Interpreter()
+    interpreter = interpreter_from_args(args)
+    profiler = profiler_from_args(args)
     
-    if len(sys.argv) > 1:
-        run_file(sys.argv[1], interpreter)
-    else:
-        run_repl(interpreter)
\ No newline at end of file
+    try:
+        if args.file:
+            run_file(args.file, interpreter)
+        else:
+            run_repl(interpreter)
+    finally:
+        if profiler:
+            finish_profile(profiler, args)
\ No newline at end of file
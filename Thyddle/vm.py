@@ -0,0 +1,491 @@
+# vm.py
+from Thyddle.compiler import (
+    Compiler, CONST, POP, LOAD_NAME, STORE_NAME, DEFINE, DEFINE_CONST, JUMP,
+    JUMP_IF_FALSE, JUMP_IF_TRUE_OR_POP, JUMP_IF_FALSE_OR_POP, PUSH_SCOPE, POP_SCOPE,
+    ADD, SUBTRACT, MULTIPLY, DIVIDE, MODULO, LESS, LESS_EQUAL, GREATER, GREATER_EQUAL,
+    EQUAL, NOT_EQUAL, NEGATE, NOT, CALL, GET_PROPERTY, SET_PROPERTY, INDEX, SET_INDEX,
+    BUILD_ARRAY, BUILD_OBJECT, MAKE_FUNCTION, MAKE_LAMBDA, RETURN, SET_RESULT, IMPORT,
+    ERROR, HALT, LOAD_SLOT, STORE_SLOT, LOAD_OUTER, STORE_OUTER, DEFINE_SLOT, GET_ITER,
+    FOR_ITER, TAIL_CALL, ASSIGN_NAME, ASSIGN_OUTER, JUMP_UNLESS_LESS, JUMP_UNLESS_LESS_EQUAL,
+    JUMP_UNLESS_GREATER, JUMP_UNLESS_GREATER_EQUAL, JUMP_UNLESS_EQUAL, JUMP_UNLESS_NOT_EQUAL,
+    LEN, APPEND, ADD_CONST, SUBTRACT_CONST
+)
+from Thyddle.lexer import TokenType
+from Thyddle.parser import FunctionStatement, VarStatement
+from Thyddle.interpreter import (
+    Environment, ThyddleFunction, ThyddleArray, ThyddleObject, NativeFunction,
+    ThyddleMmap, ThyddleRuntimeError, iteration_values
+)
+
+NUMBER = (int, float)
+
+# Returned by next() when a for-in iterator runs out
+DONE = object()
+
+class VMFunction(ThyddleFunction):
+    def __init__(self, declaration, closure, code, vm):
+        self.declaration = declaration
+        self.closure = closure
+        self.code = code
+        self.vm = vm
+
+    def run(self, interpreter, arguments):
+        # Called by ThyddleFunction.call, which keeps track of the depth
+        return self.vm.run(self.code, self.frame(arguments))
+
+class VMLambda(VMFunction):
+    def __str__(self):
+        params_str = ", ".join(self.code.params)
+        return f"<lambda ({params_str})>"
+
+def is_truthy(value):
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, NUMBER):
+        return value != 0
+    return True
+
+class VM:
+    """Runs CodeObjects produced by Compiler against an Interpreter's globals."""
+
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.compiler = Compiler()
+
+    def run_program(self, statements, environment=None):
+        code = self.compiler.compile_program(statements)
+        return self.run(code, environment or self.interpreter.globals)
+
+    def import_module(self, module_name, environment):
+        # Same rules as Interpreter.handle_import: only functions and constants
+        # are taken from the module.
+        statements = self.interpreter.load_module(module_name)
+        module_env = Environment(self.interpreter.globals)
+
+        for stmt in statements:
+            if isinstance(stmt, FunctionStatement):
+                code = self.compiler.compile_function(stmt.name, stmt.params, stmt.body, stmt)
+                module_env.define(stmt.name, VMFunction(stmt, module_env, code, self))
+            elif isinstance(stmt, VarStatement) and stmt.is_const:
+                code = self.compiler.compile_expression(stmt.initializer)
+                module_env.define(stmt.name, self.run(code, environment), is_const=True)
+
+        for name, value in module_env.values.items():
+            environment.define(name, value)
+
+        return True
+
+    def append(self, stack, env, name, depth, slot, count):
+        """
+        APPEND, apart from its fast path for two numbers: pops x and the parts
+        added to it, stores the sum in x and returns it. A string in x is
+        appended to in place, as Interpreter.evaluate_append does: the
+        variable is cleared first so nothing else refers to the string.
+        """
+        parts = stack[-count:]
+        del stack[-count:]
+        left = stack.pop()
+
+        if isinstance(left, str):
+            suffix = "".join(part if isinstance(part, str) else str(part) for part in parts)
+            if slot is None:
+                location = env.locate(name)
+                if location is None:
+                    value = left + suffix
+                    env.assign(name, value)
+                    return value
+                container, key = location
+            else:
+                scope = env
+                for _ in range(depth):
+                    scope = scope.enclosing
+                container, key = scope.slots, slot
+            container[key] = None
+            left += suffix
+            container[key] = left
+            return left
+
+        for right in parts:
+            if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+                left = left + right
+            else:
+                left = self.interpreter.binary_operation(TokenType.PLUS, left, right)
+        self.store(env, name, depth, slot, left)
+        return left
+
+    def store(self, env, name, depth, slot, value):
+        if slot is None:
+            env.assign(name, value)
+            return
+        for _ in range(depth):
+            env = env.enclosing
+        env.slots[slot] = value
+
+    def run(self, code_object, environment):
+        code = code_object.code
+        constants = code_object.constants
+        interpreter = self.interpreter
+        len_function = interpreter.len_function
+        env = environment
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        result = None
+        pc = 0
+
+        # Opcodes are tested roughly in order of how often they run in loops.
+        while True:
+            op = code[pc]
+            arg = code[pc + 1]
+            pc += 2
+
+            if op == LOAD_NAME:
+                name = constants[arg]
+                if name in env.values:
+                    # Globals, at the top level
+                    push(env.values[name])
+                else:
+                    push(env.get(name))
+            elif op == CONST:
+                push(constants[arg])
+            elif op == ADD_CONST:
+                left = stack[-1]
+                right = constants[arg]
+                if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+                    stack[-1] = left + right
+                elif isinstance(left, str) or isinstance(right, str):
+                    stack[-1] = str(left) + str(right)
+                else:
+                    raise ThyddleRuntimeError("Operands must be numbers or strings.")
+            elif op == LOAD_SLOT:
+                push(env.slots[arg])
+            elif op == ADD:
+                right = pop()
+                left = stack[-1]
+                if isinstance(left, NUMBER) and isinstance(right, NUMBER):
+                    stack[-1] = left + right
+                elif isinstance(left, str) or isinstance(right, str):
+                    stack[-1] = str(left) + str(right)
+                else:
+                    raise ThyddleRuntimeError("Operands must be numbers or strings.")
+            elif op == JUMP:
+                pc = arg
+            elif op == LOAD_OUTER:
+                depth, slot = constants[arg]
+                scope = env
+                for _ in range(depth):
+                    scope = scope.enclosing
+                push(scope.slots[slot])
+            elif op == JUMP_UNLESS_LESS:
+                right = pop()
+                left = pop()
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                if not left < right:
+                    pc = arg
+            elif op == JUMP_UNLESS_EQUAL:
+                right = pop()
+                left = pop()
+                if not ((left is None and right is None) or (left is not None and left == right)):
+                    pc = arg
+            elif op == DEFINE_SLOT:
+                env.slots[arg] = pop()
+            elif op == CALL:
+                if arg:
+                    arguments = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    arguments = []
+                callee = stack[-1]
+                if not isinstance(callee, (ThyddleFunction, NativeFunction)):
+                    raise ThyddleRuntimeError("Can only call functions or variables that hold functions.")
+                stack[-1] = callee.call(interpreter, arguments)
+            elif op == ASSIGN_NAME:
+                env.assign(constants[arg], pop())
+            elif op == INDEX:
+                index = pop()
+                obj = stack[-1]
+                if isinstance(obj, ThyddleArray):
+                    stack[-1] = obj.get(index)
+                elif isinstance(obj, str):
+                    if not isinstance(index, int):
+                        raise ThyddleRuntimeError("String index must be an integer.")
+                    if index < 0 or index >= len(obj):
+                        raise ThyddleRuntimeError(f"String index out of bounds: {index}")
+                    stack[-1] = obj[index]
+                elif isinstance(obj, ThyddleObject):
+                    if not isinstance(index, str):
+                        raise ThyddleRuntimeError("Object index must be a string key.")
+                    stack[-1] = obj.get(index)
+                elif isinstance(obj, ThyddleMmap):
+                    stack[-1] = obj.get(index)
+                else:
+                    raise ThyddleRuntimeError("Only arrays, strings, objects, and mmaps can be indexed.")
+            elif op == APPEND:
+                name, depth, slot, count, keep = constants[arg]
+                if count == 1 and isinstance(stack[-1], NUMBER) and isinstance(stack[-2], NUMBER):
+                    # total = total + i
+                    right = pop()
+                    value = pop() + right
+                    if slot is None:
+                        env.assign(name, value)
+                    elif depth == 0:
+                        env.slots[slot] = value
+                    else:
+                        self.store(env, name, depth, slot, value)
+                    if keep:
+                        push(value)
+                else:
+                    # Drop this loop's own references left over from earlier
+                    # instructions: the string only grows in place while
+                    # nothing else refers to it
+                    value = left = right = obj = callee = arguments = None
+                    value = self.append(stack, env, name, depth, slot, count)
+                    if keep:
+                        push(value)
+                    value = None
+            elif op == LEN:
+                value = pop()
+                if stack[-1] is len_function and isinstance(value, ThyddleArray):
+                    stack[-1] = len(value.elements)
+                elif stack[-1] is len_function and isinstance(value, str):
+                    stack[-1] = len(value)
+                    value = None  # `while (len(s) < n) s = s + ...` appends in place
+                else:
+                    # Objects, mmaps, errors, or `len` isn't the built-in any more
+                    callee = stack[-1]
+                    if not isinstance(callee, (ThyddleFunction, NativeFunction)):
+                        raise ThyddleRuntimeError("Can only call functions or variables that hold functions.")
+                    stack[-1] = callee.call(interpreter, [value])
+            elif op == MODULO:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                if right == 0:
+                    raise ThyddleRuntimeError("Modulo by zero.")
+                stack[-1] = left % right
+            elif op == RETURN:
+                return pop()
+            elif op == PUSH_SCOPE:
+                node = constants[arg]
+                env = Environment(env, node.scope_size, node.scope_names)
+            elif op == ASSIGN_OUTER:
+                depth, slot = constants[arg]
+                scope = env
+                for _ in range(depth):
+                    scope = scope.enclosing
+                scope.slots[slot] = pop()
+            elif op == GET_PROPERTY:
+                obj = stack[-1]
+                if not isinstance(obj, ThyddleObject):
+                    raise ThyddleRuntimeError("Only objects have properties.")
+                stack[-1] = obj.get(constants[arg])
+            elif op == POP_SCOPE:
+                env = env.enclosing
+            elif op == POP:
+                pop()
+            elif op == SUBTRACT_CONST:
+                left = stack[-1]
+                right = constants[arg]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left - right
+            elif op == SUBTRACT:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left - right
+            elif op == JUMP_IF_FALSE:
+                value = pop()
+                if value is False or value is None or (value is not True and not is_truthy(value)):
+                    pc = arg
+            elif op == JUMP_UNLESS_GREATER:
+                right = pop()
+                left = pop()
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                if not left > right:
+                    pc = arg
+            elif op == SET_INDEX:
+                value = pop()
+                index = pop()
+                obj = stack[-1]
+                if isinstance(obj, ThyddleArray):
+                    obj.set(index, value)
+                elif isinstance(obj, ThyddleObject):
+                    if not isinstance(index, str):
+                        raise ThyddleRuntimeError("Object index must be a string key.")
+                    obj.set(index, value)
+                else:
+                    raise ThyddleRuntimeError("Only arrays and objects support indexed assignment.")
+                stack[-1] = value
+            elif op == STORE_SLOT:
+                env.slots[arg] = stack[-1]
+            elif op == STORE_NAME:
+                env.assign(constants[arg], stack[-1])
+            elif op == STORE_OUTER:
+                depth, slot = constants[arg]
+                scope = env
+                for _ in range(depth):
+                    scope = scope.enclosing
+                scope.slots[slot] = stack[-1]
+            elif op == FOR_ITER:
+                value = next(stack[-1], DONE)
+                if value is DONE:
+                    pop()
+                    pc = arg
+                else:
+                    push(value)
+            elif op == TAIL_CALL:
+                if arg:
+                    arguments = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    arguments = []
+                callee = pop()
+                if isinstance(callee, VMFunction):
+                    # Carry on with the callee's code in this loop, so tail
+                    # recursion runs in constant stack
+                    code_object = callee.code
+                    code = code_object.code
+                    constants = code_object.constants
+                    env = callee.frame(arguments)
+                    stack.clear()
+                    pc = 0
+                elif isinstance(callee, (ThyddleFunction, NativeFunction)):
+                    return callee.call(interpreter, arguments)
+                else:
+                    raise ThyddleRuntimeError("Can only call functions or variables that hold functions.")
+            elif op == LESS:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left < right
+            elif op == EQUAL:
+                right = pop()
+                left = stack[-1]
+                stack[-1] = (left is None and right is None) or (left is not None and left == right)
+            elif op == JUMP_UNLESS_NOT_EQUAL:
+                right = pop()
+                left = pop()
+                if (left is None and right is None) or (left is not None and left == right):
+                    pc = arg
+            elif op == JUMP_UNLESS_LESS_EQUAL:
+                right = pop()
+                left = pop()
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                if not left <= right:
+                    pc = arg
+            elif op == JUMP_UNLESS_GREATER_EQUAL:
+                right = pop()
+                left = pop()
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                if not left >= right:
+                    pc = arg
+            elif op == NOT_EQUAL:
+                right = pop()
+                left = stack[-1]
+                stack[-1] = not ((left is None and right is None) or (left is not None and left == right))
+            elif op == GREATER:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left > right
+            elif op == LESS_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left <= right
+            elif op == GREATER_EQUAL:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left >= right
+            elif op == MULTIPLY:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                stack[-1] = left * right
+            elif op == DIVIDE:
+                right = pop()
+                left = stack[-1]
+                if not (isinstance(left, NUMBER) and isinstance(right, NUMBER)):
+                    raise ThyddleRuntimeError("Operands must be numbers.")
+                if right == 0:
+                    raise ThyddleRuntimeError("Division by zero.")
+                stack[-1] = left / right
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if is_truthy(stack[-1]):
+                    pc = arg
+                else:
+                    pop()
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if not is_truthy(stack[-1]):
+                    pc = arg
+                else:
+                    pop()
+            elif op == NEGATE:
+                if not isinstance(stack[-1], NUMBER):
+                    raise ThyddleRuntimeError("Operand must be a number.")
+                stack[-1] = -stack[-1]
+            elif op == NOT:
+                stack[-1] = not is_truthy(stack[-1])
+            elif op == SET_PROPERTY:
+                value = pop()
+                obj = stack[-1]
+                if not isinstance(obj, ThyddleObject):
+                    raise ThyddleRuntimeError("Only objects have properties.")
+                obj.set(constants[arg], value)
+                stack[-1] = value
+            elif op == BUILD_ARRAY:
+                if arg:
+                    elements = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    elements = []
+                push(ThyddleArray(elements))
+            elif op == BUILD_OBJECT:
+                keys = constants[arg]
+                if keys:
+                    values = stack[-len(keys):]
+                    del stack[-len(keys):]
+                else:
+                    values = []
+                push(ThyddleObject(dict(zip(keys, values))))
+            elif op == MAKE_FUNCTION:
+                function_code = constants[arg]
+                push(VMFunction(function_code.declaration, env, function_code, self))
+            elif op == MAKE_LAMBDA:
+                function_code = constants[arg]
+                push(VMLambda(function_code.declaration, env, function_code, self))
+            elif op == DEFINE:
+                env.define(constants[arg], pop())
+            elif op == DEFINE_CONST:
+                name, slot = constants[arg]
+                if slot is None:
+                    env.define(name, pop(), True)
+                else:
+                    env.define_slot(slot, name, pop(), True)
+            elif op == SET_RESULT:
+                result = pop()
+            elif op == GET_ITER:
+                stack[-1] = iteration_values(stack[-1])
+            elif op == IMPORT:
+                push(self.import_module(constants[arg], env))
+            elif op == ERROR:
+                raise ThyddleRuntimeError(constants[arg])
+            elif op == HALT:
+                return result
+            else:
+                raise ThyddleRuntimeError(f"Unknown opcode {op}.")
@@ -0,0 +1,65 @@
+# bench_ast.py
+# Memory held by the AST of a large generated program, and how long it takes
+# to parse and to run.
+#
+#   python benchmarks/bench_ast.py [functions]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.lexer import Lexer
+from Thyddle.parser import Parser
+from Thyddle.resolver import Resolver
+from Thyddle.interpreter import Interpreter
+
+CHUNK = """
+func step_N(point, n) {
+    var total = 0;
+    for (var i = 0; i < n; i = i + 1) {
+        if (i % 3 == 0 and point.x > -1) {
+            total = total + point.x * i - point.y / 2;
+        } elseif (!(i % 3 == 1)) {
+            total = total - 1;
+        } else {
+            point.y = point.y + 1;
+        }
+    }
+    return total;
+}
+"""
+
+def main():
+    functions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = "".join(CHUNK.replace("_N", f"_{i}") for i in range(functions))
+    source += "var point = {x: 3, y: 4};\nvar result = 0;\n"
+    source += "".join(f"result = result + step_{i}(point, 20);\n" for i in range(functions))
+    tokens = Lexer(source).scan_tokens()
+    print(f"generated program: {source.count(chr(10))} lines, {len(tokens)} tokens")
+
+    tracemalloc.start()
+    statements = Parser(tokens).parse()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"AST memory  {size / 1e6:8.2f} MB")
+
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        Parser(tokens).parse()
+        best = min(best, time.perf_counter() - start)
+    print(f"parse       {best * 1000:8.1f} ms")
+
+    Resolver().resolve(statements)
+    best = float("inf")
+    for _ in range(3):
+        interpreter = Interpreter()
+        start = time.perf_counter()
+        interpreter.run_statements(statements)
+        best = min(best, time.perf_counter() - start)
+    print(f"run         {best * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# bench_bulk.py
+# Whole-array operations (array.sum, array.add, math.map, ...) against the
+# same thing written as a Thyddle loop, on a plain array and on a float64
+# typed array. Typed arrays use numpy when it is installed.
+#
+#   python benchmarks/bench_bulk.py [elements]
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle import interpreter as interpreter_module
+from Thyddle.interpreter import Interpreter
+
+SETUP = {
+    "plain": "var data = array.range(COUNT);",
+    "float64": 'var data = array.zeros(COUNT, "float64");\n'
+               "for (var k = 0; k < COUNT; k = k + 1) { data[k] = k; }",
+}
+
+# name -> (Thyddle loop, bulk operation)
+CASES = {
+    "sum": ("""
+var result = 0;
+for (var i = 0; i < len(data); i = i + 1) { result = result + data[i]; }
+""", "var result = array.sum(data);"),
+    "max": ("""
+var result = data[0];
+for (var i = 1; i < len(data); i = i + 1) { if (data[i] > result) { result = data[i]; } }
+""", "var result = array.max(data);"),
+    "add": ("""
+var result = [];
+for (var i = 0; i < len(data); i = i + 1) { array.append(result, data[i] + data[i]); }
+""", "var result = array.add(data, data);"),
+    "scale": ("""
+var result = [];
+for (var i = 0; i < len(data); i = i + 1) { array.append(result, data[i] * 3); }
+""", "var result = array.scale(data, 3);"),
+    "math.map sqrt": ("""
+var result = [];
+for (var i = 0; i < len(data); i = i + 1) { array.append(result, math.sqrt(data[i])); }
+""", "var result = math.map(data, math.sqrt);"),
+    "sort": ("""
+var result = array.reverse(data);
+for (var i = 1; i < len(result); i = i + 1) {
+    var x = result[i];
+    var j = i - 1;
+    while (j >= 0 and result[j] > x) { result[j + 1] = result[j]; j = j - 1; }
+    result[j + 1] = x;
+}
+""", "var result = array.sort(array.reverse(data));"),
+}
+
+# Insertion sort of a reversed array is quadratic, so it gets fewer elements
+SORT_LIMIT = 300
+
+def run(setup, program):
+    interpreter = Interpreter(shared_globals=True)
+    interpreter.interpret(setup)
+    start = time.perf_counter()
+    interpreter.interpret(program)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"numpy: {'yes' if interpreter_module.numpy is not None else 'not installed'}")
+
+    for storage, setup in SETUP.items():
+        print(f"\n{storage} array")
+        for name, (loop, bulk) in CASES.items():
+            n = min(count, SORT_LIMIT) if name == "sort" else count
+            prepared = setup.replace("COUNT", str(n))
+            loop_time = run(prepared, loop)
+            bulk_time = run(prepared, bulk)
+            print(f"{name:<16} {n:>7} elements  loop {loop_time * 1000:9.1f} ms"
+                  f"  bulk {bulk_time * 1000:7.2f} ms  {loop_time / bulk_time:7.0f}x")
+
+if __name__ == "__main__":
+    main()
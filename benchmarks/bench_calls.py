@@ -0,0 +1,60 @@
+# bench_calls.py
+# Call overhead: empty functions with zero, one and three parameters, a
+# lambda with a block body and one with an expression body, and
+# array.map calling a lambda for every element. Each loop makes the same
+# number of calls; the empty loop's time is subtracted so what is left is
+# the cost of the calls. On both the tree-walking interpreter and the VM.
+#
+#   python benchmarks/bench_calls.py [calls]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.interpreter import Interpreter
+
+SETUP = """
+func none() { }
+func one(a) { }
+func three(a, b, c) { }
+var block = (a) -> { return a; };
+var expression = (a) -> a;
+var data = array.range(COUNT);
+"""
+
+WORKLOADS = {
+    "empty loop": "for (i in range(COUNT)) { }",
+    "f()": "for (i in range(COUNT)) { none(); }",
+    "f(a)": "for (i in range(COUNT)) { one(i); }",
+    "f(a, b, c)": "for (i in range(COUNT)) { three(i, i, i); }",
+    "(a) -> { ... }": "for (i in range(COUNT)) { block(i); }",
+    "(a) -> a": "for (i in range(COUNT)) { expression(i); }",
+    "array.map": "array.map(data, (x, i) -> x);",
+}
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    for use_vm in (False, True):
+        print("VM" if use_vm else "Tree-walking interpreter")
+        interpreter = Interpreter(use_vm=use_vm, shared_globals=True)
+        interpreter.interpret(SETUP.replace("COUNT", str(count)))
+        baseline = 0.0
+        for name, loop in WORKLOADS.items():
+            source = loop.replace("COUNT", str(count))
+            best = float("inf")
+            for _ in range(5):
+                start = time.perf_counter()
+                interpreter.interpret(source)
+                best = min(best, time.perf_counter() - start)
+            if name == "empty loop":
+                baseline = best
+                print(f"  {name:<16} {best * 1000:8.1f} ms")
+            else:
+                # array.map has no loop of its own to subtract
+                per_call = best - (baseline if name != "array.map" else 0.0)
+                print(f"  {name:<16} {best * 1000:8.1f} ms  {per_call / count * 1e9:7.0f} ns/call")
+
+if __name__ == "__main__":
+    main()
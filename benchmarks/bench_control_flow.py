@@ -0,0 +1,98 @@
+# bench_control_flow.py
+# Micro-benchmarks for function returns and early loop exits.
+#
+#   python benchmarks/bench_control_flow.py [repeat]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.interpreter import Interpreter
+
+WORKLOADS = {
+    "call + return": """
+        func inc(n) {
+            return n + 1;
+        }
+        func run() {
+            var i = 0;
+            while (i < 100000) {
+                i = inc(i);
+            }
+        }
+        run();
+    """,
+    "lambda return": """
+        var square = (n) -> {
+            return n * n;
+        };
+        func run() {
+            var i = 0;
+            var total = 0;
+            while (i < 100000) {
+                total = total + square(i);
+                i = i + 1;
+            }
+        }
+        run();
+    """,
+    "early return": """
+        func find(a, x) {
+            var k = 0;
+            while (k < 10) {
+                if (a[k] == x) {
+                    return k;
+                }
+                k = k + 1;
+            }
+            return -1;
+        }
+        func run() {
+            var a = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9];
+            var i = 0;
+            while (i < 20000) {
+                find(a, i % 4);
+                i = i + 1;
+            }
+        }
+        run();
+    """,
+    "break/continue": """
+        func run() {
+            var outer = 0;
+            while (outer < 20000) {
+                outer = outer + 1;
+                var inner = 0;
+                while (true) {
+                    inner = inner + 1;
+                    if (inner % 2 == 0) {
+                        continue;
+                    }
+                    if (inner > 5) {
+                        break;
+                    }
+                }
+            }
+        }
+        run();
+    """,
+}
+
+def time_run(source, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = Interpreter()
+        start = time.perf_counter()
+        interpreter.interpret(source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    for name, source in WORKLOADS.items():
+        print(f"{name:<16} {time_run(source, repeat):>8.3f}s")
+
+if __name__ == "__main__":
+    main()
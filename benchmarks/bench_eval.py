@@ -0,0 +1,42 @@
+# bench_eval.py
+# eval() throughput: a fresh interpreter per eval (the default) against
+# --shared-globals, where eval runs in the caller's globals.
+#
+#   python benchmarks/bench_eval.py [count]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.interpreter import Interpreter
+
+PROGRAM = """
+var i = 0;
+while (i < COUNT) {
+    eval("1 + 2 * 3;");
+    i = i + 1;
+}
+"""
+
+def time_evals(count, shared_globals):
+    interpreter = Interpreter(shared_globals=shared_globals)
+    start = time.perf_counter()
+    interpreter.interpret(PROGRAM.replace("COUNT", str(count)))
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        Interpreter()
+    construct = (time.perf_counter() - start) / 1000
+    print(f"Interpreter() construction: {construct * 1e6:.1f} us")
+
+    for name, shared in (("fresh interpreter", False), ("shared globals", True)):
+        elapsed = time_evals(count, shared)
+        print(f"{name:<18} {count / elapsed:>10.0f} evals/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# bench_file_lines.py
+# Counting the lines of a generated log file that contain "ERROR", reading it
+# whole with io.file.read + split, line by line with io.file.lines and with
+# an io.file.open handle. Reports time and peak Python memory; only the whole
+# file read grows with the file size.
+#
+#   python benchmarks/bench_file_lines.py [megabytes]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+
+PROGRAMS = {
+    "io.file.read + split": """
+var lines = split(io.file.read(PATH), "\\n");
+var errors = 0;
+for (var i = 0; i < len(lines); i = i + 1) {
+    if (array.index_of(lines[i], "ERROR") >= 0) { errors = errors + 1; }
+}
+""",
+    "io.file.lines": """
+var errors = 0;
+io.file.lines(PATH, (line, i) -> {
+    if (array.index_of(line, "ERROR") >= 0) { errors = errors + 1; }
+});
+""",
+    "io.file.open read_line": """
+var errors = 0;
+var f = io.file.open(PATH);
+var line = f.read_line();
+while (line != nothing) {
+    if (array.index_of(line, "ERROR") >= 0) { errors = errors + 1; }
+    line = f.read_line();
+}
+f.close();
+""",
+}
+
+def write_log(path, megabytes):
+    size = 0
+    n = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while size < megabytes * 1_000_000:
+            level = "ERROR" if n % 10 == 0 else "INFO "
+            line = f"2024-01-01 12:00:{n % 60:02d} {level} request {n} served in {n % 997} ms\n"
+            f.write(line)
+            size += len(line)
+            n += 1
+    return n
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.log")
+        count = write_log(path, megabytes)
+        print(f"{path}: {megabytes:g} MB, {count} lines\n")
+
+        for name, program in PROGRAMS.items():
+            interpreter = Interpreter(shared_globals=True)
+            source = program.replace("PATH", repr(path).replace("'", '"'))
+            tracemalloc.start()
+            start = time.perf_counter()
+            interpreter.interpret(source)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            errors = interpreter.globals.get("errors")
+            print(f"{name:<24} {elapsed * 1000:9.1f} ms (traced)  peak {peak / 1e6:8.2f} MB  {errors} errors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench_file_writes.py
+# Appending lines to a log from a Thyddle loop: io.file.modify.append as it
+# was (open and close the file on every call), the same call with the pooled
+# file, and a handle from io.file.open with the default and a 1 MB buffer.
+# First checks that writes through a handle and through io.file.modify on
+# the same file keep their order; exits with status 1 if they don't.
+#
+#   python benchmarks/bench_file_writes.py [lines]
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle import interpreter as interpreter_module
+from Thyddle.file_pool import FilePool
+from Thyddle.interpreter import Interpreter
+
+class LegacyFilePool(FilePool):
+    # io.file.modify.append before the pool
+    def append(self, path, text):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+        self.opens += 1
+
+PROGRAMS = {
+    "append, open/close": """
+for (var i = 0; i < COUNT; i = i + 1) { io.file.modify.append(PATH, "line " + i + "\\n"); }
+""",
+    "append, pooled": """
+for (var i = 0; i < COUNT; i = i + 1) { io.file.modify.append(PATH, "line " + i + "\\n"); }
+""",
+    "handle": """
+var f = io.file.open(PATH, "a");
+for (var i = 0; i < COUNT; i = i + 1) { f.write("line " + i + "\\n"); }
+f.close();
+""",
+    "handle, 1 MB buffer": """
+var f = io.file.open(PATH, "a", 1048576);
+for (var i = 0; i < COUNT; i = i + 1) { f.write("line " + i + "\\n"); }
+f.close();
+""",
+}
+
+# Each program writes "ABC" to PATH, mixing handles with the pool
+ORDER_CHECKS = {
+    "handle, then append": """
+var f = io.file.open(PATH, "a"); f.write("A"); io.file.modify.append(PATH, "B"); f.write("C"); f.close();
+""",
+    "append, then handle": """
+io.file.modify.append(PATH, "A"); var f = io.file.open(PATH, "a"); f.write("B"); f.close(); io.file.modify.append(PATH, "C");
+""",
+    "handle, then write": """
+var f = io.file.open(PATH, "a"); f.write("X"); io.file.modify.write(PATH, "AB"); f.write("C"); f.close();
+""",
+    "two handles": """
+var f = io.file.open(PATH, "a"); var g = io.file.open(PATH, "a");
+f.write("A"); io.file.modify.append(PATH, "B"); f.close(); g.write("C"); g.close();
+""",
+}
+
+def check_order(directory):
+    pool = interpreter_module.file_pool
+    ok = True
+    for number, (name, program) in enumerate(ORDER_CHECKS.items()):
+        path = os.path.join(directory, f"order{number}.txt")
+        Interpreter().interpret(program.replace("PATH", repr(path).replace("'", '"')))
+        pool.close_all()
+        with open(path, encoding="utf-8") as f:
+            written = f.read()
+        print(f"{'ok' if written == 'ABC' else 'WRONG':<6} {name} ({written!r})")
+        ok = ok and written == "ABC"
+    print()
+    return ok
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    pooled = interpreter_module.file_pool
+
+    with tempfile.TemporaryDirectory() as directory:
+        ok = check_order(directory)
+        for number, (name, program) in enumerate(PROGRAMS.items()):
+            path = os.path.join(directory, f"{number}.log")
+            pool = LegacyFilePool() if name == "append, open/close" else pooled
+            interpreter_module.file_pool = pool
+            opens = pool.opens
+
+            interpreter = Interpreter()
+            source = program.replace("COUNT", str(count)).replace("PATH", repr(path).replace("'", '"'))
+            start = time.perf_counter()
+            interpreter.interpret(source)
+            pool.close_all()
+            elapsed = time.perf_counter() - start
+
+            with open(path, encoding="utf-8") as f:
+                lines = sum(1 for _ in f)
+            print(f"{name:<22} {elapsed * 1000:8.1f} ms  {pool.opens - opens:>7} opens  {lines} lines written")
+
+        interpreter_module.file_pool = pooled
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
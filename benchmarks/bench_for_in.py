@@ -0,0 +1,57 @@
+# bench_for_in.py
+# Summing a 1M-element array: the index-based while idiom against for-in
+# over the array, and a counting for loop against for-in over range().
+# On both the tree-walking interpreter and the VM.
+#
+#   python benchmarks/bench_for_in.py [elements]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.interpreter import Interpreter
+
+SETUP = "var data = array.range(COUNT);\nvar total = 0;\n"
+
+WORKLOADS = {
+    "while + index": """
+var i = 0;
+while (i < len(data)) {
+    total = total + data[i];
+    i = i + 1;
+}
+""",
+    "for-in array": """
+for (x in data) {
+    total = total + x;
+}
+""",
+    "for + counter": """
+for (var i = 0; i < COUNT; i = i + 1) {
+    total = total + i;
+}
+""",
+    "for-in range": """
+for (i in range(COUNT)) {
+    total = total + i;
+}
+""",
+}
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    for use_vm in (False, True):
+        print("VM" if use_vm else "Tree-walking interpreter")
+        for name, loop in WORKLOADS.items():
+            interpreter = Interpreter(use_vm=use_vm, shared_globals=True)
+            interpreter.interpret(SETUP.replace("COUNT", str(count)))
+            source = loop.replace("COUNT", str(count))
+            start = time.perf_counter()
+            interpreter.interpret(source)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<15} {elapsed * 1000:9.1f} ms  total = {interpreter.globals.get('total')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# bench_inline_cache.py
+# Property reads on the tree-walking interpreter: Get nodes looking every
+# property up, as they did before inline caches, against the cached reads,
+# for objects that never change and for one written on every iteration.
+# The first line times a single Get node on its own, without the rest of
+# the program around it.
+#
+# First checks that a Get node doesn't keep the last object it read, or the
+# value it read from it, alive; exits with status 1 if it does.
+#
+#   python benchmarks/bench_inline_cache.py [iterations]
+import contextlib
+import gc
+import io
+import os
+import sys
+import time
+import weakref
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter, ThyddleObject, ThyddleRuntimeError
+from Thyddle.parser import Get, Literal
+
+def uncached_get(self, expr):
+    # Interpreter.evaluate_get before inline caches
+    obj = self.evaluate(expr.obj)
+    if isinstance(obj, ThyddleObject):
+        return obj.get(expr.name)
+    raise ThyddleRuntimeError("Only objects have properties.")
+
+PROGRAMS = {
+    "stable objects": """
+var point = { x: 1, inner: { y: 2, z: 3 } };
+var total = 0;
+for (var i = 0; i < COUNT; i = i + 1) {
+    total = total + point.x + point.inner.y + point.inner.z;
+}
+""",
+    "builtin chains": """
+var total = 0;
+for (var i = 0; i < COUNT; i = i + 1) {
+    total = total + math.abs(i) + len(string.chars("ab"));
+}
+""",
+    "written every loop": """
+var point = { x: 1 };
+for (var i = 0; i < COUNT; i = i + 1) {
+    point.x = point.x + 1;
+}
+""",
+}
+
+def check_release():
+    # Once the object is gone, so are the node's references to it and its value
+    class Value:
+        pass
+    interpreter = Interpreter()
+    obj = ThyddleObject({"x": Value()})
+    node = Get(Literal(obj), "x")
+    interpreter.evaluate(node)
+    value = weakref.ref(obj.get("x"))
+    node.obj = Literal(None)
+    del obj
+    gc.collect()
+    return value() is None and node.cached_id is None
+
+def run(source):
+    interpreter = Interpreter()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(source)
+    return time.perf_counter() - start
+
+def time_node(get, count):
+    interpreter = Interpreter()
+    node = Get(Literal(ThyddleObject({"x": 1, "y": 2})), "x")
+    start = time.perf_counter()
+    for _ in range(count):
+        get(interpreter, node)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if not check_release():
+        print("FAIL: a Get node kept the object it read alive")
+        sys.exit(1)
+    print("release check ok")
+
+    cached_get = Interpreter.evaluators[Get]
+
+    before = min(time_node(uncached_get, count * 10) for _ in range(5))
+    after = min(time_node(cached_get, count * 10) for _ in range(5))
+    print(f"{'one Get node':<20} uncached {before * 1000:8.1f} ms  cached {after * 1000:8.1f} ms"
+          f"  ({before / after:.2f}x)")
+
+    for name, program in PROGRAMS.items():
+        source = program.replace("COUNT", str(count))
+        before = after = float("inf")
+        # Alternate the two so a noisy machine slows both alike
+        for _ in range(5):
+            Interpreter.evaluators[Get] = uncached_get
+            before = min(before, run(source))
+            Interpreter.evaluators[Get] = cached_get
+            after = min(after, run(source))
+        print(f"{name:<20} uncached {before * 1000:8.1f} ms  cached {after * 1000:8.1f} ms"
+              f"  ({before / after:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_lexer.py
+# Checks that FastLexer produces exactly the same tokens (type, lexeme,
+# literal, line and printed errors) as Lexer on every file in Examples/ and
+# lib/, then times both on a large generated program.
+#
+#   python benchmarks/bench_lexer.py [lines]
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.lexer import Lexer, FastLexer
+
+CHUNK = """
+// Generated chunk
+func fib_N(n) {
+    if (n < 2) { return n; }
+    return fib_N(n - 1) + fib_N(n - 2);
+}
+/* block
+   comment */
+const LIMIT_N = 0x1F + 0b101 + 3.25;
+var name_N = "line\\n \\"quoted\\" text";
+var items_N = [1, 2, 3, 'single'];
+var obj_N = {key: items_N[0], other: (a, b) -> a >= b};
+"""
+
+def tokenize(lexer_class, source):
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        tokens = lexer_class(source).scan_tokens()
+    return [(t.type, t.lexeme, t.literal, t.line) for t in tokens], output.getvalue()
+
+def check_files():
+    paths = sorted(glob.glob(os.path.join(ROOT, "Examples", "*.thy")) +
+                   glob.glob(os.path.join(ROOT, "lib", "*.thy")))
+    ok = True
+    for path in paths:
+        with open(path, "r") as f:
+            source = f.read()
+        expected = tokenize(Lexer, source)
+        actual = tokenize(FastLexer, source)
+        name = os.path.relpath(path, ROOT)
+        if expected == actual:
+            print(f"ok        {name} ({len(expected[0])} tokens)")
+        else:
+            ok = False
+            print(f"MISMATCH  {name}")
+    return ok
+
+def time_lexer(lexer_class, source, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        lexer_class(source).scan_tokens()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    ok = check_files()
+
+    chunk_lines = CHUNK.count("\n")
+    source = "".join(CHUNK.replace("_N", f"_{i}") for i in range(lines // chunk_lines + 1))
+    if tokenize(Lexer, source) != tokenize(FastLexer, source):
+        ok = False
+        print("MISMATCH  generated program")
+
+    print()
+    print(f"generated program: {source.count(chr(10))} lines, {len(source)} chars")
+    slow = time_lexer(Lexer, source)
+    fast = time_lexer(FastLexer, source)
+    print(f"Lexer      {slow * 1000:8.1f} ms")
+    print(f"FastLexer  {fast * 1000:8.1f} ms  ({slow / fast:.1f}x)")
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# bench_loop_len.py
+# Loops whose condition calls len(): `len(x)` as the generic Call it was
+# before, as a LenCall (looked up and read on every test) and as the
+# HoistedLenCall the optimizer puts in loop conditions when x can't be
+# reassigned (looked up once per loop), for a string scanned character by
+# character and an array that grows inside the loop.
+#
+#   python benchmarks/bench_loop_len.py
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+from Thyddle.optimizer import LenCall, HoistedLenCall
+
+WORKLOADS = {
+    "scan a string": """
+func scan(code) {
+    var indx = 0;
+    var count = 0;
+    while (indx < len(code)) {
+        if (code[indx] == "+") {
+            count = count + 1;
+        }
+        indx = indx + 1;
+    }
+    return count;
+}
+var text = "";
+for (var i = 0; i < 2000; i = i + 1) {
+    text = text + "+-";
+}
+for (var round = 0; round < 10; round = round + 1) {
+    scan(text);
+}
+""",
+    "grow an array": """
+func grow(items) {
+    while (len(items) < 40000) {
+        array.append(items, len(items));
+    }
+}
+grow([]);
+""",
+}
+
+def run(source):
+    interpreter = Interpreter()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        interpreter.interpret(source)
+    return time.perf_counter() - start
+
+def main():
+    evaluators = Interpreter.evaluators
+    len_call = evaluators[LenCall]
+    hoisted = evaluators[HoistedLenCall]
+    modes = {
+        "call": (Interpreter.evaluate_call, Interpreter.evaluate_call),
+        "LenCall": (len_call, len_call),
+        "hoisted": (len_call, hoisted),
+    }
+
+    for name, source in WORKLOADS.items():
+        times = dict.fromkeys(modes, float("inf"))
+        # Alternate them so a noisy machine slows all alike
+        for _ in range(5):
+            for mode, (evaluate, evaluate_hoisted) in modes.items():
+                evaluators[LenCall] = evaluate
+                evaluators[HoistedLenCall] = evaluate_hoisted
+                times[mode] = min(times[mode], run(source))
+        evaluators[LenCall] = len_call
+        evaluators[HoistedLenCall] = hoisted
+        print(f"{name:<14}" + "".join(f"  {mode} {elapsed * 1000:7.1f} ms" for mode, elapsed in times.items())
+              + f"  ({times['call'] / times['hoisted']:.2f}x)")
+
+if __name__ == "__main__":
+    main()
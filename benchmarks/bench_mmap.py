@@ -0,0 +1,72 @@
+# bench_mmap.py
+# Random lookups in a large fixed-width table file: io.file.read (the whole
+# file becomes one string) against io.file.mmap (only the pages that are
+# looked at are read). Each variant runs in its own process so the peak
+# resident memory it reports is its own.
+#
+#   python benchmarks/bench_mmap.py [megabytes]
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+RECORD = 32  # bytes per record, newline included
+LOOKUPS = 2000
+
+PROGRAMS = {
+    "io.file.read": "var data = io.file.read(PATH);",
+    "io.file.mmap": "var data = io.file.mmap(PATH);",
+}
+
+# Offsets come from a small LCG so both variants look at the same records
+LOOKUP = """
+var found = 0;
+var seed = 12345;
+for (var i = 0; i < LOOKUPS; i = i + 1) {
+    seed = (seed * 1103515245 + 12345) % 2147483648;
+    var offset = (seed % COUNT) * RECORD;
+    var record = array.slice(data, offset, offset + RECORD - 1);
+    if (record[0] == "#") { found = found + 1; }
+}
+"""
+
+def write_table(path, megabytes):
+    count = int(megabytes * 1_000_000) // RECORD
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(count):
+            f.write(f"#{n:0{RECORD - 2}d}\n")
+    return count
+
+def run_one(name, path, count):
+    # Child process: run the program and report time and peak RSS
+    from Thyddle.interpreter import Interpreter
+    source = (PROGRAMS[name] + LOOKUP).replace("PATH", repr(path).replace("'", '"'))
+    source = source.replace("LOOKUPS", str(LOOKUPS)).replace("COUNT", count).replace("RECORD", str(RECORD))
+    interpreter = Interpreter(shared_globals=True)
+    start = time.perf_counter()
+    interpreter.interpret(source)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux
+    print(f"{name:<14} {elapsed * 1000:8.1f} ms  peak RSS {peak / 1000:8.1f} MB"
+          f"  {interpreter.globals.get('found')} records found")
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        run_one(sys.argv[2], sys.argv[3], sys.argv[4])
+        return
+
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "table.txt")
+        count = write_table(path, megabytes)
+        print(f"{path}: {megabytes:g} MB, {count} records, {LOOKUPS} random lookups\n")
+        for name in PROGRAMS:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name, path, str(count)], check=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# bench_natives.py
+# The array/string helpers written as Thyddle loops (what lib/standard used to
+# run, and still falls back to) against the native versions on the builtin
+# array object, over the same data.
+#
+#   python benchmarks/bench_natives.py [elements]
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+
+SETUP = """
+var data = [];
+var i = 0;
+while (i < COUNT) {
+    array.append(data, i);
+    i = i + 1;
+}
+var text = array.join(data);
+"""
+
+# name -> (Thyddle loop, native call)
+CASES = {
+    "map": ("""
+var result = [];
+var indx = 0;
+while (indx < len(data)) {
+    array.append(result, ((x, i) -> x * 2)(data[indx], indx));
+    indx = indx + 1;
+}
+""", """
+var result = array.map(data, (x, i) -> x * 2);
+"""),
+    "filter": ("""
+var result = [];
+var indx = 0;
+var keep = (x) -> x % 3 == 0;
+while (indx < len(data)) {
+    if (keep(data[indx])) {
+        array.append(result, data[indx]);
+    }
+    indx = indx + 1;
+}
+""", """
+var result = array.filter(data, (x) -> x % 3 == 0);
+"""),
+    "reduce": ("""
+var result = 0;
+var indx = 0;
+var add = (a, b) -> a + b;
+while (indx < len(data)) {
+    result = add(result, data[indx]);
+    indx = indx + 1;
+}
+""", """
+var result = array.reduce(data, (a, b) -> a + b, 0);
+"""),
+    "combine": ("""
+var result = "";
+var indx = 0;
+while (indx < len(data)) {
+    result = result + data[indx] + tostr(",");
+    indx = indx + 1;
+}
+""", """
+var result = array.join(data, ",") + ",";
+"""),
+    "split to chars": ("""
+var result = [];
+var indx = 0;
+while (indx < len(text)) {
+    array.append(result, text[indx]);
+    indx = indx + 1;
+}
+""", """
+var result = array.chars(text);
+"""),
+    "reverse": ("""
+var result = [];
+var indx = len(data) - 1;
+while (indx >= 0) {
+    array.append(result, data[indx]);
+    indx = indx - 1;
+}
+""", """
+var result = array.reverse(data);
+"""),
+    "slice": ("""
+var result = [];
+var indx = 10;
+while (indx < len(data) - 10) {
+    array.append(result, data[indx]);
+    indx = indx + 1;
+}
+""", """
+var result = array.slice(data, 10, -10);
+"""),
+    "index_of": ("""
+var result = -1;
+var indx = 0;
+while (indx < len(data)) {
+    if (data[indx] == COUNT - 1) {
+        result = indx;
+        break;
+    }
+    indx = indx + 1;
+}
+""", """
+var result = array.index_of(data, COUNT - 1);
+"""),
+}
+
+def run(setup, program):
+    interpreter = Interpreter(shared_globals=True)
+    interpreter.interpret(setup)
+    start = time.perf_counter()
+    interpreter.interpret(program)
+    elapsed = time.perf_counter() - start
+    return elapsed, interpreter.globals.get("result")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    setup = SETUP.replace("COUNT", str(count))
+
+    for name, (loop, native) in CASES.items():
+        loop_time, loop_result = run(setup, loop.replace("COUNT", str(count)))
+        native_time, native_result = run(setup, native.replace("COUNT", str(count)))
+        same = str(loop_result) == str(native_result)
+        print(f"{name:<16} loop {loop_time * 1000:8.1f} ms  native {native_time * 1000:8.1f} ms"
+              f"  {loop_time / native_time:6.1f}x  {'same' if same else 'DIFFERENT'}")
+
+if __name__ == "__main__":
+    main()
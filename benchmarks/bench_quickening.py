@@ -0,0 +1,71 @@
+# bench_quickening.py
+# Binary nodes with and without quickening: Examples/BrainF.thy running a
+# counting loop and "Hello World!", and a plain numeric loop. Without
+# quickening every node stays generic and goes through the operator
+# dispatch and the number checks on each run.
+#
+#   python benchmarks/bench_quickening.py
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+from Thyddle.parser import Binary
+
+COUNT_BF = "++++++++++[>++++++++++[>++++++++++[>+<-]<-]<-]" + ">" * 10
+HELLO_BF = "++++++++[>++++[>++>+++>+++>+<<<<-]>+>+>->>+[<]<-]>>.>---.+++++++..+++.>>.<-.<.+++.------.--------.>>+.>++."
+
+LOOP = """
+var total = 0;
+for (var i = 0; i < 100000; i = i + 1) {
+    if (i % 3 == 0) {
+        total = total + i * 2;
+    } elseif (i != 7) {
+        total = total - 1;
+    }
+}
+"""
+
+def run(source, stdin=""):
+    interpreter = Interpreter()
+    old_stdin = sys.stdin
+    sys.stdin = io.StringIO(stdin)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter.interpret(source)
+    finally:
+        sys.stdin = old_stdin
+    return time.perf_counter() - start
+
+def main():
+    # BrainF.thy imports lib/standard relative to the working directory
+    os.chdir(ROOT)
+    with open(os.path.join("Examples", "BrainF.thy")) as f:
+        brainf = f.read()
+
+    workloads = {
+        "BrainF.thy": (brainf, COUNT_BF + HELLO_BF + "\n"),
+        "numeric loop": (LOOP, ""),
+    }
+    quickening = Interpreter.evaluators[Binary]
+    generic = Interpreter.evaluate_generic_binary
+
+    for name, (source, stdin) in workloads.items():
+        before = after = float("inf")
+        # Alternate the two so a noisy machine slows both alike
+        for _ in range(5):
+            Interpreter.evaluators[Binary] = generic
+            before = min(before, run(source, stdin))
+            Interpreter.evaluators[Binary] = quickening
+            after = min(after, run(source, stdin))
+        print(f"{name:<14} generic {before * 1000:8.1f} ms  quickened {after * 1000:8.1f} ms"
+              f"  ({before / after:.2f}x)")
+
+if __name__ == "__main__":
+    main()
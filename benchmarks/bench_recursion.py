@@ -0,0 +1,64 @@
+# bench_recursion.py
+# Recursive Thyddle functions: fib (many shallow calls), ackermann (deep
+# non-tail recursion) and a tail-recursive countdown, deeper than Python's
+# default recursion limit would allow without tail calls. On both the
+# tree-walking interpreter and the VM.
+#
+#   python benchmarks/bench_recursion.py
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.interpreter import Interpreter
+
+WORKLOADS = {
+    "fib(20)": """
+func fib(n) {
+    if (n < 2) {
+        return n;
+    }
+    return fib(n - 1) + fib(n - 2);
+}
+console.output.println(fib(20));
+""",
+    "ackermann(2, 300)": """
+func ack(m, n) {
+    if (m == 0) {
+        return n + 1;
+    }
+    if (n == 0) {
+        return ack(m - 1, 1);
+    }
+    return ack(m - 1, ack(m, n - 1));
+}
+console.output.println(ack(2, 300));
+""",
+    "tail countdown 1e5": """
+func count(n, total) {
+    if (n == 0) {
+        return total;
+    }
+    return count(n - 1, total + n);
+}
+console.output.println(count(100000, 0));
+""",
+}
+
+def main():
+    for use_vm in (False, True):
+        print("VM" if use_vm else "Tree-walking interpreter")
+        for name, source in WORKLOADS.items():
+            interpreter = Interpreter(use_vm=use_vm)
+            output = io.StringIO()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(output):
+                interpreter.interpret(source)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:<20} {elapsed * 1000:9.1f} ms  -> {output.getvalue().strip()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# bench_strings.py
+# Building a 1 MB string: `s = s + piece` in a function and at the top level
+# (both appended in place), the same loop written so the string is copied on
+# every step, lib/fileio's multi_line, and the native array.join.
+#
+#   python benchmarks/bench_strings.py [megabytes]
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+
+PIECE = "0123456789"
+
+PROGRAMS = {
+    "local s = s + piece": """
+func build(n) {
+    var s = "";
+    var i = 0;
+    while (i < n) {
+        s = s + "PIECE";
+        i = i + 1;
+    }
+    return s;
+}
+var result = build(COUNT);
+""",
+    "global s = s + piece": """
+var result = "";
+var i = 0;
+while (i < COUNT) {
+    result = result + "PIECE";
+    i = i + 1;
+}
+""",
+    "copying (tostr(s) + piece)": """
+func build(n) {
+    var s = "";
+    var i = 0;
+    while (i < n) {
+        s = tostr(s) + "PIECE";
+        i = i + 1;
+    }
+    return s;
+}
+var result = build(COUNT);
+""",
+    "fileio multi_line": """
+import "lib/fileio";
+var lines = [];
+var i = 0;
+while (i < COUNT) {
+    array.append(lines, "PIECE"[0] + "12345678");
+    i = i + 1;
+}
+var result = multi_line(lines);
+""",
+    "array.join": """
+var parts = [];
+var i = 0;
+while (i < COUNT) {
+    array.append(parts, "PIECE");
+    i = i + 1;
+}
+var result = array.join(parts);
+""",
+}
+
+def main():
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 1
+    count = int(megabytes * 1_000_000) // len(PIECE)
+    os.chdir(ROOT)  # for the lib/ import
+
+    for name, program in PROGRAMS.items():
+        interpreter = Interpreter(shared_globals=True)
+        source = program.replace("PIECE", PIECE).replace("COUNT", str(count))
+        start = time.perf_counter()
+        interpreter.interpret(source)
+        elapsed = time.perf_counter() - start
+        size = len(interpreter.globals.get("result"))
+        print(f"{name:<28} {elapsed * 1000:8.1f} ms  ({size / 1e6:.2f} MB)")
+
+if __name__ == "__main__":
+    main()
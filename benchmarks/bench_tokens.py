@@ -0,0 +1,77 @@
+# bench_tokens.py
+# Memory held by the token stream of a large generated program, for the
+# original token layout (a plain class with a __dict__ and a freshly sliced
+# lexeme per token), the slotted Token with interned lexemes, and
+# offsets=True, where string literals are SourceTokens (offsets into the
+# source) instead of keeping a copy of their quoted text.
+#
+#   python benchmarks/bench_tokens.py [lines]
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from Thyddle.lexer import Lexer, FastLexer
+
+CHUNK = """
+func area_N(shape) {
+    if (shape.kind == "circle") {
+        return 3.14159 * shape.r * shape.r;
+    }
+    var total = 0;
+    for (var i = 0; i < len(shape.sides); i = i + 1) {
+        total = total + shape.sides[i];
+    }
+    console.output.println("area_N: added up the sides of the shape, one at a time, in order");
+    return total;
+}
+"""
+
+class LegacyToken:
+    # Token as it was before __slots__ and interning
+    def __init__(self, token_type, lexeme, literal, line):
+        self.type = token_type
+        self.lexeme = lexeme
+        self.literal = literal
+        self.line = line
+
+class LegacyLexer(Lexer):
+    def add_token(self, token_type, literal=None):
+        text = self.source[self.start:self.current]
+        self.tokens.append(LegacyToken(token_type, text, literal, self.line))
+
+def measure(make_tokens):
+    tracemalloc.start()
+    start = time.perf_counter()
+    tokens = make_tokens()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(tokens), size, elapsed
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    chunk_lines = CHUNK.count("\n")
+    source = "".join(CHUNK.replace("_N", f"_{i}") for i in range(lines // chunk_lines + 1))
+    print(f"generated program: {source.count(chr(10))} lines, {len(source)} chars")
+    print()
+
+    cases = [
+        ("dict Token, sliced lexemes", lambda: LegacyLexer(source).scan_tokens()),
+        ("slotted Token, interned", lambda: Lexer(source).scan_tokens()),
+        ("slotted Token, offsets", lambda: Lexer(source, offsets=True).scan_tokens()),
+        ("FastLexer, interned", lambda: FastLexer(source).scan_tokens()),
+        ("FastLexer, offsets", lambda: FastLexer(source, offsets=True).scan_tokens()),
+    ]
+
+    baseline = None
+    for name, make_tokens in cases:
+        count, size, elapsed = measure(make_tokens)
+        baseline = baseline or size
+        print(f"{name:<28} {size / 1e6:7.2f} MB  {size / count:6.1f} B/token"
+              f"  {size / baseline:5.0%}  {elapsed * 1000:7.1f} ms (traced)")
+
+if __name__ == "__main__":
+    main()
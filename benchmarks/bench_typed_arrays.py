@@ -0,0 +1,65 @@
+# bench_typed_arrays.py
+# Typed arrays against plain ones: time to build a tape the way BrainF.thy
+# used to (array.append in a loop) and with array.zeros/array.fill, the memory
+# each one holds, and a read-modify-write loop over the cells.
+#
+#   python benchmarks/bench_typed_arrays.py [cells]
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+
+BUILDERS = {
+    "append loop": """
+var tape = [];
+var i = 0;
+while (i < COUNT) {
+    array.append(tape, i % 100);
+    i = i + 1;
+}
+""",
+    "array.fill(n, 0)": "var tape = array.fill(COUNT, 0);",
+    "array.zeros int64": 'var tape = array.zeros(COUNT, "int64");',
+    "array.zeros int8": 'var tape = array.zeros(COUNT, "int8");',
+}
+
+WORK = """
+var j = 0;
+while (j < COUNT) {
+    tape[j] = (tape[j] + j) % 100;
+    j = j + 1;
+}
+"""
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+
+    for name, builder in BUILDERS.items():
+        interpreter = Interpreter(shared_globals=True)
+
+        start = time.perf_counter()
+        interpreter.interpret(builder.replace("COUNT", str(count)))
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        interpreter.interpret(WORK.replace("COUNT", str(count)))
+        work_time = time.perf_counter() - start
+
+        # Storage held by the tape (the cell values are small ints, which
+        # Python shares, so a plain array is one pointer per cell)
+        tape = interpreter.globals.get("tape")
+        tracemalloc.start()
+        copy = tape.elements[:]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{name:<20} build {build_time * 1000:8.1f} ms  loop {work_time * 1000:8.1f} ms"
+              f"  {size / 1e6:6.2f} MB ({size / count:5.1f} B/cell)")
+
+if __name__ == "__main__":
+    main()
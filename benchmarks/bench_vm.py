@@ -0,0 +1,148 @@
+# bench_vm.py
+# Checks that every program in Examples/ prints the same with and without
+# the bytecode VM, then compares the speed of the tree-walking interpreter
+# and the VM. Exits with status 1 if an example's output differs.
+#
+#   python benchmarks/bench_vm.py [repeat]
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.interpreter import Interpreter
+
+# What each example reads from stdin; the others get no input
+EXAMPLE_INPUTS = {
+    "BrainF.thy": "++++++++[>++++[>++>+++>+++>+<<<<-]>+>+>->>+[<]<-]>>.>---.+++++++..+++.>>.<-.<.+++.------.--------.>>+.>++.\n",
+    "calc.thy": "1 + 2\n\"a\" + 3\nvar z = 4\nquit\n",
+    "pythonRepl.thy": "print(1 + 1)\nexit()\n",
+    "rThy.thy": ";)\"olleh\"(nltnirp.tuptuo.elosnoc\nexit()\n",
+    "sampleProgLang.thy": "Declare Variable\nx\n5\nPrint\nAdd\nx\n3\nrun\n",
+    "truthmachine.thy": "0\n",
+}
+
+WORKLOADS = {
+    "counter loop": """
+        var i = 0;
+        var total = 0;
+        while (i < 200000) {
+            total = total + i % 7;
+            i = i + 1;
+        }
+    """,
+    "len() loop": """
+        var a = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10];
+        var n = 0;
+        var rounds = 0;
+        while (rounds < 10000) {
+            var indx = 0;
+            while (indx < len(a)) {
+                n = n + a[indx];
+                indx = indx + 1;
+            }
+            rounds = rounds + 1;
+        }
+    """,
+    "brainf tape": """
+        var tape = [];
+        var i = 0;
+        while (i < 30000) {
+            array.append(tape, 0);
+            i = i + 1;
+        }
+        var ptr = 0;
+        var code = "+>++>+++<<[->+<]>[->+<]>.";
+        var rounds = 0;
+        while (rounds < 2000) {
+            var indx = 0;
+            while (indx < len(code)) {
+                var cmd = code[indx];
+                if (cmd == ">") {
+                    ptr = ptr + 1;
+                } elseif (cmd == "<") {
+                    ptr = ptr - 1;
+                } elseif (cmd == "+") {
+                    tape[ptr] = (tape[ptr] + 1) % 256;
+                } elseif (cmd == "-") {
+                    tape[ptr] = (tape[ptr] - 1) % 256;
+                }
+                indx = indx + 1;
+            }
+            ptr = 0;
+            rounds = rounds + 1;
+        }
+    """,
+    "function calls": """
+        func add(a, b) {
+            return a + b;
+        }
+        var i = 0;
+        var total = 0;
+        for (var i = 0; i < 50000; i = i + 1) {
+            total = add(total, i);
+        }
+    """,
+}
+
+def run_example(source, stdin, use_vm):
+    # Everything the program printed, including its errors
+    output = io.StringIO()
+    old_stdin = sys.stdin
+    sys.stdin = io.StringIO(stdin)
+    try:
+        with contextlib.redirect_stdout(output):
+            Interpreter(use_vm=use_vm).interpret(source)
+    except Exception as error:
+        output.write(f"\n{type(error).__name__}: {error}")
+    finally:
+        sys.stdin = old_stdin
+    return output.getvalue()
+
+def check_examples():
+    ok = True
+    for path in sorted(glob.glob(os.path.join(ROOT, "Examples", "*.thy"))):
+        with open(path, "r") as f:
+            source = f.read()
+        name = os.path.basename(path)
+        stdin = EXAMPLE_INPUTS.get(name, "")
+        if run_example(source, stdin, False) == run_example(source, stdin, True):
+            print(f"ok        Examples/{name}")
+        else:
+            ok = False
+            print(f"MISMATCH  Examples/{name}")
+    return ok
+
+def time_run(source, use_vm, repeat):
+    best = None
+    for _ in range(repeat):
+        interpreter = Interpreter(use_vm=use_vm)
+        start = time.perf_counter()
+        interpreter.interpret(source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    # Examples import lib/ relative to the working directory
+    os.chdir(ROOT)
+    ok = check_examples()
+    print()
+
+    print(f"{'workload':<16} {'tree-walk':>10} {'vm':>10} {'speedup':>8}")
+    for name, source in WORKLOADS.items():
+        tree = time_run(source, False, repeat)
+        vm = time_run(source, True, repeat)
+        print(f"{name:<16} {tree:>9.3f}s {vm:>9.3f}s {tree / vm:>7.2f}x")
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
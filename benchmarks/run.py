@@ -0,0 +1,314 @@
+# run.py
+# The benchmark suite: lexer, parser, interpreter micro-benchmarks, stdlib
+# helpers and whole programs from Examples/. Every case is run a few times
+# and its best time kept; results can be saved as JSON and compared against
+# an earlier run, failing when a case got slower than the threshold allows.
+#
+#   python benchmarks/run.py                          # run everything, print a table
+#   python benchmarks/run.py --json results.json      # also save the results
+#   python benchmarks/run.py --compare results.json   # exit 1 on a >10% regression
+#   python benchmarks/run.py --filter interp. --repeat 10 --threshold 0.05
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from Thyddle.lexer import Lexer, FastLexer
+from Thyddle.parser import Parser
+from Thyddle.interpreter import Interpreter
+
+# name -> setup function; setup() does the untimed work and returns the
+# function to time
+CASES = {}
+
+def case(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+def program(source, stdin=""):
+    # Runs `source` in a fresh interpreter with the given input and its
+    # output thrown away
+    def run():
+        interpreter = Interpreter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            old_stdin = sys.stdin
+            sys.stdin = io.StringIO(stdin)
+            try:
+                interpreter.interpret(source)
+            finally:
+                sys.stdin = old_stdin
+    return run
+
+# Lexer and parser ------------------------------------------------------------
+
+CHUNK = """
+func area_N(shape) {
+    if (shape.kind == "circle") {
+        return 3.14159 * shape.r * shape.r;
+    }
+    var total = 0;
+    for (var i = 0; i < len(shape.sides); i = i + 1) {
+        total = total + shape.sides[i]; // add up the sides
+    }
+    console.output.println("area_N: " + total);
+    return total;
+}
+"""
+
+def generated_source(lines=20000):
+    chunks = lines // CHUNK.count("\n") + 1
+    return "".join(CHUNK.replace("_N", f"_{i}") for i in range(chunks))
+
+@case("lexer.scan_tokens")
+def lexer_scan_tokens():
+    source = generated_source()
+    return lambda: Lexer(source).scan_tokens()
+
+@case("lexer.fast_scan_tokens")
+def lexer_fast_scan_tokens():
+    source = generated_source()
+    return lambda: FastLexer(source).scan_tokens()
+
+@case("parser.parse")
+def parser_parse():
+    tokens = Lexer(generated_source()).scan_tokens()
+    return lambda: Parser(tokens).parse()
+
+# Interpreter -----------------------------------------------------------------
+
+@case("interp.loop")
+def interp_loop():
+    return program("""
+var i = 0;
+var total = 0;
+while (i < 100000) {
+    total = total + i;
+    i = i + 1;
+}
+""")
+
+@case("interp.calls")
+def interp_calls():
+    return program("""
+func add(a, b) {
+    return a + b;
+}
+var total = 0;
+for (var i = 0; i < 50000; i = i + 1) {
+    total = add(total, i);
+}
+""")
+
+@case("interp.closures")
+def interp_closures():
+    return program("""
+func counter() {
+    var count = 0;
+    return () -> {
+        count = count + 1;
+        return count;
+    };
+}
+var next = counter();
+for (var i = 0; i < 50000; i = i + 1) {
+    next();
+}
+""")
+
+@case("interp.get")
+def interp_get():
+    return program("""
+var point = { x: 1, inner: { y: 2 } };
+var total = 0;
+for (var i = 0; i < 100000; i = i + 1) {
+    total = total + point.x + point.inner.y;
+}
+""")
+
+@case("interp.index")
+def interp_index():
+    return program("""
+var data = array.range(1000);
+var total = 0;
+for (var round = 0; round < 100; round = round + 1) {
+    for (var i = 0; i < 1000; i = i + 1) {
+        total = total + data[i];
+    }
+}
+""")
+
+@case("interp.concat")
+def interp_concat():
+    return program("""
+var s = "";
+for (var i = 0; i < 100000; i = i + 1) {
+    s = s + "ab";
+}
+""")
+
+@case("interp.eval")
+def interp_eval():
+    return program("""
+for (var i = 0; i < 2000; i = i + 1) {
+    eval("1 + 2 * 3;");
+}
+""")
+
+# Standard library ------------------------------------------------------------
+
+@case("stdlib.map_combine")
+def stdlib_map_combine():
+    return program("""
+import "lib/standard";
+var data = array.range(10000);
+for (var round = 0; round < 10; round = round + 1) {
+    var text = arr.combine(arr.map(data, (x, i) -> x * 2), ",");
+}
+""")
+
+@case("stdlib.split_reverse")
+def stdlib_split_reverse():
+    return program("""
+import "lib/standard";
+var text = "";
+for (var i = 0; i < 1000; i = i + 1) {
+    text = text + "abcdefghij";
+}
+for (var round = 0; round < 200; round = round + 1) {
+    var reversed = string.reverse(text);
+}
+""")
+
+# Whole programs --------------------------------------------------------------
+
+# Counts a cell up to 1000 in three nested loops, then prints "Hello World!\n"
+# on a clean part of the tape
+COUNT_BF = "++++++++++[>++++++++++[>++++++++++[>+<-]<-]<-]" + ">" * 10
+HELLO_BF = "++++++++[>++++[>++>+++>+++>+<<<<-]>+>+>->>+[<]<-]>>.>---.+++++++..+++.>>.<-.<.+++.------.--------.>>+.>++."
+
+@case("macro.brainf")
+def macro_brainf():
+    with open(os.path.join(ROOT, "Examples", "BrainF.thy")) as f:
+        source = f.read()
+    return program(source, COUNT_BF + HELLO_BF + "\n")
+
+@case("macro.sample_prog_lang")
+def macro_sample_prog_lang():
+    with open(os.path.join(ROOT, "Examples", "sampleProgLang.thy")) as f:
+        source = f.read()
+    script = "Declare Variable\nx\n5\nPrint\nAdd\nx\n3\n" * 300 + "run\n"
+    return program(source, script)
+
+# Running and comparing -------------------------------------------------------
+
+def run_case(setup, repeat):
+    function = setup()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "runs": repeat,
+    }
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+def compare(results, baseline, threshold):
+    """
+    Prints how each case's best time compares with the baseline's and
+    returns the names of the cases that got slower by more than `threshold`.
+    """
+    regressions = []
+    print(f"\n{'case':<26} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, result in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None:
+            print(f"{name:<26} {'-':>10} {result['min'] * 1000:>8.1f}ms {'new':>8}")
+            continue
+        ratio = result["min"] / before["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<26} {before['min'] * 1000:>8.1f}ms {result['min'] * 1000:>8.1f}ms"
+              f" {(ratio - 1) * 100:>+7.1f}%{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Thyddle benchmark suite.")
+    parser.add_argument("--filter", action="append", default=[], metavar="TEXT",
+                        help="only run cases whose name contains TEXT (can be repeated)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per case; the best is kept (default: 3)")
+    parser.add_argument("--json", metavar="PATH",
+                        help="write the results as JSON to PATH ('-' for stdout)")
+    parser.add_argument("--compare", metavar="PATH",
+                        help="compare against results saved with --json")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown that counts as a regression (default: 0.10 = 10%%)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    # Examples import lib/ relative to the working directory
+    os.chdir(ROOT)
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "cases": {},
+    }
+
+    for name, setup in CASES.items():
+        if args.filter and not any(text in name for text in args.filter):
+            continue
+        result = run_case(setup, args.repeat)
+        results["cases"][name] = result
+        print(f"{name:<26} {result['min'] * 1000:9.1f} ms  (median {result['median'] * 1000:.1f} ms)",
+              file=sys.stderr if args.json == "-" else sys.stdout)
+
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than the {args.threshold:.0%} threshold: "
+                  f"{', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
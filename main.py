@@ -1,12 +1,16 @@
-from Thyddle.thyddle import run_file, run_repl
-from Thyddle.interpreter import Interpreter
+from Thyddle.thyddle import run_file, run_repl, arg_parser, interpreter_from_args, profiler_from_args, finish_profile
 
 if __name__ == "__main__":
-    import sys
+    args = arg_parser().parse_args()
     
-    interpreter = Interpreter()
+    interpreter = interpreter_from_args(args)
+    profiler = profiler_from_args(args)
     
-    if len(sys.argv) > 1:
-        run_file(sys.argv[1], interpreter)
-    else:
-        run_file("repl.thy", interpreter)
\ No newline at end of file
+    try:
+        if args.file:
+            run_file(args.file, interpreter)
+        else:
+            run_file("repl.thy", interpreter)
+    finally:
+        if profiler:
+            finish_profile(profiler, args)
\ No newline at end of file